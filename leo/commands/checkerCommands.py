@@ -46,15 +46,20 @@ def find_long_lines(event):
         return False
     #@-others
     max_line = c.config.getInt('max-find-long-lines-length') or 110
-    count, files, ignore = 0, [], []
-    for p in c.all_unique_positions():
+    count, ignore = 0, []
+    # Create positions only for @<file> nodes and nodes with long lines.
+    files = [p.v for p in c.positions_where(
+        lambda v: v.anyAtFileNodeName(), unique=True) if not in_nopylint(p)]
+
+    def has_long_line(v):
+        return any(len(s) > max_line for s in g.splitLines(v.b))
+
+    for p in c.positions_where(has_long_line, unique=True):
         if in_nopylint(p):
             continue
         root = get_root(p)
         if not root:
             continue
-        if root.v not in files:
-            files.append(root.v)
         for i, s in enumerate(g.splitLines(p.b)):
             if len(s) > max_line:
                 if not root:
@@ -121,20 +126,26 @@ def find_missing_docstrings(event):
         link = p.get_UNL(with_proto=True, with_count=True, with_index=True)
         return f"{link},{i}"
     #@-others
+    def find_missing(s):
+        """Return (i, line) for the first definition in s without a docstring."""
+        lines = s.split('\n')
+        for i, line in enumerate(lines):
+            if is_a_definition(line) and not has_docstring(lines, i):
+                return i, line
+        return None
+
     count, found, t1 = 0, [], time.process_time()
     for root in g.findRootsWithPredicate(c, c.p, predicate=is_root):
-        for p in root.self_and_subtree():
-            lines = p.b.split('\n')
-            for i, line in enumerate(lines):
-                if is_a_definition(line) and not has_docstring(lines, i):
-                    count += 1
-                    if root.v not in found:
-                        found.append(root.v)
-                        g.es_print('')
-                        g.es_print(root.h)
-                    print(line)
-                    g.es(line, nodeLink=clickable_link(p, i + 1))
-                    break
+        # Create positions only for nodes with missing docstrings.
+        for p in c.positions_where(lambda v: find_missing(v.b), root=root):
+            i, line = find_missing(p.b)
+            count += 1
+            if root.v not in found:
+                found.append(root.v)
+                g.es_print('')
+                g.es_print(root.h)
+            print(line)
+            g.es(line, nodeLink=clickable_link(p, i + 1))
     g.es_print('')
     g.es_print(
         f"found {count} missing docstring{g.plural(count)} "
@@ -274,11 +285,10 @@ class Flake8Command:
         if not found:
             isCloned = any([p.isCloned() for p in root.self_and_parents()])
             if isCloned:
-                for p in c.all_positions():
-                    if p.isAnyAtFileNode():
-                        isAncestor = any([z.v == root.v for z in p.self_and_subtree()])
-                        if isAncestor and self.find(p):
-                            break
+                for p in c.positions_where(lambda v: v.isAnyAtFileNode()):
+                    isAncestor = any(v is root.v for v, depth in c.self_and_subtree_nodes(p))
+                    if isAncestor and self.find(p):
+                        break
         paths = list(set(self.seen))
         if paths:
             self.check_all(paths)
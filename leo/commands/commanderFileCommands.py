@@ -245,7 +245,7 @@ def open_outline(self, event=None):
             # Only one untitled window has ever been opened
     )
     table = [
-        ("Leo files", "*.leo *.db"),
+        ("Leo files", "*.leo *.db *.leojsonl"),
         ("Python files", "*.py"),
         ("All files", "*"),
     ]
@@ -381,7 +381,7 @@ def save(self, event=None, fileName=None):
                 fileName = g.app.gui.runSaveFileDialog(c,
                     initialfile=c.mFileName,
                     title="Save",
-                    filetypes=[("Leo files", "*.leo *.db"),],
+                    filetypes=[("Leo files", "*.leo *.db *.leojsonl"),],
                     defaultextension=g.defaultLeoFileExtension(c))
         c.bringToFront()
         if fileName:
@@ -447,7 +447,7 @@ def saveAs(self, event=None, fileName=None):
         fileName = g.app.gui.runSaveFileDialog(c,
             initialfile=c.mFileName,
             title="Save As",
-            filetypes=[("Leo files", "*.leo *.db"),],
+            filetypes=[("Leo files", "*.leo *.db *.leojsonl"),],
             defaultextension=g.defaultLeoFileExtension(c))
     c.bringToFront()
     if fileName:
@@ -501,7 +501,7 @@ def saveTo(self, event=None, fileName=None, silent=False):
         fileName = g.app.gui.runSaveFileDialog(c,
             initialfile=c.mFileName,
             title="Save To",
-            filetypes=[("Leo files", "*.leo *.db"),],
+            filetypes=[("Leo files", "*.leo *.db *.leojsonl"),],
             defaultextension=g.defaultLeoFileExtension(c))
     c.bringToFront()
     if fileName:
@@ -948,7 +948,7 @@ def setReferenceFile(self, event=None):
     c = self
     fileName = g.app.gui.runOpenFileDialog(c,
             title="Select reference Leo file",
-            filetypes=[("Leo files", "*.leo *.db"),],
+            filetypes=[("Leo files", "*.leo *.db *.leojsonl"),],
             defaultextension=g.defaultLeoFileExtension(c))
     if not fileName: return
     c.fileCommands.setReferenceFile(fileName)
@@ -997,7 +997,7 @@ def open_theme_file(self, event):
     fn = g.app.gui.runOpenFileDialog(c,
         title="Open Theme File",
         filetypes=[
-            ("Leo files", "*.leo *.db"),
+            ("Leo files", "*.leo *.db *.leojsonl"),
             ("All files", "*"),
         ],
         defaultextension=g.defaultLeoFileExtension(c),
@@ -168,10 +168,10 @@ def dumpOutline(self, event=None):
     v = c.hiddenRootNode
     v.dump()
     seen[v] = True
-    for p in c.all_positions():
-        if p.v not in seen:
-            seen[p.v] = True
-            p.v.dump()
+    for v in c.all_nodes():
+        if v not in seen:
+            seen[v] = True
+            v.dump()
 #@+node:ekr.20031218072017.2898: ** c_oc.Expand & contract commands
 #@+node:ekr.20031218072017.2900: *3* c_oc.contract-all
 @g.commander_command('contract-all')
@@ -376,9 +376,9 @@ def expandOnlyAncestorsOfNode(self, event=None, p=None):
     level = 1
     if p: c.selectPosition(p)  # 2013/12/25
     root = c.p
-    for p in c.all_unique_positions():
-        p.v.expandedPositions = []
-        p.v.contract()
+    for v in c.all_unique_nodes():
+        v.expandedPositions = []
+        v.contract()
     for p in root.parents():
         p.expand()
         level += 1
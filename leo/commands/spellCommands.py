@@ -5,7 +5,12 @@
 """Leo's spell-checking commands."""
 #@+<< imports >>
 #@+node:ekr.20150514050530.1: ** << imports >> (spellCommands.py)
+import hashlib
+import os
+import pickle
 import re
+import time
+import unittest
 import leo.core.leoGlobals as g
 from leo.commands.baseCommands import BaseEditCommandsClass as BaseEditCommandsClass
 try:
@@ -127,6 +132,11 @@ class DefaultDict:
     def __init__(self, words=None):
         self.added_words = set()
         self.ignored_words = set()
+        self.index = None
+            # A SpellIndex, created when first needed.
+        self.main_fn = None
+        self.main_words = None
+            # The words of the main dictionary.
         self.words = set() if words is None else set(words)
     #@+others
     #@+node:ekr.20180207075740.1: *3* dict.add
@@ -134,12 +144,19 @@ class DefaultDict:
         """Add a word to the dictionary."""
         self.words.add(word)
         self.added_words.add(word)
+        if self.index:
+            self.index.add(word)
     #@+node:ekr.20180207101513.1: *3* dict.add_words_from_dict
     def add_words_from_dict(self, kind, fn, words):
         """For use by DefaultWrapper."""
+        if kind == 'main':
+            self.main_fn, self.main_words = fn, words
         for word in words or []:
-            self.words.add(word)
-            self.words.add(word.lower())
+            for s in (word, word.lower()):
+                if s not in self.words:
+                    self.words.add(s)
+                    if self.index:
+                        self.index.add(s)
     #@+node:ekr.20180207075751.1: *3* dict.add_to_session
     def add_to_session(self, word):
 
@@ -151,20 +168,34 @@ class DefaultDict:
             if s in self.words or s in self.ignored_words:
                 return True
         return False
+    #@+node:ekr.20261018213420.8: *3* dict.create_index
+    def create_index(self):
+        """
+        Return a SpellIndex containing all words.
+
+        ~/.leo/spelling_index.pickle caches the index of the main dictionary,
+        keyed by a hash of the dictionary file.
+        """
+        index = SpellIndex()
+        main_words = self.main_words or set()
+        if main_words:
+            home = g.app.homeLeoDir
+            fn = home and g.os_path_finalize_join(home, 'spelling_index.pickle')
+            key = index.key(self.main_fn)
+            if not fn or not index.load(fn, key):
+                g.es_print('creating spelling index...')
+                index.add_words(main_words)
+                if fn:
+                    index.save(fn, key)
+        index.add_words(self.words - main_words)
+        return index
     #@+node:ekr.20180207081634.1: *3* dict.suggest & helpers
     def suggest(self, word):
-
-        def known(words):
-            """Return the words that are in the dictionary."""
-            return [z for z in list(set(words)) if z in self.words]
-
-        assert not known([word]), repr(word)
-        suggestions = (
-            known(self.edits1(word)) or
-            known(self.edits2(word))
-            # [word] # Fall back to the unknown word itself.
-        )
-        return suggestions
+        """Return the known words nearest to word, at most two edits away."""
+        assert word not in self.words, repr(word)
+        if not self.index:
+            self.index = self.create_index()
+        return self.index.suggest(word)
     #@+node:ekr.20180207085717.1: *4* dict.edits1 & edits2
     #@@nobeautify
 
@@ -439,6 +470,177 @@ class EnchantWrapper(BaseSpellWrapper):
         except Exception:
             g.es_exception()
     #@-others
+#@+node:ekr.20261018213631.1: ** class SpellCheckIndex
+class SpellCheckIndex:
+    """
+    The misspelled words in each node of an outline.
+
+    Keys of self.results are vnodes. Values are (key, spans), where key is
+    the hash of the body text that was checked and spans is a list of
+    (start, word) tuples, one for each misspelled word.
+
+    An idle-time timer checks changed bodies a few at a time. The timer
+    starts a new sweep of the outline only after the user types in the body
+    or the undo state changes, so an unchanged outline costs nothing. The
+    spell-find and spell-report commands check only the bodies that the
+    timer has not yet seen.
+    """
+    budget = 0.02
+        # The maximum time, in seconds, to spend at each idle time.
+
+    def __init__(self, c, spellController):
+        """Ctor for SpellCheckIndex class."""
+        self.c = c
+        self.sc = spellController
+        self.re_word = re.compile(
+            # Don't include underscores in words. It just complicates things.
+            # [^\W\d_] means any unicode char except underscore or digit.
+            r"([^\W\d_]+)(['`][^\W\d_]+)?",
+            flags=re.UNICODE)
+        self.dirty = True
+            # True: the bodies may have changed since the last sweep started.
+        self.results = {}
+        self.sweep = []
+            # The vnodes that remain to be checked at idle time.
+        self.timer = None
+        self.undo_state = None
+            # The state of c.undoer when the last sweep started.
+        self.words = {}
+            # Keys are words. Values are True if the word is misspelled.
+    #@+others
+    #@+node:ekr.20261018213631.2: *3* sci.check_text
+    def check_text(self, s):
+        """Return the list of (start, word) tuples for all misspelled words in s."""
+        result, words = [], self.words
+        for m in self.re_word.finditer(s):
+            start, word = m.start(0), m.group(0)
+            # Ignore the word if numbers precede or follow it.
+            # Seems difficult to do this in the regex itself.
+            if start > 0 and s[start - 1].isdigit():
+                continue
+            end = start + len(word)
+            if end < len(s) and s[end].isdigit():
+                continue
+            misspelled = words.get(word)
+            if misspelled is None:
+                # Like SpellTabHandler.find, ignore words without suggestions.
+                misspelled = words[word] = bool(self.sc.process_word(word))
+            if misspelled:
+                result.append((start, word))
+        return result
+    #@+node:ekr.20261018213631.3: *3* sci.forget
+    def forget(self, word):
+        """
+        Recheck all words that might match word, after word has been added
+        to the dictionary or ignored.
+        """
+        lower = word.lower()
+        words = [z for z in self.words if z.lower() == lower]
+        for z in words:
+            del self.words[z]
+        for v, (key, spans) in list(self.results.items()):
+            if any(z[1].lower() == lower for z in spans):
+                spans = [z for z in spans if self.check_text(z[1])]
+                self.results[v] = key, spans
+    #@+node:ekr.20261018213631.4: *3* sci.get_spans
+    def get_spans(self, v):
+        """Return the up-to-date list of (start, word) tuples for v.b."""
+        s = v.b
+        key = hash(s)
+        data = self.results.get(v)
+        if data and data[0] == key:
+            return data[1]
+        spans = self.check_text(s)
+        self.results[v] = key, spans
+        return spans
+    #@+node:ekr.20261018213631.5: *3* sci.on_idle, on_bodykey2, start & stop
+    def on_idle(self, timer):
+        """Check changed bodies until self.budget is used up."""
+        c = self.c
+        if not c.exists:
+            self.stop()
+            return
+        if not self.sweep:
+            if not self.dirty and self.undo_state == self.get_undo_state():
+                return
+            self.start_sweep()
+        t1 = time.perf_counter()
+        sweep = self.sweep
+        while sweep and time.perf_counter() - t1 < self.budget:
+            self.get_spans(sweep.pop())
+
+    def on_bodykey2(self, tag, keys):
+        """Start a new sweep at the next idle time after typing in the body."""
+        if keys.get('c') == self.c:
+            self.dirty = True
+
+    def start(self):
+        """Start checking changed bodies at idle time."""
+        if not self.timer:
+            self.timer = g.IdleTime(self.on_idle, delay=500, tag='SpellCheckIndex')
+            if self.timer:
+                self.timer.start()
+                g.registerHandler('bodykey2', self.on_bodykey2)
+
+    def stop(self):
+        """Stop checking bodies at idle time."""
+        if self.timer:
+            self.timer.stop()
+            self.timer = None
+            g.unregisterHandler('bodykey2', self.on_bodykey2)
+        self.sweep = []
+    #@+node:ekr.20261018215926.1: *3* sci.get_undo_state
+    def get_undo_state(self):
+        """
+        Return a value that changes when an undoable command changes the
+        outline, including commands that change bodies without typing.
+        """
+        u = self.c.undoer
+        return u.bead, len(u.beads), u.beads[u.bead] if 0 <= u.bead < len(u.beads) else None
+    #@+node:ekr.20261018213631.6: *3* sci.start_sweep
+    def start_sweep(self):
+        """Prepare to check every vnode, forgetting deleted vnodes."""
+        self.dirty = False
+        self.undo_state = self.get_undo_state()
+        vnodes = list(self.c.all_unique_nodes())
+        for v in set(self.results) - set(vnodes):
+            del self.results[v]
+        vnodes.reverse()
+        self.sweep = vnodes
+    #@+node:ekr.20261018213631.7: *3* sci.refresh
+    def refresh(self):
+        """Bring the results for all nodes up to date."""
+        self.start_sweep()
+        for v in self.sweep:
+            self.get_spans(v)
+        self.sweep = []
+    #@+node:ekr.20261018213631.8: *3* sci.report
+    def report(self, limit=5):
+        """
+        Return a report of all misspelled words in the outline, as a list of
+        lines. The most common words come first.
+        """
+        self.refresh()
+        d = {}
+            # Keys are words, values are lists of vnodes, in outline order.
+        for v in self.c.all_unique_nodes():
+            key, spans = self.results[v]
+            for start, word in spans:
+                aList = d.setdefault(word, [])
+                if not aList or aList[-1] != v:
+                    aList.append(v)
+        n = sum(len(spans) for key, spans in self.results.values())
+        n_nodes = sum(1 for key, spans in self.results.values() if spans)
+        result = [
+            f"{n} misspelling{g.plural(n)} of {len(d)} word{g.plural(len(d))} "
+            f"in {n_nodes} node{g.plural(n_nodes)}"]
+        for word in sorted(d, key=lambda z: (-len(d[z]), z.lower())):
+            aList = d[word]
+            heads = ', '.join(z.h for z in aList[:limit])
+            more = f", and {len(aList) - limit} more" if len(aList) > limit else ''
+            result.append(f"{word}: {heads}{more}")
+        return result
+    #@-others
 #@+node:ekr.20150514063305.481: ** class SpellCommandsClass
 class SpellCommandsClass(BaseEditCommandsClass):
     """Commands to support the Spell Tab."""
@@ -470,6 +672,9 @@ class SpellCommandsClass(BaseEditCommandsClass):
             log.selectTab(tabName)
         else:
             log.selectTab(tabName)
+            if self.handler and self.handler.index:
+                # The previous Spell tab no longer exists.
+                self.handler.index.stop()
             self.handler = SpellTabHandler(c, tabName)
         # Bug fix: 2013/05/22.
         if not self.handler.loaded:
@@ -557,6 +762,13 @@ class SpellCommandsClass(BaseEditCommandsClass):
         # This is not a great idea. There is no indication of focus.
             # if self.handler and self.handler.tab:
                 # self.handler.tab.setFocus()
+    #@+node:ekr.20261018213631.9: *4* report
+    @cmd('spell-report')
+    def report(self, event=None):
+        """Report all misspelled words in the outline."""
+        self.openSpellTab()
+        if self.handler:
+            self.handler.report()
     #@+node:ekr.20150514063305.492: *3* as_you_type_* commands
     #@+node:ekr.20150514063305.493: *4* as_you_type_toggle
     @cmd('spell-as-you-type-toggle')
@@ -686,6 +898,146 @@ class SpellCommandsClass(BaseEditCommandsClass):
         w.setInsertPoint(i + len(word) + xtra - 1)
         c.bodyWantsFocusNow()
     #@-others
+#@+node:ekr.20261018213420.1: ** class SpellIndex
+class SpellIndex:
+    """
+    A symmetric-delete spelling index, as in SymSpell.
+
+    The index maps every string made by deleting up to max_distance letters
+    from the prefix of a word to the word itself. To find suggestions, we
+    look up the deletes of the misspelled word's prefix and then compute the
+    true distance to each candidate. No other words can be within
+    max_distance edits.
+    """
+    max_distance = 2
+    prefix_length = 7
+    version = 1
+
+    def __init__(self):
+        self.deletes = {}
+            # Keys are deletes. Values are words or lists of words.
+    #@+others
+    #@+node:ekr.20261018213420.2: *3* index.add & add_words
+    def add(self, word):
+        """Add one word to the index."""
+        d = self.deletes
+        for key in self.deletes_of(word[: self.prefix_length]):
+            val = d.get(key)
+            if val is None:
+                d[key] = word
+            elif isinstance(val, list):
+                val.append(word)
+            else:
+                d[key] = [val, word]
+
+    def add_words(self, words):
+        """Add all the words to the index."""
+        for word in words:
+            self.add(word)
+    #@+node:ekr.20261018213420.3: *3* index.deletes_of
+    def deletes_of(self, s):
+        """Return the set of strings made by deleting up to max_distance letters of s."""
+        result, level = {s}, [s]
+        for n in range(self.max_distance):
+            level = [z[:i] + z[i + 1 :] for z in level for i in range(len(z))]
+            result.update(level)
+        return result
+    #@+node:ekr.20261018213420.4: *3* index.distance
+    def distance(self, a, b):
+        """Return the Damerau-Levenshtein distance between a and b."""
+        # Strip the common prefix and suffix.
+        i, n = 0, min(len(a), len(b))
+        while i < n and a[i] == b[i]:
+            i += 1
+        a, b = a[i:], b[i:]
+        while a and b and a[-1] == b[-1]:
+            a, b = a[:-1], b[:-1]
+        if not a or not b:
+            return len(a) + len(b)
+        # The Lowrance-Wagner algorithm. Unlike the "optimal string alignment"
+        # distance, this allows edits between transposed letters, as edits2 does.
+        len_a, len_b = len(a), len(b)
+        big = len_a + len_b
+        d = [[big] * (len_b + 2)]
+        d.extend([big, k] + [0] * len_b for k in range(len_a + 1))
+        d[1] = [big] + list(range(len_b + 1))
+        last_row = {}
+            # Keys are letters. Values are the last row containing the letter.
+        for i in range(1, len_a + 1):
+            ch, prev, row = a[i - 1], d[i], d[i + 1]
+            last_col = 0
+            for j in range(1, len_b + 1):
+                i1, j1 = last_row.get(b[j - 1], 0), last_col
+                if ch == b[j - 1]:
+                    cost, last_col = 0, j
+                else:
+                    cost = 1
+                row[j + 1] = min(
+                    prev[j] + cost,
+                    row[j] + 1,
+                    prev[j + 1] + 1,
+                    d[i1][j1] + (i - i1 - 1) + 1 + (j - j1 - 1),
+                )
+            last_row[ch] = i
+        return d[len_a + 1][len_b + 1]
+    #@+node:ekr.20261018213420.7: *3* index.key
+    def key(self, fn):
+        """Return the key for the index of the dictionary file fn."""
+        with open(fn, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        return f"{digest}-{self.max_distance}-{self.prefix_length}"
+    #@+node:ekr.20261018213420.5: *3* index.suggest
+    def suggest(self, word):
+        """
+        Return the sorted list of indexed words nearest to word, provided they
+        are at most max_distance edits away.
+        """
+        d, candidates = self.deletes, set()
+        for key in self.deletes_of(word[: self.prefix_length]):
+            val = d.get(key)
+            if val is None:
+                pass
+            elif isinstance(val, list):
+                candidates.update(val)
+            else:
+                candidates.add(val)
+        best, result = self.max_distance, []
+        for candidate in candidates:
+            if abs(len(candidate) - len(word)) <= best and candidate != word:
+                n = self.distance(word, candidate)
+                if n < best:
+                    best, result = n, [candidate]
+                elif n == best:
+                    result.append(candidate)
+        return sorted(result)
+    #@+node:ekr.20261018213420.6: *3* index.load & save
+    def load(self, fn, key):
+        """
+        Load the index from the file fn if the file was saved with the same key.
+        Return True if the index was loaded.
+        """
+        if not g.os_path_exists(fn):
+            return False
+        try:
+            with open(fn, 'rb') as f:
+                version, key2, deletes = pickle.load(f)
+        except Exception:
+            return False
+        if (version, key2) != (self.version, key):
+            return False
+        self.deletes = deletes
+        return True
+
+    def save(self, fn, key):
+        """Save the index and its key to the file fn."""
+        tmp_fn = fn + '.tmp'
+        try:
+            with open(tmp_fn, 'wb') as f:
+                pickle.dump((self.version, key, self.deletes), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_fn, fn)
+        except Exception:
+            g.es_print(f"can not write spelling index: {fn}")
+    #@-others
 #@+node:ekr.20150514063305.499: ** class SpellTabHandler
 class SpellTabHandler:
     """A class to create and manage Leo's Spell Check dialog."""
@@ -698,14 +1050,9 @@ class SpellTabHandler:
         self.c = c
         self.body = c.frame.body
         self.currentWord = None
-        self.re_word = re.compile(
-            # Don't include underscores in words. It just complicates things.
-            # [^\W\d_] means any unicode char except underscore or digit.
-            r"([^\W\d_]+)(['`][^\W\d_]+)?",
-            flags=re.UNICODE)
+        self.index = None
+            # A SpellCheckIndex.
         self.outerScrolledFrame = None
-        self.seen = set()
-            # Adding a word to seen will ignore it until restart.
         self.workCtrl = g.app.gui.plainTextWidget(c.frame.top)
             # A text widget for scanning.
             # Must have a parent frame even though it is not packed.
@@ -713,16 +1060,19 @@ class SpellTabHandler:
             self.spellController = EnchantWrapper(c)
             self.tab = g.app.gui.createSpellTab(c, self, tabName)
             self.loaded = True
-            return
-        # Create the spellController for the show-spell-info command.
-        self.spellController = DefaultWrapper(c)
-        self.loaded = bool(self.spellController.main_fn)
-        if self.loaded:
-            # Create the spell tab only if the main dict exists.
-            self.tab = g.app.gui.createSpellTab(c, self, tabName)
         else:
-            # g.es_print('No main dictionary')
-            self.tab = None
+            # Create the spellController for the show-spell-info command.
+            self.spellController = DefaultWrapper(c)
+            self.loaded = bool(self.spellController.main_fn)
+            if self.loaded:
+                # Create the spell tab only if the main dict exists.
+                self.tab = g.app.gui.createSpellTab(c, self, tabName)
+            else:
+                # g.es_print('No main dictionary')
+                self.tab = None
+        if self.loaded:
+            self.index = SpellCheckIndex(c, self.spellController)
+            self.index.start()
     #@+node:ekr.20150514063305.502: *3* Commands
     #@+node:ekr.20150514063305.503: *4* add (spellTab)
     def add(self, event=None):
@@ -731,6 +1081,7 @@ class SpellTabHandler:
             w = self.currentWord
             if w:
                 self.spellController.add(w)
+                self.index.forget(w)
                 self.tab.onFindButton()
     #@+node:ekr.20150514063305.504: *4* change (spellTab)
     def change(self, event=None):
@@ -767,32 +1118,21 @@ class SpellTabHandler:
         """Find the next unknown word."""
         if not self.loaded:
             return
-        c, n, p = self.c, 0, self.c.p
+        c, p = self.c, self.c.p
         sc = self.spellController
         w = c.frame.body.wrapper
         c.selectPosition(p)
-        s = w.getAllText().rstrip()
         ins = w.getInsertPoint()
-        # New in Leo 5.3: use regex to find words.
         last_p = p.copy()
-        while True:
-            for m in self.re_word.finditer(s[ins:]):
-                start, word = m.start(0), m.group(0)
-                if word in self.seen:
-                    continue
-                n += 1
-                # Ignore the word if numbers precede or follow it.
-                # Seems difficult to do this in the regex itself.
-                k1 = ins + start - 1
-                if k1 >= 0 and s[k1].isdigit():
-                    continue
-                k2 = ins + start + len(word)
-                if k2 < len(s) and s[k2].isdigit():
+        while p:
+            # The index checks only bodies that have changed.
+            for start, word in self.index.get_spans(p.v):
+                if start < ins:
                     continue
                 alts = sc.process_word(word)
                 if alts:
                     self.currentWord = word
-                    i = ins + start
+                    i = start
                     j = i + len(word)
                     self.showMisspelled(p)
                     self.tab.fillbox(alts, word)
@@ -801,19 +1141,14 @@ class SpellTabHandler:
                     w.setSelectionRange(i, j, insert=j)
                     w.see(j)
                     return
-                self.seen.add(word)
             # No more misspellings in p
             p.moveToThreadNext()
-            if p:
-                ins = 0
-                s = p.b
-            else:
-                g.es("no more misspellings")
-                c.selectPosition(last_p)
-                self.tab.fillbox([])
-                c.invalidateFocus()
-                c.bodyWantsFocus()
-                return
+            ins = 0
+        g.es("no more misspellings")
+        c.selectPosition(last_p)
+        self.tab.fillbox([])
+        c.invalidateFocus()
+        c.bodyWantsFocus()
     #@+node:ekr.20160415033936.1: *5* showMisspelled
     def showMisspelled(self, p):
         """Show the position p, contracting the tree as needed."""
@@ -842,7 +1177,14 @@ class SpellTabHandler:
             w = self.currentWord
             if w:
                 self.spellController.ignore(w)
+                self.index.forget(w)
                 self.tab.onFindButton()
+    #@+node:ekr.20261018213631.10: *4* report (spellTab)
+    def report(self, event=None):
+        """Print all misspelled words in the outline."""
+        if self.loaded:
+            for line in self.index.report():
+                g.es_print(line)
     #@-others
 #@+node:ekr.20180209141207.1: ** @g.command('show-spell-info')
 @g.command('show-spell-info')
@@ -874,6 +1216,167 @@ def clean_user_spell_dict(event):
     c = event and event.get('c')
     if c:
         DefaultWrapper(c).save_user_dict(trace=True)
+#@+node:ekr.20261018215917.1: ** class TestSpellIndex
+class TestSpellIndex(unittest.TestCase):
+    #@+others
+    #@+node:ekr.20261019110412.1: *3* TestSpellIndex.bridge
+    def bridge(self):
+        """Return an instance of Leo's bridge."""
+        import leo.core.leoBridge as leoBridge
+        return leoBridge.controller(gui='nullGui',
+            loadPlugins=False,
+            readSettings=False,
+            silent=True,
+            verbose=False,
+        )
+    #@+node:ekr.20261019110412.2: *3* TestSpellIndex.make_index
+    def make_index(self, c):
+        """
+        Return a SpellCheckIndex for c whose spell checker is a DefaultWrapper
+        using only a small word list.
+        """
+
+        class Wrapper(DefaultWrapper):
+            """A DefaultWrapper without dictionary files."""
+
+            def __init__(self, c, words):
+                # pylint: disable=super-init-not-called
+                self.c = c
+                self.d = DefaultDict(words)
+                self.main_fn = self.user_fn = None
+
+        words = ['again', 'is', 'spelling', 'text', 'the', 'wrong']
+        return SpellCheckIndex(c, Wrapper(c, words))
+    #@+node:ekr.20261019110412.3: *3* TestSpellIndex.make_outline
+    def make_outline(self, c):
+        """Create the test outline and return its vnodes."""
+        table = (
+            ('node 1', 'the speling is rong\n'),
+            ('node 2', 'Rong again, rong\n'),
+            ('node 3', 'the text\n'),
+            ('node 4', 'speling 2speling speling2\n'),
+        )
+        p = c.rootPosition()
+        result = []
+        for i, (h, b) in enumerate(table):
+            if i > 0:
+                p = p.insertAfter()
+            p.h, p.b = h, b
+            result.append(p.v)
+        return result
+    #@+node:ekr.20261019110412.4: *3* TestSpellIndex.test_get_spans
+    def test_get_spans(self):
+        """Test that sci.get_spans rechecks a body only after it changes."""
+        c = self.bridge().openLeoFile(None)
+        v1, v2, v3, v4 = self.make_outline(c)
+        index = self.make_index(c)
+        spans = index.get_spans(v1)
+        self.assertEqual(spans, [(4, 'speling'), (15, 'rong')])
+        self.assertEqual(index.results[v1], (hash(v1.b), spans))
+        self.assertIs(index.get_spans(v1), spans)
+        self.assertEqual(index.get_spans(v3), [])
+        # Words next to digits are not checked.
+        self.assertEqual(index.get_spans(v4), [(0, 'speling')])
+        # Changing the body invalidates the spans.
+        v1.b = 'the spelling is rong\n'
+        spans = index.get_spans(v1)
+        self.assertEqual(spans, [(16, 'rong')])
+        self.assertIs(index.get_spans(v1), spans)
+        v1.b = 'the spelling is wrong\n'
+        self.assertEqual(index.get_spans(v1), [])
+        c.close()
+    #@+node:ekr.20261019110412.5: *3* TestSpellIndex.test_forget
+    def test_forget(self):
+        """Test sci.forget after adding or ignoring a word."""
+        c = self.bridge().openLeoFile(None)
+        v1, v2, v3, v4 = self.make_outline(c)
+        index = self.make_index(c)
+        sc = index.sc
+        index.refresh()
+        self.assertEqual(index.get_spans(v2), [(0, 'Rong'), (12, 'rong')])
+        self.assertIs(index.words['rong'], True)
+        # Adding a word forgets all its cases, without changing any body.
+        sc.add('rong')
+        index.forget('rong')
+        self.assertIs(index.words['rong'], False)
+        self.assertIs(index.words['Rong'], False)
+        self.assertEqual(index.get_spans(v1), [(4, 'speling')])
+        self.assertEqual(index.get_spans(v2), [])
+        self.assertEqual(index.get_spans(v4), [(0, 'speling')])
+        # Ignoring a word.
+        sc.ignore('speling')
+        index.forget('speling')
+        self.assertEqual(index.get_spans(v1), [])
+        self.assertEqual(index.get_spans(v4), [])
+        self.assertEqual(index.report(), ['0 misspellings of 0 words in 0 nodes'])
+        c.close()
+    #@+node:ekr.20261019110412.6: *3* TestSpellIndex.test_report
+    def test_report(self):
+        """Test sci.report, including deleted nodes."""
+        c = self.bridge().openLeoFile(None)
+        v1, v2, v3, v4 = self.make_outline(c)
+        index = self.make_index(c)
+        # Check a node before the others, so results are not in outline order.
+        index.get_spans(v4)
+        self.assertEqual(index.report(), [
+            '5 misspellings of 3 words in 3 nodes',
+            'rong: node 1, node 2',
+            'speling: node 1, node 4',
+            'Rong: node 2',
+        ])
+        self.assertEqual(index.report(limit=1), [
+            '5 misspellings of 3 words in 3 nodes',
+            'rong: node 1, and 1 more',
+            'speling: node 1, and 1 more',
+            'Rong: node 2',
+        ])
+        # The report forgets deleted nodes and rechecks changed bodies.
+        c.rootPosition().doDelete()
+        c.rootPosition().b = 'Rong speling\n'
+        self.assertEqual(index.report(), [
+            '3 misspellings of 2 words in 2 nodes',
+            'speling: node 2, node 4',
+            'Rong: node 2',
+        ])
+        self.assertNotIn(v1, index.results)
+        c.close()
+    #@+node:ekr.20261018215917.2: *3* TestSpellIndex.test_distance
+    def test_distance(self):
+        """Test index.distance, including transposed letters."""
+        index = SpellIndex()
+        table = (
+            ('', '', 0), ('abc', '', 3), ('', 'abc', 3),
+            ('spell', 'spell', 0), ('spell', 'spel', 1), ('spell', 'spelling', 3),
+            ('spell', 'smell', 1), ('spell', 'sepll', 1), ('abcd', 'badc', 2),
+            # Edits between transposed letters: 'ca' -> 'ac' -> 'abc'.
+            ('ca', 'abc', 2), ('abc', 'ca', 2),
+        )
+        for a, b, n in table:
+            self.assertEqual(index.distance(a, b), n, msg=(a, b))
+    #@+node:ekr.20261018215917.3: *3* TestSpellIndex.test_suggest
+    def test_suggest(self):
+        """Test that index.suggest matches the suggestions of edits1 and edits2."""
+        words = [
+            'a', 'an', 'and', 'ant', 'hand', 'handle', 'handled', 'candle',
+            'spell', 'spelling', 'spelled', 'smell', 'shell', 'dwelling',
+            'suggest', 'suggestion', 'suggestions', 'question', 'questions',
+        ]
+        d = DefaultDict(words)
+        index = SpellIndex()
+        index.add_words(words)
+
+        def known(aList):
+            return sorted(set(z for z in aList if z in d.words))
+
+        misspellings = (
+            'b', 'nad', 'hnad', 'handel', 'candel', 'spel', 'speling',
+            'sepllign', 'dwleling', 'sugest', 'sugestoin', 'qeustions',
+            'xyzzy', 'spellingspelling',
+        )
+        for word in misspellings:
+            expected = known(d.edits1(word)) or known(d.edits2(word))
+            self.assertEqual(index.suggest(word), expected, msg=word)
+    #@-others
 #@-others
 #@@language python
 #@@tabwidth -4
@@ -9,6 +9,7 @@ import leo.core.leoExternalFiles as leoExternalFiles
 import base64
 import importlib
 import io
+import json
 StringIO = io.StringIO
 import os
 import optparse
@@ -54,13 +55,17 @@ class IdleTimeManager:
             return  # For debugger.
         self.on_idle_count += 1
         # Handle the registered callbacks.
+        perf = g.app.perfStats
         for callback in self.callback_list:
+            t = perf and perf.start()
             try:
                 callback()
             except Exception:
                 g.es_exception()
                 g.es_print(f"removing callback: {callback}")
                 self.callback_list.remove(callback)
+            if perf:
+                perf.stop(t, 'idle', perf.handlerName(callback))
         # Handle idle-time hooks.
         g.app.pluginsController.on_idle()
     #@+node:ekr.20161028034808.1: *3* itm.start
@@ -267,12 +272,12 @@ class LeoApp:
         #@+<< LeoApp: global reader/writer data >>
         #@+node:ekr.20170302075110.1: *5* << LeoApp: global reader/writer data >>
         # From leoAtFile.py.
-        self.atAutoWritersDict = {}
-        self.writersDispatchDict = {}
+        self.atAutoWritersDict = PluginClassDict()
+        self.writersDispatchDict = PluginClassDict()
         # From leoImport.py
-        self.atAutoDict = {}
+        self.atAutoDict = PluginClassDict()
             # Keys are @auto names, values are scanner classes.
-        self.classDispatchDict = {}
+        self.classDispatchDict = PluginClassDict()
         #@-<< LeoApp: global reader/writer data >>
         #@+<< LeoApp: global status vars >>
         #@+node:ekr.20161028040054.1: *5* << LeoApp: global status vars >>
@@ -350,6 +355,8 @@ class LeoApp:
             # Application wide hook function.
         self.idle_time_hooks_enabled = True
             # True: idle-time hooks are enabled.
+        self.perfStats = None
+            # A PerfStats instance: --perf-stats or @bool perf-stats.
         #@-<< LeoApp: plugins and event handlers >>
         #@+<< LeoApp: scripting ivars >>
         #@+node:ekr.20161028040303.1: *5* << LeoApp: scripting ivars >>
@@ -1355,6 +1362,7 @@ class LeoApp:
         g.app.saveEditorDockState(c)
         g.app.commander_cacher.commit()
             # store cache, but don't close it.
+        c.fileCommands.closeLazyLoader()
         # This may remove frame from the window list.
         if frame in g.app.windowList:
             g.app.destroyWindow(frame)
@@ -1551,8 +1559,9 @@ class LeoApp:
         d = g.app.atAutoDict
         for key in d:
             # pylint: disable=cell-var-from-loop
-            aClass = d.get(key)
-            if aClass and g.match_word(p.h, 0, key):
+            # Match first: d.get may import the class.
+            aClass = g.match_word(p.h, 0, key) and d.get(key)
+            if aClass:
 
                 def scanner_for_at_auto_cb(c, parent, s, **kwargs):
                     try:
@@ -1967,6 +1976,9 @@ class LoadManager:
             # closeLeoWindow())
         self.theme_c = None
             # #1374.
+        self.settingsEnvNames = set()
+            # Names of the environment variables tested by @ifenv nodes.
+            # See LM.computeSettingsCacheKey.
     #@+node:ekr.20120211121736.10812: *3* LM.Directory & file utils
     #@+node:ekr.20120219154958.10481: *4* LM.completeFileName
     def completeFileName(self, fileName):
@@ -2520,20 +2532,30 @@ class LoadManager:
         c.openDirectory = frame.openDirectory = g.os_path_dirname(fn)
         g.app.gui = oldGui
         return c if ok else None
-    #@+node:ekr.20120213081706.10382: *4* LM.readGlobalSettingsFiles
-    def readGlobalSettingsFiles(self):
+    #@+node:ekr.20120213081706.10382: *4* LM.readGlobalSettingsFiles & helpers
+    def readGlobalSettingsFiles(self, useCache=True):
         """
         Read leoSettings.leo and myLeoSettings.leo using a null gui.
         
         New in Leo 6.1: this sets ivars for the ActiveSettingsOutline class.
+
+        useCache: True: use the settings cache if no settings file has changed.
+                  Cached reads set lm.leo_settings_c, lm.my_settings_c and
+                  lm.theme_c to None.
         """
         trace = 'themes' in g.app.debug
         lm = self
+        lm.leo_settings_path = lm.computeLeoSettingsPath()
+        lm.my_settings_path = lm.computeMyLeoSettingsPath()
+        if useCache and lm.readSettingsCache():
+            return
+        lm.settingsEnvNames = set()
         # Open the standard settings files with a nullGui.
         # Important: their commanders do not exist outside this method!
         old_commanders = g.app.commanders()
-        lm.leo_settings_path = lm.computeLeoSettingsPath()
-        lm.my_settings_path = lm.computeMyLeoSettingsPath()
+        n_common = (
+            len(g.app.config.atCommonButtonsList) +
+            len(g.app.config.atCommonCommandsList))
         lm.leo_settings_c = lm.openSettingsFile(self.leo_settings_path)
         lm.my_settings_c = lm.openSettingsFile(self.my_settings_path)
         commanders = [lm.leo_settings_c, lm.my_settings_c]
@@ -2548,6 +2570,7 @@ class LoadManager:
         bindings_d.setName('lm.globalBindingsDict')
         lm.globalSettingsDict = settings_d
         lm.globalBindingsDict = bindings_d
+        global_settings_d = settings_d
         # Add settings from --theme or @string theme-name files.
         # This must be done *after* reading myLeoSettigns.leo.
         lm.theme_path = lm.computeThemeFilePath()
@@ -2577,6 +2600,98 @@ class LoadManager:
         for c in commanders:
             if c not in old_commanders:
                 g.app.forgetOpenFile(c.fileName())
+        # Common @button and @command nodes contain positions.
+        if n_common == (
+            len(g.app.config.atCommonButtonsList) +
+            len(g.app.config.atCommonCommandsList)
+        ):
+            lm.writeSettingsCache(global_settings_d, bindings_d)
+    #@+node:ekr.20261018210822.1: *5* LM.computeSettingsCacheKey
+    # Change this when the format of the settings cache changes.
+    settings_cache_version = 2
+
+    def computeSettingsCacheKey(self, env_names):
+        """
+        Return the key for the settings cache: a list describing Leo's version,
+        the machine, the contents of all global settings files and the values
+        of the environment variables named in env_names.
+
+        The machine name and the environment variables are the inputs of
+        @ifhostname and @ifenv nodes.
+        """
+        import hashlib
+        import leo.core.leoVersion as leoVersion
+        lm = self
+        key = [
+            lm.settings_cache_version, leoVersion.version,
+            sys.platform, lm.computeMachineName(),
+            [[name, os.getenv(name)] for name in env_names],
+        ]
+        for path in (lm.leo_settings_path, lm.my_settings_path, lm.theme_path):
+            if path and g.os_path_exists(path):
+                with open(path, 'rb') as f:
+                    digest = hashlib.md5(f.read()).hexdigest()
+                key.append([path, os.path.getmtime(path), digest])
+            else:
+                key.append([path, None, None])
+        return key
+    #@+node:ekr.20261018210822.2: *5* LM.readSettingsCache
+    # The ivars of g.app.config that @settings trees may set.
+    settings_cache_ivars = (
+        'buttonsFileName', 'context_menus', 'enabledPluginsFileName',
+        'enabledPluginsString', 'menusFileName', 'menusList',
+    )
+
+    def readSettingsCache(self):
+        """
+        Set lm.globalSettingsDict and lm.globalBindingsDict from the settings
+        cache, without opening any settings file.
+
+        Return False if the cache does not exist or is out of date.
+        """
+        lm = self
+        try:
+            cache = g.app.db.get('global-settings-cache')
+            key, env_names, theme_path, settings_d, bindings_d, theme_settings_d, ivars = cache
+        except Exception:
+            return False
+        lm.theme_path = theme_path
+        if key != lm.computeSettingsCacheKey(env_names):
+            return False
+        lm.settingsEnvNames = set(env_names)
+        # computeThemeFilePath may use lm.globalSettingsDict and lm.globalBindingsDict.
+        lm.globalSettingsDict = settings_d
+        lm.globalBindingsDict = bindings_d
+        if lm.computeThemeFilePath() != theme_path:
+            return False
+        lm.globalSettingsDict = theme_settings_d
+        lm.leo_settings_c = lm.my_settings_c = lm.theme_c = None
+        if theme_path:
+            g.app.theme_directory = g.os_path_dirname(theme_path)
+        for ivar, val in ivars.items():
+            setattr(g.app.config, ivar, val)
+        return True
+    #@+node:ekr.20261018210822.3: *5* LM.writeSettingsCache
+    def writeSettingsCache(self, settings_d, bindings_d):
+        """
+        Write the settings cache.
+
+        settings_d and bindings_d are the settings before adding the theme's settings.
+        """
+        lm = self
+        ivars = {
+            ivar: getattr(g.app.config, ivar) for ivar in lm.settings_cache_ivars
+                if hasattr(g.app.config, ivar)
+        }
+        env_names = sorted(lm.settingsEnvNames)
+        cache = [
+            lm.computeSettingsCacheKey(env_names), env_names, lm.theme_path,
+            settings_d, bindings_d, lm.globalSettingsDict, ivars,
+        ]
+        try:
+            g.app.db['global-settings-cache'] = cache
+        except Exception:
+            pass  # The cache is only an optimization.
     #@+node:ekr.20120214165710.10838: *4* LM.traceSettingsDict
     def traceSettingsDict(self, d, verbose=False):
         if verbose:
@@ -2797,6 +2912,8 @@ class LoadManager:
             # reads only standard settings files, using a null gui.
             # uses lm.files[0] to compute the local directory
             # that might contain myLeoSettings.leo.
+        if not g.app.perfStats and g.app.config.getBool('perf-stats', default=False):
+            g.app.perfStats = PerfStats()
         # Read the recent files file.
         localConfigFile = lm.files[0] if lm.files else None
         g.app.recentFilesManager.readRecentFiles(localConfigFile)
@@ -2810,14 +2927,47 @@ class LoadManager:
         New in Leo 5.5:
 
         Create global data structures describing importers and writers.
+
+        If the plugin manifest is up to date, Leo imports an importer or writer
+        module only when it first uses one of the module's classes.
         """
         assert g.app.loadDir
             # This is the only data required.
+        manifest = self.readPluginManifest()
+        if manifest:
+            self.createDataFromManifest(manifest)
+            return
+        self.pluginManifest = {'importers': {}, 'writers': {}}
         self.createWritersData()
             # Was an AtFile method.
         self.createImporterData()
             # Was a LeoImportCommands method.
-    #@+node:ekr.20140724064952.18037: *6* LM.createImporterData & helper
+        self.writePluginManifest()
+        self.pluginManifest = None
+    #@+node:ekr.20261018210609.2: *6* LM.computePluginMtimes
+    def computePluginMtimes(self):
+        """Return a dict whose keys are importer and writer files, values are mtimes."""
+        d = {}
+        for kind in ('importers', 'writers'):
+            pattern = g.os_path_finalize_join(g.app.loadDir, '..', 'plugins', kind, '*.py')
+            for fn in g.glob_glob(pattern):
+                d[fn] = os.path.getmtime(fn)
+        return d
+    #@+node:ekr.20261018210609.3: *6* LM.createDataFromManifest
+    def createDataFromManifest(self, manifest):
+        """
+        Create the data structures describing importers and writers from the
+        plugin manifest, without importing any importer or writer module.
+        """
+        g.app.writersDispatchDict = PluginClassDict()
+        g.app.atAutoWritersDict = PluginClassDict()
+        for sfn, data in manifest.get('writers').items():
+            at_auto, extensions, class_path = data
+            self.addWriterData(sfn, at_auto, extensions, class_path)
+        for sfn, data in manifest.get('importers').items():
+            at_auto, extensions, class_path = data
+            self.addImporterData(sfn, at_auto, extensions, class_path)
+    #@+node:ekr.20140724064952.18037: *6* LM.createImporterData & helpers
     def createImporterData(self):
         """Create the data structures describing importer plugins."""
         # Allow plugins to be defined in ~/.leo/plugins.
@@ -2851,25 +3001,34 @@ class LoadManager:
             scanner_class = importer_d.get('class', None)
             # scanner_name = scanner_class.__name__
             extensions = importer_d.get('extensions', [])
-            if at_auto:
-                # Make entries for each @auto type.
-                d = g.app.atAutoDict
-                for s in at_auto:
-                    d[s] = scanner_class
-                    g.app.atAutoDict[s] = scanner_class
-                    g.app.atAutoNames.add(s)
-            if extensions:
-                # Make entries for each extension.
-                d = g.app.classDispatchDict
-                for ext in extensions:
-                    d[ext] = scanner_class
+            self.addImporterData(sfn, at_auto, extensions, scanner_class)
         elif sfn not in (
             # These are base classes, not real plugins.
             'basescanner.py',
             'linescanner.py',
         ):
             g.warning(f"leo/plugins/importers/{sfn} has no importer_dict")
-    #@+node:ekr.20140728040812.17990: *6* LM.createWritersData & helper
+    #@+node:ekr.20261018210609.4: *7* LM.addImporterData
+    def addImporterData(self, sfn, at_auto, extensions, scanner_class):
+        """
+        Set entries in g.app.classDispatchDict, g.app.atAutoDict and
+        g.app.atAutoNames.
+
+        scanner_class is a class or a class path in the plugin manifest.
+        """
+        if at_auto:
+            # Make entries for each @auto type.
+            d = g.app.atAutoDict
+            for s in at_auto:
+                d[s] = scanner_class
+                g.app.atAutoNames.add(s)
+        if extensions:
+            # Make entries for each extension.
+            d = g.app.classDispatchDict
+            for ext in extensions:
+                d[ext] = scanner_class
+        self.recordPluginData('importers', sfn, at_auto, extensions, scanner_class)
+    #@+node:ekr.20140728040812.17990: *6* LM.createWritersData & helpers
     def createWritersData(self):
         """Create the data structures describing writer plugins."""
         trace = False and 'createWritersData' not in g.app.debug_dict
@@ -2877,8 +3036,8 @@ class LoadManager:
         if trace:
             # Suppress multiple traces.
             g.app.debug_dict['createWritersData'] = True
-        g.app.writersDispatchDict = {}
-        g.app.atAutoWritersDict = {}
+        g.app.writersDispatchDict = PluginClassDict()
+        g.app.atAutoWritersDict = PluginClassDict()
         plugins1 = g.os_path_finalize_join(g.app.homeDir, '.leo', 'plugins')
         plugins2 = g.os_path_finalize_join(g.app.loadDir, '..', 'plugins')
         for kind, plugins in (('home', plugins1), ('leo', plugins2)):
@@ -2911,29 +3070,91 @@ class LoadManager:
             at_auto = writer_d.get('@auto', [])
             scanner_class = writer_d.get('class', None)
             extensions = writer_d.get('extensions', [])
-            if at_auto:
-                # Make entries for each @auto type.
-                d = g.app.atAutoWritersDict
-                for s in at_auto:
-                    aClass = d.get(s)
-                    if aClass and aClass != scanner_class:
-                        g.trace(
-                            f"{sfn}: duplicate {s} class {aClass.__name__} "
-                            f"in {m.__file__}:")
-                    else:
-                        d[s] = scanner_class
-                        g.app.atAutoNames.add(s)
-            if extensions:
-                # Make entries for each extension.
-                d = g.app.writersDispatchDict
-                for ext in extensions:
-                    aClass = d.get(ext)
-                    if aClass and aClass != scanner_class:
-                        g.trace(f"{sfn}: duplicate {ext} class", aClass, scanner_class)
-                    else:
-                        d[ext] = scanner_class
+            self.addWriterData(sfn, at_auto, extensions, scanner_class)
         elif sfn not in ('basewriter.py',):
             g.warning(f"leo/plugins/writers/{sfn} has no writer_dict")
+    #@+node:ekr.20261018210609.5: *7* LM.addWriterData
+    def addWriterData(self, sfn, at_auto, extensions, scanner_class):
+        """
+        Set entries in g.app.writersDispatchDict and g.app.atAutoWritersDict.
+
+        scanner_class is a class or a class path in the plugin manifest.
+        """
+        if at_auto:
+            # Make entries for each @auto type.
+            d = g.app.atAutoWritersDict
+            for s in at_auto:
+                aClass = d.peek(s)
+                if aClass and aClass != scanner_class:
+                    g.trace(f"{sfn}: duplicate {s} class {aClass!r}")
+                else:
+                    d[s] = scanner_class
+                    g.app.atAutoNames.add(s)
+        if extensions:
+            # Make entries for each extension.
+            d = g.app.writersDispatchDict
+            for ext in extensions:
+                aClass = d.peek(ext)
+                if aClass and aClass != scanner_class:
+                    g.trace(f"{sfn}: duplicate {ext} class", aClass, scanner_class)
+                else:
+                    d[ext] = scanner_class
+        self.recordPluginData('writers', sfn, at_auto, extensions, scanner_class)
+    #@+node:ekr.20261018210609.6: *6* LM.readPluginManifest & writePluginManifest
+    # Change this when the format of the manifest changes.
+    plugin_manifest_version = 1
+    pluginManifest = None
+        # Not None only while LM.createAllImporterData imports all plugins.
+
+    def pluginManifestPath(self):
+        """Return the path to the plugin manifest, or None."""
+        if g.app.homeLeoDir:
+            return g.os_path_finalize_join(g.app.homeLeoDir, 'db', 'plugin_manifest.json')
+        return None
+
+    def readPluginManifest(self):
+        """
+        Return the plugin manifest, a dict, or None if the manifest does not
+        exist or any importer or writer file has changed.
+        """
+        path = self.pluginManifestPath()
+        if not path or not g.os_path_exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if (
+                manifest.get('version') == self.plugin_manifest_version and
+                manifest.get('mtimes') == self.computePluginMtimes()
+            ):
+                return manifest
+        except Exception:
+            pass
+        return None
+
+    def writePluginManifest(self):
+        """Write the plugin manifest created by LM.recordPluginData."""
+        path = self.pluginManifestPath()
+        if not path:
+            return
+        manifest = self.pluginManifest
+        manifest['version'] = self.plugin_manifest_version
+        manifest['mtimes'] = self.computePluginMtimes()
+        try:
+            os.makedirs(g.os_path_dirname(path), exist_ok=True)
+            temp_path = path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=1, sort_keys=True)
+            os.replace(temp_path, path)
+        except Exception:
+            pass  # The manifest is only an optimization.
+    #@+node:ekr.20261018210609.7: *6* LM.recordPluginData
+    def recordPluginData(self, kind, sfn, at_auto, extensions, scanner_class):
+        """Record the data for one importer or writer in the plugin manifest."""
+        if self.pluginManifest is None or not isinstance(scanner_class, type):
+            return
+        class_path = f"{scanner_class.__module__}:{scanner_class.__qualname__}"
+        self.pluginManifest[kind][sfn] = [at_auto, extensions, class_path]
     #@+node:ekr.20120219154958.10478: *5* LM.createGui
     def createGui(self, pymacs):
         lm = self
@@ -3102,6 +3323,7 @@ class LoadManager:
         # add_bool('--no-dock',       'use legacy look & feel')
         add_bool('--no-plugins',    'disable all plugins')
         add_bool('--no-splash',     'disable the splash screen')
+        add_bool('--perf-stats',    'time commands, hooks, idle-time handlers and file i/o')
         add_other('--screen-shot',  'take a screen shot and then exit', m='PATH')
         add_other('--script',       'execute a script and then exit', m="PATH")
         add_bool('--script-window', 'execute script using default gui')
@@ -3223,6 +3445,9 @@ class LoadManager:
         g.app.use_splash_screen = (
             not options.no_splash and
             not options.minimized)
+        # --perf-stats
+        if options.perf_stats:
+            g.app.perfStats = PerfStats()
         # --silent
         g.app.silentMode = options.silent
         # --trace=...
@@ -3550,7 +3775,7 @@ class LoadManager:
     #@+node:ekr.20120223062418.10419: *6* LM.isLeoFile & LM.isZippedFile
     def isLeoFile(self, fn):
         return fn and (
-            zipfile.is_zipfile(fn) or fn.endswith('.leo') or fn.endswith('.db'))
+            zipfile.is_zipfile(fn) or fn.endswith(('.leo', '.db', '.leojsonl')))
 
     def isZippedFile(self, fn):
         return fn and zipfile.is_zipfile(fn)
@@ -3625,6 +3850,133 @@ class LoadManager:
             c.fileCommands.getLeoFile(theFile, fn, checkOpenFiles=False)
                 # Closes the file.
     #@-others
+#@+node:ekr.20261018212936.1: ** class PerfStats
+class PerfStats:
+    """
+    Opt-in timing and counting of Leo's hot paths.
+
+    g.app.perfStats is None unless the --perf-stats command-line option or
+    the @bool perf-stats setting is in effect. Callers do this::
+
+        perf = g.app.perfStats
+        t = perf and perf.start()
+        ...
+        if perf:
+            perf.stop(t, kind, name)
+
+    Kinds are 'command', 'hook', 'idle', 'read' and 'write'. Times are
+    inclusive: reading a .leo file includes reading its @file nodes.
+    """
+
+    def __init__(self):
+        """Ctor for PerfStats class."""
+        self.started = time.time()
+        self.stats = {}
+            # Keys are (kind, name). Values are [count, wall time, cpu time].
+    #@+others
+    #@+node:ekr.20261018212936.2: *3* perf.start & stop
+    def start(self):
+        """Return the starting wall time and cpu time for perf.stop."""
+        return time.perf_counter(), time.process_time()
+
+    def stop(self, t, kind, name):
+        """Add one call, starting at t, to the totals for (kind, name)."""
+        wall, cpu = t
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        aList = self.stats.get((kind, name))
+        if aList:
+            aList[0] += 1
+            aList[1] += wall
+            aList[2] += cpu
+        else:
+            self.stats[kind, name] = [1, wall, cpu]
+    #@+node:ekr.20261018212936.3: *3* perf.clear
+    def clear(self):
+        """Clear all totals."""
+        self.started = time.time()
+        self.stats = {}
+    #@+node:ekr.20261018212936.4: *3* perf.handlerName
+    def handlerName(self, handler):
+        """Return the module and name of an idle-time handler."""
+        module = getattr(handler, '__module__', None) or '?'
+        name = getattr(handler, '__qualname__', None) or repr(handler)
+        return f"{module}.{name}"
+    #@+node:ekr.20261018212936.5: *3* perf.toDict
+    def toDict(self):
+        """Return the totals as a dict that can be written as json."""
+        return {
+            'started': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started)),
+            'elapsed': time.time() - self.started,
+            'stats': [
+                {'kind': kind, 'name': name, 'count': count, 'wall': wall, 'cpu': cpu}
+                    for (kind, name), (count, wall, cpu) in sorted(self.stats.items())
+            ],
+        }
+    #@+node:ekr.20261018212936.6: *3* perf.report
+    def report(self, kind=None, limit=20):
+        """
+        Return a report of the totals as a list of lines.
+
+        For each kind, show the limit names with the most wall time.
+        """
+        kinds = [kind] if kind else sorted(set(z[0] for z in self.stats))
+        result = [f"perf stats for the last {time.time() - self.started:.1f} sec."]
+        for kind in kinds:
+            items = [(key[1], val) for key, val in self.stats.items() if key[0] == kind]
+            items.sort(key=lambda z: z[1][1], reverse=True)
+            result.append('')
+            result.append(f"{kind:40} {'count':>7} {'wall ms':>10} {'cpu ms':>10} {'mean ms':>8}")
+            for name, (count, wall, cpu) in items[:limit]:
+                if len(name) > 40:
+                    name = '...' + name[-37:]
+                result.append(
+                    f"{name:40} {count:7} {wall*1000:10.1f} "
+                    f"{cpu*1000:10.1f} {wall*1000/count:8.2f}")
+            if len(items) > limit:
+                result.append(f"{len(items) - limit} more...")
+        return result
+    #@-others
+#@+node:ekr.20261018210609.1: ** class PluginClassDict (dict)
+class PluginClassDict(dict):
+    """
+    A dict whose values are importer or writer classes.
+
+    A value may also be a class path, "module:class", taken from the plugin
+    manifest. Getting such a value imports the module and replaces the path
+    by the class, or by None if the import fails.
+    """
+
+    def __getitem__(self, key):
+        val = dict.__getitem__(self, key)
+        if isinstance(val, str):
+            val = self.resolve(key, val)
+        return val
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def peek(self, key):
+        """Return the value for key, a class, class path or None, without importing anything."""
+        return dict.get(self, key)
+
+    def resolve(self, key, class_path):
+        """Import the class given by class_path and make it the value for key."""
+        module_name, class_name = class_path.split(':')
+        try:
+            m = importlib.import_module(module_name)
+            val = getattr(m, class_name)
+        except Exception:
+            g.warning(f"can not import {module_name}")
+            val = None
+        dict.__setitem__(self, key, val)
+        return val
+
+    def values(self):
+        return [self[key] for key in self]
 #@+node:ekr.20120223062418.10420: ** class PreviousSettings
 class PreviousSettings:
     """
@@ -4085,6 +4437,43 @@ def openUrl(event=None):
 def openUrlUnderCursor(event=None):
     """Open the url under the cursor."""
     return g.openUrlOnClick(event)
+#@+node:ekr.20261018212936.7: *3* clear/dump/show-perf-stats
+@g.command('clear-perf-stats')
+def clear_perf_stats(event):
+    """Clear the statistics shown by show-perf-stats."""
+    if g.app.perfStats:
+        g.app.perfStats.clear()
+
+@g.command('dump-perf-stats')
+def dump_perf_stats(event):
+    """Write the statistics shown by show-perf-stats to ~/.leo/perf-stats.json."""
+    perf = g.app.perfStats
+    if not perf:
+        g.es_print('perf stats are disabled: use --perf-stats or @bool perf-stats')
+        return
+    path = g.os_path_finalize_join(g.app.homeLeoDir, 'perf-stats.json')
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(perf.toDict(), f, indent=1)
+        g.es_print(f"wrote {path}")
+    except IOError:
+        g.es_print(f"can not write {path}")
+
+@g.command('show-perf-stats')
+def show_perf_stats(event):
+    """
+    Show the time spent in each command, hook handler, idle-time handler,
+    and file read or write.
+
+    The --perf-stats command-line option or @bool perf-stats = True enables
+    the statistics.
+    """
+    perf = g.app.perfStats
+    if not perf:
+        g.es_print('perf stats are disabled: use --perf-stats or @bool perf-stats')
+        return
+    for line in perf.report():
+        g.es_print(line)
 #@-others
 #@@language python
 #@@tabwidth -4
@@ -8,6 +8,7 @@
 #@+node:ekr.20041005105605.2: ** << imports >> (leoAtFile)
 import leo.core.leoGlobals as g
 import leo.core.leoNodes as leoNodes
+import hashlib
 import os
 import re
 import sys
@@ -54,7 +55,9 @@ class AtFile:
         self.cancelFlag = False
         self.yesToAll = False
         # User options: set in reloadSettings.
+        self.cacheAtFileReads = True
         self.checkPythonCodeOnWrite = False
+        self.readAtFilesInParallel = False
         self.runPyFlakesOnWrite = False
         self.underindentEscapeString = '\\-'
         self.reloadSettings()
@@ -62,8 +65,12 @@ class AtFile:
     def reloadSettings(self):
         """AtFile.reloadSettings"""
         c = self.c
+        self.cacheAtFileReads = c.config.getBool(
+            'cache-at-file-reads', default=True)
         self.checkPythonCodeOnWrite = c.config.getBool(
             'check-python-code-on-write', default=True)
+        self.readAtFilesInParallel = c.config.getBool(
+            'parallel-at-file-reads', default=False)
         self.runPyFlakesOnWrite = c.config.getBool(
             'run-pyflakes-on-write', default=False)
         self.underindentEscapeString = c.config.getString(
@@ -310,6 +317,19 @@ class AtFile:
             at._file_bytes = g.toEncodedString('')
             fn, s = None, None
         return fn, s
+    #@+node:ekr.20261018200710.8: *6* at.openScannedFile
+    def openScannedFile(self, scan_data):
+        """
+        Like at.openFileForReading, for a file that scan_external_file has
+        already read. Return (fn, '').
+        """
+        at, c = self, self.c
+        fn = g.fullPath(c, at.root)
+        at.setPathUa(at.root, fn)
+        at.encoding = scan_data[0]
+        at.initReadLine('')
+        at.warnOnReadOnlyFile(fn)
+        return fn, ''
     #@+node:ekr.20150204165040.4: *6* at.openAtShadowFileForReading
     def openAtShadowFileForReading(self, fn):
         """Open an @shadow for reading and return shadow_fn."""
@@ -328,9 +348,15 @@ class AtFile:
         return shadow_fn
     #@+node:ekr.20041005105605.21: *5* at.read & helpers
     def read(self, root, importFileName=None,
-        fromString=None, atShadow=False, force=False
+        fromString=None, atShadow=False, force=False,
+        scan_data=None, cached=None,
     ):
-        """Read an @thin or @file tree."""
+        """
+        Read an @thin or @file tree.
+
+        scan_data: The data returned by scan_external_file, or None.
+        cached:    The cache entry whose digest was given to scan_external_file.
+        """
         at, c = self, self.c
         fileName = at.initFileName(fromString, importFileName, root)
         if not fileName:
@@ -344,7 +370,10 @@ class AtFile:
         at.fromString = fromString
         if at.errors:
             return False
-        fileName, file_s = at.openFileForReading(fromString=fromString)
+        if scan_data:
+            fileName, file_s = at.openScannedFile(scan_data)
+        else:
+            fileName, file_s = at.openFileForReading(fromString=fromString)
         #
         # Set the time stamp.
         if fileName:
@@ -363,7 +392,13 @@ class AtFile:
                 # at.tab_width
         gnx2vnode = c.fileCommands.gnxDict
         contents = fromString or file_s
-        FastAtRead(c, gnx2vnode).read_into_root(contents, fileName, root)
+        use_cache = at.cacheAtFileReads and not fromString
+        if scan_data:
+            FastAtRead(c, gnx2vnode).read_scan_data(
+                scan_data, fileName, root, cached=cached, use_cache=use_cache)
+        else:
+            FastAtRead(c, gnx2vnode).read_into_root(
+                contents, fileName, root, use_cache=use_cache)
         root.clearDirty()
         return True
     #@+node:ekr.20100122130101.6174: *6* at.deleteTnodeList
@@ -478,8 +513,23 @@ class AtFile:
         t1 = time.time()
         c.init_error_dialogs()
         files = at.findFilesToRead(force, root)
-        for p in files:
-            at.readFileAtPosition(force, p)
+        db = g.app.db
+        batch = at.cacheAtFileReads and hasattr(db, 'begin_batch')
+        if batch:
+            # Commit all writes to the read cache at once.
+            db.begin_batch()
+        parallel = (
+            at.readAtFilesInParallel and len(files) > 1 and
+            (os.cpu_count() or 1) > 1)
+        try:
+            if parallel:
+                at.readFilesInParallel(force, files)
+            else:
+                for p in files:
+                    at.readFileAtPosition(force, p)
+        finally:
+            if batch:
+                db.end_batch()
         for p in files:
             p.v.clearDirty()
         if not g.unitTesting:
@@ -532,6 +582,8 @@ class AtFile:
     def readFileAtPosition(self, force, p):
         '''Read the @<file> node at p.'''
         at, c, fileName = self, self.c, p.anyAtFileNodeName()
+        perf = g.app.perfStats
+        t = perf and perf.start()
         if p.isAtThinFileNode() or p.isAtFileNode():
             at.read(p, force=force)
         elif p.isAtAutoNode():
@@ -544,6 +596,65 @@ class AtFile:
             at.rememberReadPath(g.fullPath(c, p), p)
         elif p.isAtCleanNode():
             at.readOneAtCleanNode(p)
+        if perf:
+            perf.stop(t, 'read', g.fullPath(c, p))
+    #@+node:ekr.20261018200806.1: *6* at.readFilesInParallel & helper
+    def readFilesInParallel(self, force, files):
+        """
+        Read all files in the list, scanning @file trees in a pool of workers.
+
+        The workers never change the outline. This method links their results
+        into the outline in the order given by the files list, so the result is
+        exactly the same as calling at.readFileAtPosition for each file.
+        """
+        at, c = self, self.c
+        encoding = c.config.default_derived_file_encoding
+        reader = FastAtRead(c, c.fileCommands.gnxDict)
+        futures = {}  # Keys are indices into files. Values are (future, cached).
+        with at.createReadExecutor() as executor:
+            for i, p in enumerate(files):
+                if p.isAtThinFileNode() or p.isAtFileNode():
+                    path = g.fullPath(c, p)
+                    cached = reader.get_cached_data(path, p) if at.cacheAtFileReads else None
+                    digest = cached[2] if cached else None
+                    future = executor.submit(scan_external_file, path, p.gnx, encoding, digest)
+                    futures[i] = future, cached
+            for i, p in enumerate(files):
+                scan_data = None
+                if i in futures:
+                    future, cached = futures.get(i)
+                    try:
+                        scan_data = future.result()
+                    except Exception:
+                        pass  # Read the file in the main thread.
+                if scan_data:
+                    # Only the main thread's time counts.
+                    perf = g.app.perfStats
+                    t = perf and perf.start()
+                    at.read(p, force=force, scan_data=scan_data, cached=cached)
+                    if perf:
+                        perf.stop(t, 'read', g.fullPath(c, p))
+                else:
+                    # at.read will report any errors.
+                    at.readFileAtPosition(force, p)
+    #@+node:ekr.20261018200806.2: *7* at.createReadExecutor
+    def createReadExecutor(self):
+        """
+        Return an executor for at.readFilesInParallel.
+
+        Scanning is cpu bound, so use processes if possible.
+
+        Spawn the workers: forking would copy the whole Leo process, including
+        a running gui and its threads. scan_external_file does not use g.app,
+        so spawned workers need no initialization.
+        """
+        import concurrent.futures as futures
+        import multiprocessing
+        try:
+            return futures.ProcessPoolExecutor(
+                mp_context=multiprocessing.get_context('spawn'))
+        except Exception:
+            return futures.ThreadPoolExecutor()
     #@+node:ekr.20080801071227.7: *5* at.readAtShadowNodes
     def readAtShadowNodes(self, p):
         '''Read all @shadow nodes in the p's tree.'''
@@ -1156,7 +1267,7 @@ class AtFile:
     def saveOutlineIfPossible(self):
         '''Save the outline if only persistence data nodes are dirty.'''
         c = self.c
-        changed_positions = [p for p in c.all_unique_positions() if p.v.isDirty()]
+        changed_positions = list(c.positions_where(lambda v: v.isDirty(), unique=True))
         at_persistence = (
             c.persistenceController and
             c.persistenceController.has_at_persistence_node()
@@ -1188,6 +1299,8 @@ class AtFile:
             at.writePathChanged(p)
         except IOError:
             return
+        perf = g.app.perfStats
+        t = perf and perf.start()
         # Tricky: @ignore not recognised in @asis nodes.
         if p.isAtAsisFileNode():
             at.asisWrite(p)
@@ -1204,11 +1317,13 @@ class AtFile:
             at.writeOneAtShadowNode(p)
         elif p.isAtThinFileNode() or p.isAtFileNode():
             at.write('@file', p)
+        if perf:
+            perf.stop(t, 'write', g.fullPath(at.c, p))
         #
         # Clear the dirty bits in all descendant nodes.
         # The persistence data may still have to be written.
-        for p2 in p.self_and_subtree(copy=False):
-            p2.v.clearDirty()
+        for v, depth in at.c.self_and_subtree_nodes(p):
+            v.clearDirty()
     #@+node:ekr.20190108105509.1: *7* at.writePathChanged
     def writePathChanged(self, p):
         '''
@@ -1463,8 +1578,9 @@ class AtFile:
         at = self
         d = g.app.atAutoWritersDict
         for key in d:
-            aClass = d.get(key)
-            if aClass and g.match_word(root.h, 0, key):
+            # Match first: d.get may import the class.
+            aClass = g.match_word(root.h, 0, key) and d.get(key)
+            if aClass:
 
                 def writer_for_at_auto_cb(root):
                     # pylint: disable=cell-var-from-loop
@@ -2704,8 +2820,9 @@ class AtFile:
             root.clearDirty()
         #
         # Create the timestamp (only for messages).
-        if c.config.getBool('log-show-save-time', default=False):
-            format = c.config.getString('log-timestamp-format') or "%H:%M:%S"
+        snapshot = c.config.snapshot
+        if snapshot.log_show_save_time:
+            format = snapshot.log_timestamp_format or "%H:%M:%S"
             timestamp = time.strftime(format) + ' '
         else:
             timestamp = ''
@@ -2742,8 +2859,8 @@ class AtFile:
             old_contents, contents)) or
             ignoreBlankLines and at.compareIgnoringBlankLines(old_contents, contents))
         if unchanged:
-            if not g.unitTesting and c.config.getBool(
-                'report-unchanged-files', default=True):
+            # The default is True.
+            if not g.unitTesting and snapshot.report_unchanged_files is not False:
                 g.es(f"{timestamp}unchanged: {sfn}")
             # Leo 5.6: Check unchanged files.
             at.checkPythonCode(contents, fileName, root, pyflakes_errors_only=True)
@@ -2799,26 +2916,36 @@ class AtFile:
 
     def warnAboutOrphandAndIgnoredNodes(self):
         # Always warn, even when language=="cweb"
-        at, root = self, self.root
+        at, c, root = self, self.c, self.root
         if at.errors:
             return  # No need to repeat this.
-        for p in root.self_and_subtree(copy=False):
-            if not p.v.isVisited():
-                at.writeError("Orphan node:  " + p.h)
-                if p.hasParent():
-                    g.blue("parent node:", p.parent().h)
-        p = root.copy()
-        after = p.nodeAfterTree()
-        while p and p != after:
-            if p.isAtAllNode():
-                p.moveToNodeAfterTree()
-            else:
-                # #1050: test orphan bit.
-                if p.isOrphan():
-                    at.writeError("Orphan node: " + p.h)
-                    if p.hasParent():
-                        g.blue("parent node:", p.parent().h)
-                p.moveToThreadNext()
+
+        def nodes():
+            """Yield (v, depth, parent_v) for root's tree, without positions."""
+            parents = [root.parent().v if root.hasParent() else None]
+            for v, depth in c.self_and_subtree_nodes(root):
+                del parents[depth + 1:]
+                yield v, depth, parents[depth]
+                parents.append(v)
+
+        for v, depth, parent_v in nodes():
+            if not v.isVisited():
+                at.writeError("Orphan node:  " + v.h)
+                if parent_v:
+                    g.blue("parent node:", parent_v.h)
+        skip = None
+            # The depth of the @all node whose tree is being skipped.
+        for v, depth, parent_v in nodes():
+            if skip is not None and depth > skip:
+                continue
+            skip = None
+            if v.isAtAllNode():
+                skip = depth
+            # #1050: test orphan bit.
+            elif v.isOrphan():
+                at.writeError("Orphan node: " + v.h)
+                if parent_v:
+                    g.blue("parent node:", parent_v.h)
     #@+node:ekr.20041005105605.217: *5* at.writeError
     def writeError(self, message):
         '''Issue an error while writing an @<file> node.'''
@@ -3138,11 +3265,19 @@ class FastAtRead:
     This is Vitalije's code, edited by EKR.
     '''
 
+    cache_version = 1
+        # Bump this whenever the format of cached data changes.
+
     def __init__(self, c, gnx2vnode, test=False, TestVNode=None):
         self.c = c
         assert gnx2vnode is not None
         self.gnx2vnode = gnx2vnode
             # The global fc.gnxDict. Keys are gnx's, values are vnodes.
+        self.bodies = {}
+            # Keys are gnx's, values are body text, in the order set by post_pass.
+        self.node_starts = []
+            # Entries are (gnx, head, level), one per @+node sentinel.
+        # scan_lines sets these lists. The read cache and parallel reads use them.
         self.path = None
         self.root = None
         self.VNode = TestVNode if test else leoNodes.VNode
@@ -3199,11 +3334,12 @@ class FastAtRead:
         else:
             assert root_v.gnx in gnx2vnode, root_v
             assert root_v.gnx in gnx2body, root_v
+            bodies = self.bodies
             for key in gnx2body:
                 body = gnx2body.get(key)
                 v = gnx2vnode.get(key)
                 assert v, (key, v)
-                v._bodyString = g.toUnicode(''.join(body))
+                v._bodyString = bodies[key] = g.toUnicode(''.join(body))
     #@+node:ekr.20180602103135.2: *3* fast_at.scan_header
     header_pattern = re.compile(
         r'''
@@ -3296,6 +3432,8 @@ class FastAtRead:
         root_v = parent_v
             # Does not change.
         level_stack.append((root_v, False),)
+        node_starts = self.node_starts
+            # Entries are (gnx, head, level). Used only by the read cache.
         #
         # Init the gnx dict last.
         #
@@ -3431,6 +3569,7 @@ class FastAtRead:
                 gnx, head = m.group(2), m.group(5)
                 level = int(m.group(3)) if m.group(3) else 1 + len(m.group(4))
                     # m.group(3) is the level number, m.group(4) is the number of stars.
+                node_starts.append((gnx, head, level),)
                 v = gnx2vnode.get(gnx)
                 #
                 # Case 1: The root @file node. Don't change the headline.
@@ -3704,11 +3843,175 @@ class FastAtRead:
             gnx2body[root_gnx] = gnx2body[root_gnx] + last_lines
         self.post_pass(gnx2body, gnx2vnode, root_v)
         return root_v, last_lines
+    #@+node:ekr.20261018200420.1: *3* fast_at: read cache
+    # The read cache lives in g.app.db. Keys are full paths to external files.
+    #
+    # Values are (version, root_gnx, digest, node_starts, bodies), where:
+    # - digest is the md5 hash of the file's contents.
+    # - node_starts is the list of (gnx, head, level) tuples seen by scan_lines.
+    # - bodies is a dict: keys are gnx's, values are body text.
+    #
+    # Replaying the node_starts recreates the tree exactly as scan_lines would.
+    #@+node:ekr.20261018200420.2: *4* fast_at.cache_key & digest
+    def cache_key(self, path):
+        """Return the g.app.db key for the external file at path."""
+        return f"{path}:::fast-at-read"
+
+    def digest(self, contents):
+        """Return the hash of the contents of an external file."""
+        return hashlib.md5(g.toEncodedString(contents)).hexdigest()
+    #@+node:ekr.20261018200710.1: *4* fast_at.get_cached_data
+    def get_cached_data(self, path, root):
+        """
+        Return the valid entry for path in the read cache, or None.
+
+        The caller must compare the entry's digest with the file's digest.
+        """
+        try:
+            data = g.app.db.get(self.cache_key(path))
+            if not data:
+                return None
+            version, root_gnx, digest, node_starts, bodies = data
+            if version == self.cache_version and root_gnx == root.gnx:
+                return data
+        except Exception:
+            # Never let a bad cache entry prevent a real read.
+            pass
+        return None
+    #@+node:ekr.20261018200420.3: *4* fast_at.read_from_cache
+    def read_from_cache(self, contents, path, root):
+        """
+        Recreate root's tree from g.app.db if the contents of the file at
+        path have not changed since they were last scanned.
+
+        Return True if the tree was recreated.
+        """
+        data = self.get_cached_data(path, root)
+        if not data or data[2] != self.digest(contents):
+            return False
+        self.path = path
+        self.root = root
+        self.link_data(data[3], data[4])
+        return True
+    #@+node:ekr.20261018200710.2: *4* fast_at.link_data
+    def link_data(self, node_starts, bodies):
+        """
+        Recreate self.root's tree from the data created by scan_lines,
+        without scanning any lines.
+        """
+        self.root.v._deleteAllChildren()
+        self.replay_node_starts(node_starts)
+        gnx2vnode = self.gnx2vnode
+        for gnx, body in bodies.items():
+            gnx2vnode[gnx]._bodyString = body
+    #@+node:ekr.20261018200420.4: *4* fast_at.replay_node_starts
+    def replay_node_starts(self, node_starts):
+        """
+        Link vnodes exactly as scan_lines does when it sees @+node
+        sentinels, without scanning any lines.
+        """
+        context, gnx2vnode = self.c, self.gnx2vnode
+        root_v = self.root.v
+        gnx2vnode[root_v.gnx] = root_v
+        level_stack = [(root_v, False)]
+        root_seen = False
+        for gnx, head, level in node_starts:
+            v = gnx2vnode.get(gnx)
+            # Case 1: The root @file node. Don't change the headline.
+            if not root_seen:
+                root_seen = True
+                if not v:
+                    v = root_v
+                    gnx2vnode[gnx] = v
+                    v.fileIndex = gnx
+                v.children = []
+                continue
+            # Case 2: We are scanning the descendants of a clone.
+            parent_v, clone_v = level_stack[level - 2]
+            if v and clone_v:
+                v._headString = head
+                level_stack = level_stack[: level - 1]
+                level_stack.append((v, clone_v),)
+                v.children = []
+                parent_v.children.append(v)
+                continue
+            # Case 3: we are not already scanning the descendants of a clone.
+            if v:
+                clone_v = v
+                v.children = []
+            else:
+                v = self.VNode(context=context, gnx=gnx)
+            gnx2vnode[gnx] = v
+            v._headString = head
+            level_stack = level_stack[: level - 1]
+            level_stack.append((v, clone_v),)
+            parent_v.children.append(v)
+            v.parents.append(parent_v)
+    #@+node:ekr.20261018200420.5: *4* fast_at.write_to_cache
+    def write_to_cache(self, digest, path, root_gnx, node_starts, bodies):
+        """
+        Save the data created by scan_lines in g.app.db.
+
+        root_gnx: the root's gnx *before* the scan. scan_lines changes the
+                  root's gnx to the gnx in the file's first @+node sentinel.
+        """
+        data = (self.cache_version, root_gnx, digest, node_starts, bodies)
+        try:
+            g.app.db[self.cache_key(path)] = data
+        except Exception:
+            g.es_exception()
+    #@+node:ekr.20261018200710.3: *3* fast_at: parallel reads
+    # at.readAll uses these methods to scan @file trees in worker processes.
+    #
+    # Workers call scan_external_file, which never touches the outline. It
+    # returns (encoding, digest, node_starts, bodies). The main thread then
+    # calls read_scan_data to link the tree, exactly as read_into_root would.
+    #@+node:ekr.20261018200710.4: *4* fast_at.read_scan_data
+    def read_scan_data(self, scan_data, path, root, cached=None, use_cache=False):
+        """
+        Create root's tree from the data returned by scan_external_file.
+
+        cached: The entry from get_cached_data, whose digest was passed to
+                scan_external_file, or None.
+        """
+        encoding, digest, node_starts, bodies = scan_data
+        self.path = path
+        self.root = root
+        if node_starts is None:
+            # The file's digest matched the digest in the cache.
+            node_starts, bodies = cached[3], cached[4]
+        elif use_cache:
+            self.write_to_cache(digest, path, root.gnx, node_starts, bodies)
+        self.link_data(node_starts, bodies)
+        return True
+    #@+node:ekr.20261018200710.5: *4* fast_at.scan_data
+    def scan_data(self, contents, path, root_gnx):
+        """
+        Scan contents without changing any vnodes in the outline.
+
+        Return (node_starts, bodies), or (None, None) if the contents are
+        not a valid external file.
+        """
+        self.VNode = ScanVNode
+        self.path = path
+        self.root = g.Bunch(gnx=root_gnx, v=ScanVNode(None, root_gnx))
+        lines = g.splitLines(contents)
+        data = self.scan_header(lines)
+        if not data:
+            return None, None
+        delims, first_lines, start_i = data
+        root_v, last_lines = self.scan_lines(
+            delims, first_lines, lines, path, start_i)
+        if not root_v:
+            return None, None
+        return self.node_starts, self.bodies
     #@+node:ekr.20180603170614.1: *3* fast_at.read_into_root
-    def read_into_root(self, contents, path, root):
+    def read_into_root(self, contents, path, root, use_cache=False):
         '''
         Parse the file's contents, creating a tree of vnodes
         anchored in root.v.
+
+        use_cache: True: use g.app.db to avoid scanning unchanged files.
         '''
         trace = False
         t1 = time.process_time()
@@ -3716,6 +4019,11 @@ class FastAtRead:
         self.root = root
         sfn = g.shortFileName(path)
         contents = contents.replace('\r', '')
+        if use_cache and self.read_from_cache(contents, path, root):
+            if trace:
+                t2 = time.process_time()
+                g.trace(f"{t2 - t1:5.2f} sec. (cached) {path}")
+            return True
         lines = g.splitLines(contents)
         data = self.scan_header(lines)
         if not data:
@@ -3725,12 +4033,78 @@ class FastAtRead:
         # Previously, this had been done in readOpenFile.
         root.v._deleteAllChildren()
         delims, first_lines, start_i = data
-        self.scan_lines(delims, first_lines, lines, path, start_i)
+        root_gnx = root.gnx
+        root_v, last_lines = self.scan_lines(
+            delims, first_lines, lines, path, start_i)
+        if use_cache and root_v:
+            self.write_to_cache(
+                self.digest(contents), path, root_gnx, self.node_starts, self.bodies)
         if trace:
             t2 = time.process_time()
             g.trace(f"{t2 - t1:5.2f} sec. {path}")
         return True
     #@-others
+#@+node:ekr.20261018200710.6: ** class ScanVNode
+class ScanVNode:
+    """
+    A minimal stand-in for leoNodes.VNode, used by FastAtRead.scan_data.
+
+    Unlike VNode.__init__, this ctor does not update c.fileCommands.gnxDict,
+    so FastAtRead can scan external files in any thread or process.
+    """
+
+    def __init__(self, context, gnx):
+        self._bodyString = ''
+        self._headString = ''
+        self.children = []
+        self.fileIndex = gnx
+        self.parents = []
+
+    @property
+    def gnx(self):
+        return self.fileIndex
+
+    @property
+    def h(self):
+        return self._headString
+#@+node:ekr.20261018200710.7: ** function: scan_external_file
+def scan_external_file(path, root_gnx, default_encoding, cached_digest=None):
+    """
+    Read and scan the external file at path without changing the outline.
+
+    This function is safe to call in any thread or worker process.
+
+    Return None if the file can not be read or is not a valid external file.
+    Otherwise return (encoding, digest, node_starts, bodies). node_starts
+    and bodies are None if the file's digest matches cached_digest.
+    """
+    try:
+        with open(path, 'rb') as f:
+            s = f.read()
+    except Exception:
+        return None
+    # Compute the encoding as at.readFileToUnicode does.
+    encoding, s = g.stripBOM(s)
+    if not encoding:
+        s_temp = g.toUnicode(s, 'ascii', reportErrors=False)
+        i = s_temp.find('@+leo')
+        line = g.get_line(s_temp, i) if i > -1 else ''
+        m = FastAtRead.header_pattern.match(line)
+        encoding = m and m.group(6)
+        if encoding and encoding.endswith(','):
+            encoding = encoding[:-1]
+        if not encoding or not g.isValidEncoding(encoding):
+            encoding = default_encoding
+    contents = g.toUnicode(s, encoding=encoding)
+    contents = contents.replace('\r\n', '\n').replace('\r', '')
+    x = FastAtRead(c=None, gnx2vnode={})
+    digest = x.digest(contents)
+    if digest == cached_digest:
+        return encoding, digest, None, None
+    node_starts, bodies = x.scan_data(contents, path, root_gnx)
+    if node_starts is None:
+        return None
+    return encoding, digest, node_starts, bodies
 #@+node:ekr.20200204092455.1: ** class TestAtFile
 class TestAtFile(unittest.TestCase):
     #@+others
@@ -3759,6 +4133,76 @@ class TestAtFile(unittest.TestCase):
         warnings.simplefilter("ignore")
         import tempfile
         return tempfile.NamedTemporaryFile(mode='w')
+    #@+node:ekr.20261018200420.6: *3* TestAtFile.test_fast_at_read_cache
+    def test_fast_at_read_cache(self):
+        """Test that cached reads recreate the tree created by scan_lines."""
+        import os
+        bridge = self.bridge()
+        temp_dir = self.temp_dir()
+        c = bridge.openLeoFile(f"{temp_dir.name}{os.sep}test_file.leo")
+        root = c.rootPosition()
+        root.h = '@file cache_test.py'
+        root.b = '@others\n'
+        child = root.insertAsLastChild()
+        child.h = 'child'
+        child.b = 'def spam():\n    @others\n'
+        grandchild = child.insertAsLastChild()
+        grandchild.h = 'grandchild'
+        grandchild.b = 'pass\n'
+        clone = grandchild.clone()
+        clone.moveToLastChildOf(root)
+        contents = c.atFileCommands.atFileToString(root)
+        path = f"{temp_dir.name}{os.sep}cache_test.py"
+
+        def dump():
+            return [(z.gnx, z.h, z.b, z.level()) for z in root.self_and_subtree()]
+
+        expected = dump()
+        gnx2vnode = c.fileCommands.gnxDict
+        old_db = g.app.db
+        g.app.db = {}
+        try:
+            assert not FastAtRead(c, gnx2vnode).read_from_cache(contents, path, root)
+            FastAtRead(c, gnx2vnode).read_into_root(contents, path, root, use_cache=True)
+            assert dump() == expected
+            assert FastAtRead(c, gnx2vnode).read_from_cache(contents, path, root)
+            assert dump() == expected
+            # The cache must not be used when the file changes.
+            contents2 = contents.replace('pass', 'return')
+            assert not FastAtRead(c, gnx2vnode).read_from_cache(contents2, path, root)
+        finally:
+            g.app.db = old_db
+    #@+node:ekr.20261018201101.1: *3* TestAtFile.test_read_files_in_parallel
+    def test_read_files_in_parallel(self):
+        """Test that parallel reads create the same outline as serial reads."""
+        import os
+        bridge = self.bridge()
+        temp_dir = self.temp_dir()
+        c = bridge.openLeoFile(f"{temp_dir.name}{os.sep}test_file.leo")
+        p = c.rootPosition()
+        for i in range(3):
+            if i > 0:
+                p = p.insertAfter()
+            p.h = f"@file parallel_{i}.py"
+            p.b = '@others\n'
+            for j in range(3):
+                child = p.insertAsLastChild()
+                child.h = f"child {j}"
+                child.b = f"# child {j} of file {i}\n"
+        clone = c.rootPosition().firstChild().clone()
+        clone.moveToLastChildOf(p)
+        c.save()
+        at = c.atFileCommands
+        at.cacheAtFileReads = False
+
+        def dump():
+            return [(z.gnx, z.h, z.b, z.level()) for z in c.all_positions()]
+
+        expected = dump()
+        files = at.findFilesToRead(force=False, root=c.rootPosition())
+        assert len(files) == 3, files
+        at.readFilesInParallel(False, files)
+        assert dump() == expected
     #@+node:ekr.20200204094139.1: *3* TestAtFile.test_save_after_external_file_rename
     def test_save_after_external_file_rename(self):
         """Test #1469."""
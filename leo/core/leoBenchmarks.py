@@ -0,0 +1,1321 @@
+#@+leo-ver=5-thin
+#@+node:ekr.20261018201053.1: * @file leoBenchmarks.py
+"""
+Benchmarks for Leo's core, run with the leoBridge module.
+
+Usage: python -m leo.core.leoBenchmarks [--list] [name1 name2 ...]
+
+With no names, run all benchmarks.
+
+Usage: python -m leo.core.leoBenchmarks --suite [--json report.json]
+       [--compare old_report.json] [suite options]
+
+Time core operations on a synthetic outline. The suite options describe
+the outline. See scanOptions for details.
+
+**Important**: Leo's core does not use this module in any way.
+"""
+import leo.core.leoBridge as leoBridge
+import optparse
+import os
+import sys
+import tempfile
+import time
+import weakref
+# Do not define g here.  Use the g returned by the bridge.
+benchmarks = {}
+    # Keys are benchmark names, values are functions f(bridge, g).
+#@+others
+#@+node:ekr.20261018201053.2: ** main & helpers
+def main():
+    """The main line of leoBenchmarks.py."""
+    options, names = scanOptions()
+    if options.list:
+        for name in sorted(benchmarks):
+            print(f"{name:20} {benchmarks.get(name).__doc__.strip()}")
+        return
+    bridge = leoBridge.controller(gui='nullGui',
+        loadPlugins=False,
+        readSettings=False,
+        silent=True,
+        verbose=False,
+    )
+    g = bridge.globals()
+    if options.suite or options.json or options.compare:
+        run_suite(bridge, g, options)
+        return
+    for name in names or sorted(benchmarks):
+        func = benchmarks.get(name)
+        if func:
+            print(f"\n{name}...\n")
+            func(bridge, g)
+        else:
+            print(f"unknown benchmark: {name}")
+#@+node:ekr.20261018201053.3: *3* scanOptions (leoBenchmarks.py)
+def scanOptions():
+    """Handle all options and remove them from sys.argv."""
+    parser = optparse.OptionParser(
+        usage="usage: python -m leo.core.leoBenchmarks [options] name1 name2 ...")
+    add = parser.add_option
+    add('--list', action='store_true', dest='list',
+        help='list all benchmarks')
+    # The suite.
+    add('--suite', action='store_true', dest='suite',
+        help='run the suite instead of the benchmarks')
+    add('--json', dest='json',
+        help="write the suite's report to this file")
+    add('--compare', dest='compare',
+        help="compare the suite's results with this report")
+    add('--threshold', dest='threshold', type='float', default=1.2,
+        help='--compare fails if any operation is this many times slower')
+    add('--repeat', dest='repeat', type='int', default=3,
+        help='report the best of this many runs of each operation')
+    # The suite's synthetic outline.
+    add('--seed', dest='seed', type='int', default=1,
+        help='the seed of the random outline')
+    add('--nodes', dest='nodes', type='int', default=10000,
+        help='the number of nodes, not counting clones')
+    add('--depth', dest='depth', type='int', default=4,
+        help='the maximum depth of the outline')
+    add('--clone-ratio', dest='clone_ratio', type='float', default=0.02,
+        help='the number of clones, as a fraction of nodes')
+    add('--body-lines', dest='body_lines', type='int', default=10,
+        help='the average number of lines in each body')
+    add('--at-files', dest='at_files', type='int', default=10,
+        help='the number of @file trees')
+    options, args = parser.parse_args()
+    sys.argv = [sys.argv[0]]
+    return options, args
+#@+node:ekr.20261018201053.4: ** Utils
+#@+node:ekr.20261018201053.5: *3* benchmark (decorator)
+def benchmark(name):
+    """A decorator that registers a benchmark with the given name."""
+
+    def decorator(func):
+        benchmarks[name] = func
+        return func
+
+    return decorator
+#@+node:ekr.20261018201053.6: *3* dump_outline
+def dump_outline(c):
+    """Return a list describing all positions of c's outline."""
+    return [(p.gnx, p.h, p.b, p.level()) for p in c.all_positions()]
+#@+node:ekr.20261018201053.7: *3* make_at_file_outline
+def make_at_file_outline(c, n_files, n_nodes, n_lines):
+    """
+    Replace c's outline by n_files @file nodes.
+
+    Each @file node has n_nodes children, each with n_lines of body text.
+    """
+    root = c.rootPosition()
+    while root.hasNext():
+        root.next().doDelete()
+    root.deleteAllChildren()
+    p = root
+    for i in range(n_files):
+        if i > 0:
+            p = p.insertAfter()
+        p.h = f"@file file_{i}.py"
+        p.b = f'"""File {i}"""\n@others\n'
+        for j in range(n_nodes):
+            child = p.insertAsLastChild()
+            child.h = f"function_{j}"
+            child.b = f"def function_{j}(a, b):\n" + ''.join(
+                f"    a = b + {k}  # line {k}\n" for k in range(n_lines))
+    c.selectPosition(c.rootPosition())
+#@+node:ekr.20261018205832.2: *3* make_import_corpus
+# A snippet of source code for each language. {i} is a serial number.
+# The snippets contain strings, escapes and comments with brackets.
+import_corpus = {
+    '.c': (
+        '/* Block comment {i}\n   "not a string" { */\n'
+        'static int function_{i}(int a, char *s) {\n'
+        '    char c = \'\\\'\', *t = "a \\"quoted\\" {string}";  // comment (\n'
+        '    if (a > {i}) { return a[{i}] + (s[0] == \'{\'); }\n'
+        '    return 0;\n'
+        '}\n\n'
+    ),
+    '.coffee': (
+        'class Class{i}\n'
+        '  method_{i}: (a, b) ->\n'
+        '    s = "string { #{a} \\" escaped"  # comment {i}\n'
+        '    ###\n    block comment ( [\n    ###\n'
+        '    [a, b] = [b, a]\n'
+        '    return {a: b}\n\n'
+    ),
+    '.cs': (
+        'namespace N{i} {\n'
+        '    class C{i} {\n'
+        '        // comment {\n'
+        '        string s = "a \\" { string";\n'
+        '        int f(int a) { return a * {i}; }\n'
+        '        /* block } comment */\n'
+        '    }\n'
+        '}\n'
+    ),
+    '.dart': (
+        '// comment {i}\n'
+        'int f{i}(int a) {\n'
+        '  var s = \'a \\\' { string\';  // comment }\n'
+        '  return a + {i};\n'
+        '}\n\n'
+    ),
+    '.el': (
+        ';;; comment ( {i}\n'
+        '(defun function-{i} (a b)\n'
+        '  "Docstring ( with \\" parens."\n'
+        '  (let ((c (+ a b {i})))\n'
+        '    (message "%s" c)))\n\n'
+    ),
+    '.java': (
+        'public class C{i} {\n'
+        '    /* comment { */\n'
+        '    public int f{i}(int a) {\n'
+        '        String s = "a \\" { string"; // comment }\n'
+        '        char c = \'{\';\n'
+        '        return a + {i};\n'
+        '    }\n'
+        '}\n\n'
+    ),
+    '.lua': (
+        '-- comment {i} (\n'
+        'function f{i}(a, b)\n'
+        '    local s = "a \\" string ["\n'
+        '    --[[ long\n    comment ]]\n'
+        '    local t = {a, b, {i}}\n'
+        '    return t[1]\n'
+        'end\n\n'
+    ),
+    '.pas': (
+        '{ comment {i} }\n'
+        'procedure P{i}(a: integer);\n'
+        'begin\n'
+        '    writeln(\'a \'\' string (\');  // comment\n'
+        'end;\n\n'
+    ),
+    '.pl': (
+        '# comment {i} {\n'
+        'sub f{i} {\n'
+        '    my ($a, $b) = @_;\n'
+        '    my $s = "a \\" { string";\n'
+        '    return $a + {i};\n'
+        '}\n\n'
+    ),
+    '.php': (
+        '<?php\n'
+        'function f{i}($a) {\n'
+        '    $s = "a \\" { string"; // comment }\n'
+        '    $t = <<<EOT\n'
+        'here doc { {i}\n'
+        'EOT;\n'
+        '    return $a + {i};\n'
+        '}\n'
+        '?>\n'
+    ),
+    '.py': (
+        'class Class{i}:\n'
+        '    """Docstring {i} with \'quotes\' and (parens."""\n'
+        '    def method_{i}(self, a, b=[1, 2]):\n'
+        '        s = \'a \\\' string {\'  # comment (\n'
+        '        t = """\n        triple {i}\n        """\n'
+        '        return {a: (b, s, t)}\n\n'
+    ),
+    '.rs': (
+        '// comment {i} {\n'
+        'fn f{i}(a: i32) -> i32 {\n'
+        '    let s = "a \\" { string";\n'
+        '    /* block { comment */\n'
+        '    a + {i}\n'
+        '}\n\n'
+    ),
+    '.tcl': (
+        '# comment {i} {\n'
+        'proc p{i} {a b} {\n'
+        '    set s "a \\" { string"\n'
+        '    return [expr {$a + {i}}]\n'
+        '}\n\n'
+    ),
+    '.ts': (
+        '// comment {i} {\n'
+        'export class C{i} {\n'
+        '    f{i}(a: number): number {\n'
+        '        const s = "a \\" { string";  /* block } */\n'
+        '        return a + {i};\n'
+        '    }\n'
+        '}\n\n'
+    ),
+    '.js': (
+        '// comment {i} {\n'
+        'function f{i}(a, b) {\n'
+        '    var s = "a \\" { string", r = /[{]/g;  /* block } */\n'
+        '    return a + {i};\n'
+        '}\n\n'
+    ),
+}
+
+def make_import_corpus(ext, n_lines):
+    """Return about n_lines lines of source code for the given file extension."""
+    template = import_corpus[ext]
+    result, n, i = [], 0, 0
+    while n < n_lines:
+        s = template.replace('{i}', str(i))
+        result.append(s)
+        n += s.count('\n')
+        i += 1
+    return ''.join(result)
+#@+node:ekr.20261018201053.8: *3* time_it
+def time_it(func, repeat=3, cleanup=None):
+    """
+    Return the best time, in seconds, of repeat calls to func().
+
+    Call cleanup(), if given, after each call, without timing it.
+    """
+    best = None
+    for i in range(repeat):
+        t1 = time.perf_counter()
+        func()
+        t2 = time.perf_counter()
+        best = t2 - t1 if best is None else min(best, t2 - t1)
+        if cleanup:
+            cleanup()
+    return best
+#@+node:ekr.20261018201100.1: ** Benchmarks
+#@+node:ekr.20261018201100.2: *3* bench_parallel_reads
+@benchmark('parallel-reads')
+def bench_parallel_reads(bridge, g):
+    """Read many @file trees serially and in parallel."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        c = bridge.openLeoFile(os.path.join(temp_dir, 'parallel_reads.leo'))
+        make_at_file_outline(c, n_files=400, n_nodes=50, n_lines=20)
+        c.save()
+        at, root = c.atFileCommands, c.rootPosition()
+        at.cacheAtFileReads = False
+        results = {}
+        for parallel in (False, True):
+            at.readAtFilesInParallel = parallel
+            t = time_it(lambda: at.readAll(root))
+            results[parallel] = t, dump_outline(c)
+        c.close()
+    serial_t, serial_outline = results[False]
+    parallel_t, parallel_outline = results[True]
+    assert serial_outline == parallel_outline, 'outlines differ'
+    print(f"  serial: {serial_t:6.3f} sec.")
+    print(f"parallel: {parallel_t:6.3f} sec. speedup: {serial_t/parallel_t:4.2f}x")
+#@+node:ekr.20261018202602.1: *3* bench_directives
+@benchmark('directives')
+def bench_directives(bridge, g):
+    """Compute the paths of @file nodes in a deep outline."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        c = bridge.openLeoFile(os.path.join(temp_dir, 'directives.leo'))
+        body = ''.join(f"line {k}\n" for k in range(50))
+        p = c.rootPosition()
+        p.h = 'level 0'
+        for depth in range(1, 40):
+            p = p.insertAsLastChild()
+            p.h = f"level {depth}"
+            p.b = body + (f"@path dir_{depth}\n" if depth % 10 == 0 else '')
+            for i in range(25):
+                child = p.insertAsNthChild(0)
+                child.h = f"@file file_{depth}_{i}.py"
+                child.b = '@language python\n@tabwidth -4\n' + body
+        files = [z.copy() for z in c.all_positions() if z.isAtFileNode()]
+        results = {}
+        for cached in (False, True):
+            c.directivesCache = weakref.WeakKeyDictionary() if cached else None
+            c.pathCache = {} if cached else None
+            paths = [g.fullPath(c, z) for z in files]  # Fill the caches.
+            t = time_it(lambda: [g.fullPath(c, z) for z in files])
+            results[cached] = t, paths
+        c.close()
+    uncached_t, uncached_paths = results[False]
+    cached_t, cached_paths = results[True]
+    assert uncached_paths == cached_paths, 'paths differ'
+    print(f"{len(files)} @file nodes at depths 1 to 39")
+    print(f"uncached: {uncached_t:6.3f} sec.")
+    print(f"  cached: {cached_t:6.3f} sec. speedup: {uncached_t/cached_t:4.2f}x")
+#@+node:ekr.20261018203007.4: *3* bench_traversal
+@benchmark('traversal')
+def bench_traversal(bridge, g):
+    """Compare the per-node cost of position and vnode generators."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        c = bridge.openLeoFile(os.path.join(temp_dir, 'traversal.leo'))
+        p = c.rootPosition()
+        for i in range(50):
+            if i > 0:
+                p = p.insertAfter()
+            p.h = f"organizer {i}"
+            for j in range(40):
+                child = p.insertAsLastChild()
+                child.h = f"node {i}.{j}"
+                for k in range(20):
+                    child.insertAsLastChild().h = f"leaf {i}.{j}.{k}"
+        # Clone a few subtrees so the unique generators have work to do.
+        for i in range(5, 50, 5):
+            target = c.rootPosition()
+            for j in range(i):
+                target.moveToNext()
+            clone = c.rootPosition().firstChild().clone()
+            clone.moveToLastChildOf(target)
+        # The generators must agree.
+        assert list(c.all_nodes_with_depth()) == [
+            (z.v, z.level()) for z in c.all_positions()], 'all_nodes_with_depth'
+        assert list(c.all_nodes_with_parents()) == [
+            (z.v, z.parent().v if z.hasParent() else c.hiddenRootNode, z.childIndex())
+                for z in c.all_positions()], 'all_nodes_with_parents'
+        assert list(c.all_unique_nodes()) == [
+            z.v for z in c.all_unique_positions()], 'all_unique_nodes'
+        root = c.rootPosition()
+        assert list(c.self_and_subtree_nodes(root)) == [
+            (z.v, z.level()) for z in root.self_and_subtree()], 'self_and_subtree_nodes'
+        n = len(list(c.all_nodes()))
+        n_unique = len(list(c.all_unique_nodes()))
+        tests = (
+            ('c.all_positions()', n, lambda: list(c.all_positions())),
+            ('c.all_positions(copy=False)', n, lambda: list(c.all_positions(copy=False))),
+            ('c.all_nodes_with_depth()', n, lambda: list(c.all_nodes_with_depth())),
+            ('c.all_nodes_with_parents()', n, lambda: list(c.all_nodes_with_parents())),
+            ('c.all_unique_positions(copy=False)', n_unique,
+                lambda: list(c.all_unique_positions(copy=False))),
+            ('c.all_unique_nodes()', n_unique, lambda: list(c.all_unique_nodes())),
+        )
+        results = [(name, count, time_it(func)) for name, count, func in tests]
+        c.close()
+    base_t = results[0][2]
+    print(f"{n} positions, {n_unique} unique vnodes")
+    for name, count, t in results:
+        print(f"{name:35} {t:6.3f} sec. {1e9*t/count:7.1f} ns/node {base_t/t:6.2f}x")
+#@+node:ekr.20261018203240.3: *3* bench_unl_lookup
+@benchmark('unl-lookup')
+def bench_unl_lookup(bridge, g):
+    """Find positions from UNLs and vnodes in a wide outline."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        c = bridge.openLeoFile(os.path.join(temp_dir, 'unl_lookup.leo'))
+        p = c.rootPosition()
+        for i in range(20):
+            if i > 0:
+                p = p.insertAfter()
+            p.v.h = f"organizer {i}"
+            for j in range(2000):
+                child = p.insertAsLastChild()
+                child.v.h = f"node {i}.{j}"
+                for k in range(4):
+                    child.insertAsLastChild().v.h = f"leaf {i}.{j}.{k}"
+        targets = [z.copy() for z in c.all_positions() if z.h.endswith('.3')][::50]
+        unls = [z.get_UNL(with_file=False).split('-->') for z in targets]
+        nodes = [z.v for z in targets]
+        n = len(list(c.all_nodes()))
+        results = {}
+        for indexed in (False, True):
+            c.unlIndex = weakref.WeakKeyDictionary() if indexed else None
+            c.childIndexCache = weakref.WeakKeyDictionary() if indexed else None
+            found = [g.recursiveUNLFind(z, c)[2] for z in unls]  # Build the indices.
+            assert found == targets, 'wrong positions'
+            assert [c.vnode2position(z) for z in nodes] == targets, 'vnode2position'
+            unl_t = time_it(lambda: [g.recursiveUNLFind(z, c) for z in unls])
+            v2p_t = time_it(lambda: [c.vnode2allPositions(z) for z in nodes])
+            results[indexed] = unl_t, v2p_t
+        c.close()
+    print(f"{n} nodes, {len(unls)} lookups")
+    for i, name in enumerate(('g.recursiveUNLFind', 'c.vnode2allPositions')):
+        plain_t, indexed_t = results[False][i], results[True][i]
+        print(f"{name:22} plain: {plain_t:6.3f} sec. indexed: {indexed_t:6.3f} sec."
+            f" speedup: {plain_t/indexed_t:6.2f}x")
+#@+node:ekr.20261018204329.4: *3* bench_streaming_read
+@benchmark('streaming-read')
+def bench_streaming_read(bridge, g):
+    """Read a large .leo file with and without streaming."""
+    import leo.core.leoFileCommands as leoFileCommands
+    import tracemalloc
+    n_organizers, n_nodes = 400, 500
+    body = ''.join(f"    a = b + {k}  # &lt;line {k}&gt; &amp; more\n" for k in range(12))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        fileName = os.path.join(temp_dir, 'streaming_read.leo')
+        # Write the file directly: creating the outline would take too long.
+        with open(fileName, 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0" encoding="utf-8"?>\n'
+                '<leo_file xmlns:leo="http://leoeditor.com/namespaces/leo-python-editor/1.1">\n'
+                '<leo_header file_format="2"/>\n<vnodes>\n')
+            for i in range(n_organizers):
+                f.write(f'<v t="bench.{i}"><vh>organizer {i}</vh>\n')
+                f.writelines(f'<v t="bench.{i}.{j}"><vh>node {i}.{j}</vh></v>\n'
+                    for j in range(n_nodes))
+                f.write('</v>\n')
+            f.write('</vnodes>\n<tnodes>\n')
+            for i in range(n_organizers):
+                f.writelines(f'<t tx="bench.{i}.{j}">{body}</t>\n' for j in range(n_nodes))
+            f.write('</tnodes>\n</leo_file>\n')
+        size = os.path.getsize(fileName)
+        c = bridge.openLeoFile(os.path.join(temp_dir, 'empty.leo'))
+        results = {}
+        for streaming in (False, True):
+
+            def read():
+                fc = c.fileCommands
+                fc.initReadIvars()
+                fc.gnxDict = {}
+                fast = leoFileCommands.FastRead(c, fc.gnxDict)
+                return fast.readFile(fileName, streaming=streaming)
+
+            tracemalloc.start()
+            hidden_v = read()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            outline = [(v.gnx, v.h, v.b) for z in hidden_v.children for v in [z] + z.children]
+            hidden_v = None
+            t = time_it(read, repeat=1)
+            results[streaming] = t, peak, outline
+        c.close()
+    tree_t, tree_peak, tree_outline = results[False]
+    stream_t, stream_peak, stream_outline = results[True]
+    assert tree_outline == stream_outline, 'outlines differ'
+    print(f"{size/1e6:.1f} MB, {n_organizers * (n_nodes + 1)} nodes")
+    print(f"ElementTree: {tree_t:6.3f} sec. peak memory: {tree_peak/1e6:7.1f} MB")
+    print(f"iterparse:   {stream_t:6.3f} sec. peak memory: {stream_peak/1e6:7.1f} MB")
+#@+node:ekr.20261018204832.3: *3* bench_find
+@benchmark('find')
+def bench_find(bridge, g):
+    """Find all matches in a large body, forward and backward."""
+    import re
+    c = bridge.openLeoFile(None)
+    find = c.findCommands
+    s = ''.join(
+        f"def function_{i}(a, b):\n"
+        f"    return helper_{i % 97}(a, b) + function_{i // 2}(b, a)\n\n"
+        for i in range(30000))
+    find.ignore_case = find.findAllUniqueFlag = False
+
+    def find_all(pattern, reverse, regexp, word, cache=True, limit=None):
+        """Return a list of all match positions, and the time per match."""
+        find.reverse, find.pattern_match, find.whole_word = reverse, regexp, word
+        find.re_obj = re.compile(pattern) if regexp else None
+        find.spans_cache = {} if cache else None
+        result, i = [], len(s) if reverse else 0
+        t1 = time.perf_counter()
+        while limit is None or len(result) < limit:
+            pos, newpos = find.searchHelper(s, i, 0 if reverse else len(s), pattern)
+            if pos == -1:
+                break
+            result.append(pos)
+            i = pos if reverse else newpos
+        t2 = time.perf_counter()
+        return result, (t2 - t1) / max(1, len(result))
+
+    print(f"body: {len(s)/1e6:.1f} MB")
+    for kind, pattern, regexp, word in (
+        ('plain', 'helper_1', False, False),
+        ('word', 'helper_1', False, True),
+        ('regex', r'helper_1\d*', True, False),
+    ):
+        forward, forward_t = find_all(pattern, False, regexp, word)
+        backward, backward_t = find_all(pattern, True, regexp, word)
+        assert backward == list(reversed(forward)), kind
+        print(f"{kind:6} {len(forward):5} matches: "
+            f"forward: {1e6*forward_t:8.1f} usec/match "
+            f"backward: {1e6*backward_t:8.1f} usec/match")
+        if word or regexp:
+            # The old backward search. Find only a few matches: it is very slow.
+            old, old_t = find_all(pattern, True, regexp, word, cache=False, limit=3)
+            assert old == backward[:3], kind
+            print(f"{'':6} {'':5} without spans cache: backward: {1e6*old_t:8.1f} usec/match")
+    c.close()
+#@+node:ekr.20261018205303.1: *3* bench_find_all
+@benchmark('find-all')
+def bench_find_all(bridge, g):
+    """Find all and replace all in a large outline, node by node and in batches."""
+    import re
+    c = bridge.openLeoFile(None)
+    find = c.findCommands
+    body = ''.join(
+        f"def function_{k}(a, b):\n    return helper_{k % 97}(a, b) * {k}\n\n"
+        for k in range(50))
+    p = c.rootPosition()
+    for i in range(100):
+        if i > 0:
+            p = p.insertAfter()
+        p.h = f"organizer {i}"
+        for j in range(100):
+            child = p.insertAsLastChild()
+            child.h = f"node {i}.{j}"
+            child.b = body.replace('helper_1(', f"helper_{i}_{j}(")
+    vnodes = list(c.all_unique_nodes())
+    print(f"{len(vnodes)} nodes, {sum(len(v.b) for v in vnodes)/1e6:.1f} MB")
+    find.ignore_case = find.findAllUniqueFlag = find.whole_word = False
+    find.search_headline = find.search_body = True
+    find.change_text = 'xxx'
+
+    def node_by_node(replace):
+        if replace:
+            return {v for v in vnodes
+                if find.batchSearchAndReplace(v.h)[0] or find.batchSearchAndReplace(v.b)[0]}
+        return {v for v in vnodes if find.findNextBatchMatch(g.Bunch(h=v.h, b=v.b, v=v))}
+
+    def batch(replace):
+        result = find.batchSearch(vnodes, replace=replace)
+        return set(result) if replace else result
+
+    for kind, pattern, regexp in (
+        ('plain', 'helper_1_', False),
+        ('regex', r'helper_\d+_1\d?\(a, b\) \* 1$', True),
+    ):
+        find.find_text, find.pattern_match = pattern, regexp
+        find.re_obj = re.compile(pattern, re.MULTILINE) if regexp else None
+        for replace in (False, True):
+            expected = node_by_node(replace)
+            find.findAllInParallel = False
+            assert batch(replace) == expected, kind
+            find.findAllInParallel = True
+            assert batch(replace) == expected, kind
+            t1 = time_it(lambda: node_by_node(replace))
+            find.findAllInParallel = False
+            t2 = time_it(lambda: batch(replace))
+            find.findAllInParallel = True
+            t3 = time_it(lambda: batch(replace))
+            print(
+                f"{kind:5} {'replace' if replace else 'find':7} {len(expected):5} nodes: "
+                f"node by node: {t1:5.3f} sec, batch: {t2:5.3f} sec, "
+                f"parallel batch ({os.cpu_count()} cpus): {t3:5.3f} sec")
+    c.close()
+#@+node:ekr.20261018205544.1: *3* bench_undo_memory
+@benchmark('undo-memory')
+def bench_undo_memory(bridge, g):
+    """Replace all in many large nodes, then undo and redo."""
+    import sys
+    c = bridge.openLeoFile(None)
+    find, u = c.findCommands, c.undoer
+    p = c.rootPosition()
+    for i in range(20000):
+        if i > 0:
+            p = p.insertAfter()
+        p.h = f"node {i}"
+        p.b = ''.join(f"    a = b + {k}  # line {k}\n" for k in range(100 + i % 7))
+        if i % 10 == 0:
+            p.b = p.b.replace('line 50\n', 'target 50\n')
+    old_bodies = [v.b for v in c.all_unique_nodes()]
+    find.find_text, find.change_text = 'target', 'changed'
+    find.ignore_case = find.pattern_match = find.whole_word = False
+    find.findAllUniqueFlag = find.node_only = find.suboutline_only = False
+    find.search_headline = find.search_body = True
+    find.checkArgs = lambda: True
+    find.initInHeadline = lambda: None
+    t1 = time.perf_counter()
+    find.changeAll()
+    t2 = time.perf_counter()
+    new_bodies = [v.b for v in c.all_unique_nodes()]
+    changed = [s for s, s2 in zip(old_bodies, new_bodies) if s != s2]
+    full = sum(sys.getsizeof(z) for z in changed)
+    print(f"{len(old_bodies)} nodes, {sum(len(z) for z in old_bodies)/1e6:.1f} MB, "
+        f"{len(changed)} changed nodes, {t2 - t1:.2f} sec")
+    print(f"full copies of the old bodies: {full/1024:10,.1f} KB")
+    size = u.getBeadSize(u.beads[u.bead])
+    print(f"undo bead:                     {size/1024:10,.1f} KB")
+    t1 = time.perf_counter()
+    u.undo()
+    t2 = time.perf_counter()
+    assert [v.b for v in c.all_unique_nodes()] == old_bodies
+    u.redo()
+    t3 = time.perf_counter()
+    assert [v.b for v in c.all_unique_nodes()] == new_bodies
+    print(f"undo: {t2 - t1:.2f} sec, redo: {t3 - t2:.2f} sec")
+    c.close()
+#@+node:ekr.20261018205832.3: *3* bench_importers
+@benchmark('importers')
+def bench_importers(bridge, g):
+    """Scan and import 20000 lines of each language in import_corpus."""
+    g.app.loadManager.createAllImporterData()
+    c = bridge.openLeoFile(None)
+    ic = c.importCommands
+
+    def scan(x, lines):
+        states, prev = [], x.state_class()
+        for line in lines:
+            prev = x.scan_line(line, prev)
+            states.append(vars(prev))
+        return states
+
+    for ext in sorted(import_corpus):
+        s = make_import_corpus(ext, 20000)
+        lines = g.splitLines(s)
+        aClass = g.app.classDispatchDict.get(ext)
+        # Overriding scan_dict forces i.scan_line to look at every character.
+        per_char_class = type('PerChar', (aClass,), {
+            'scan_dict': lambda self, *args: aClass.scan_dict(self, *args)})
+        new, old = aClass(ic), per_char_class(ic)
+        assert scan(new, lines) == scan(old, lines), ext
+        t1 = time_it(lambda: scan(new, lines), repeat=1)
+        t2 = time_it(lambda: scan(old, lines), repeat=1)
+        # Import into a new outline: large outlines slow the import.
+        c2 = bridge.openLeoFile(None)
+        parent = c2.rootPosition()
+        parent.h = f"@file test{ext}"
+        t3 = time.perf_counter()
+        c2.importCommands.createOutline(fileName=f"test{ext}", parent=parent.copy(), s=s)
+        t4 = time.perf_counter()
+        n = len(list(parent.subtree()))
+        c2.close()
+        print(
+            f"{ext:8} {aClass.__name__:20} scan_line: {t1:5.2f} sec "
+            f"(per character: {t2:5.2f} sec) import: {t4 - t3:5.2f} sec, {n:5} nodes")
+    c.close()
+#@+node:ekr.20261018210447.1: *3* bench_recursive_import
+@benchmark('recursive-import')
+def bench_recursive_import(bridge, g):
+    """Import a directory tree serially and with worker processes."""
+    import leo.core.leoImport as leoImport
+    g.app.loadManager.createAllImporterData()
+    exts = ['.c', '.java', '.js', '.py']
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for i in range(8):
+            directory = os.path.join(temp_dir, f"package_{i}")
+            os.makedirs(os.path.join(directory, 'sub'))
+            for j in range(10):
+                ext = exts[j % len(exts)]
+                subdir = 'sub' if j % 3 == 0 else ''
+                fileName = os.path.join(directory, subdir, f"module_{j}{ext}")
+                with open(fileName, 'w') as f:
+                    f.write(make_import_corpus(ext, 2000))
+        results = {}
+        for parallel in (False, True):
+            c = bridge.openLeoFile(None)
+            progress = []
+            x = leoImport.RecursiveImportController(c, '@clean',
+                theTypes=exts,
+                progress=lambda n, total, path: progress.append(n),
+            )
+            # Ignore os.cpu_count(), so the benchmark also runs on one cpu.
+            x.parallel = parallel
+            t1 = time.perf_counter()
+            x.run(temp_dir)
+            t2 = time.perf_counter()
+            assert progress == list(range(1, 81)), progress
+            root = c.lastTopLevel()
+            results[parallel] = t2 - t1, [
+                (p.h, p.b, p.level()) for p in root.self_and_subtree()]
+            c.close()
+    serial_t, serial_nodes = results[False]
+    parallel_t, parallel_nodes = results[True]
+    assert serial_nodes == parallel_nodes, 'outlines differ'
+    print(f"80 files, {len(serial_nodes)} nodes")
+    print(f"  serial: {serial_t:6.2f} sec")
+    print(f"parallel: {parallel_t:6.2f} sec ({os.cpu_count()} cpus)")
+#@+node:ekr.20261018210657.1: *3* bench_importer_registry
+@benchmark('importer-registry')
+def bench_importer_registry(bridge, g):
+    """Create the importer and writer data with and without the plugin manifest."""
+    import json
+    import subprocess
+    script = (
+        'import json, sys, time, tracemalloc\n'
+        'import leo.core.leoBridge as leoBridge\n'
+        'g = leoBridge.controller(gui="nullGui", loadPlugins=False,\n'
+        '    readSettings=False, silent=True, verbose=False).globals()\n'
+        'n = len(sys.modules)\n'
+        'tracemalloc.start()\n'
+        't1 = time.perf_counter()\n'
+        'g.app.loadManager.createAllImporterData()\n'
+        't2 = time.perf_counter()\n'
+        'size = tracemalloc.get_traced_memory()[0]\n'
+        'tracemalloc.stop()\n'
+        'n = len(sys.modules) - n\n'
+        'data = [sorted((key, f"{z.__module__}.{z.__name__}") for key, z in d.items())\n'
+        '    for d in (g.app.classDispatchDict, g.app.atAutoDict,\n'
+        '        g.app.writersDispatchDict, g.app.atAutoWritersDict)]\n'
+        'print(json.dumps([t2 - t1, n, size, data, sorted(g.app.atAutoNames)]))\n'
+    )
+    leo_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ, HOME=home, PYTHONPATH=leo_dir)
+        results = []
+        for kind in ('no manifest', 'manifest'):
+            out = subprocess.check_output([sys.executable, '-c', script], env=env)
+            results.append(json.loads(out.decode('utf-8').splitlines()[-1]))
+            t, n, size, data, names = results[-1]
+            print(f"{kind:11}: {t:5.3f} sec, imported {n:2} modules, allocated {size/1024:6,.0f} KB")
+        assert os.path.exists(os.path.join(home, '.leo', 'db', 'plugin_manifest.json'))
+    assert results[0][3:] == results[1][3:], 'data differ'
+#@+node:ekr.20261018210858.1: *3* bench_settings_cache
+@benchmark('settings-cache')
+def bench_settings_cache(bridge, g):
+    """Read the global settings files with and without the settings cache."""
+    import json
+    import subprocess
+    script = (
+        'import json, time\n'
+        'import leo.core.leoBridge as leoBridge\n'
+        'g = leoBridge.controller(gui="nullGui", loadPlugins=False,\n'
+        '    readSettings=False, silent=True, verbose=False).globals()\n'
+        'lm = g.app.loadManager\n'
+        't1 = time.perf_counter()\n'
+        'lm.readGlobalSettingsFiles()\n'
+        't2 = time.perf_counter()\n'
+        'settings = sorted((key, repr(z.val)) for key, z in lm.globalSettingsDict.items())\n'
+        'bindings = sorted((key, repr(z)) for key, z in lm.globalBindingsDict.items())\n'
+        'menus = repr(g.app.config.menusList)\n'
+        'g.app.global_cacher.commit_and_close()\n'
+        'print(json.dumps([t2 - t1, settings, bindings, menus]))\n'
+    )
+    leo_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ, HOME=home, PYTHONPATH=leo_dir)
+        results = []
+        for kind in ('no cache', 'cache'):
+            out = subprocess.check_output([sys.executable, '-c', script], env=env)
+            results.append(json.loads(out.decode('utf-8').splitlines()[-1]))
+            t, settings, bindings, menus = results[-1]
+            print(f"{kind:8}: {t:5.3f} sec, {len(settings)} settings, {len(bindings)} bindings")
+    assert results[0][1:] == results[1][1:], 'settings differ'
+#@+node:ekr.20261018211037.1: *3* bench_settings_lookup
+@benchmark('settings-lookup')
+def bench_settings_lookup(bridge, g):
+    """Get settings with c.config getters and with c.config.snapshot."""
+    c = bridge.openLeoFile(None)
+    c.config.set(None, 'bool', 'log-show-save-time', True)
+    c.config.set(None, 'int', 'benchmark-int', 42)
+    c.config.set(None, 'string', 'log-timestamp-format', '%H:%M')
+    snapshot = c.config.snapshot
+    assert snapshot.log_show_save_time is c.config.getBool('log-show-save-time') is True
+    assert snapshot.benchmark_int == c.config.getInt('benchmark-int') == 42
+    assert snapshot.log_timestamp_format == c.config.getString('log-timestamp-format')
+    assert snapshot.no_such_setting is c.config.getBool('no-such-setting') is None
+    for key, gs in c.config.settingsDict.items():
+        val = getattr(snapshot, key)
+        if gs.kind == 'bool':
+            assert val == c.config.getBool(key), key
+        elif gs.kind == 'int':
+            assert val == c.config.getInt(key), key
+        elif gs.kind.startswith('string'):
+            assert val == c.config.getString(key), key
+    n = 100000
+    config = c.config
+
+    def getters():
+        for i in range(n):
+            config.getBool('log-show-save-time')
+            config.getInt('benchmark-int')
+            config.getString('log-timestamp-format')
+
+    def snapshots():
+        for i in range(n):
+            snapshot = config.snapshot
+            snapshot.log_show_save_time
+            snapshot.benchmark_int
+            snapshot.log_timestamp_format
+
+    t1 = time_it(getters)
+    t2 = time_it(snapshots)
+    print(f"{len(c.config.settingsDict.keys())} settings, {3 * n} lookups")
+    print(f" getters: {t1:5.3f} sec, {1e9 * t1 / (3 * n):5.0f} ns per lookup")
+    print(f"snapshot: {t2:5.3f} sec, {1e9 * t2 / (3 * n):5.0f} ns per lookup (including c.config.snapshot)")
+    c.close()
+#@+node:ekr.20261018211909.1: *3* bench_ndjson
+@benchmark('ndjson')
+def bench_ndjson(bridge, g):
+    """Save and open a 100k-node outline as .leo (xml) and as .leojsonl."""
+    import tracemalloc
+    n_organizers, n_nodes = 200, 500
+    body = ''.join(f"    a = b + {k}  # <line {k}> & more\n" for k in range(12))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        c = bridge.openLeoFile(os.path.join(temp_dir, 'outline.leo'))
+        fc, p = c.fileCommands, c.rootPosition()
+        for i in range(n_organizers):
+            if i > 0:
+                p = p.insertAfter()
+            p.h = f"organizer {i}"
+            for j in range(n_nodes):
+                child = p.insertAsLastChild()
+                child.h = f"node {i}.{j}"
+                child.b = body
+        c.selectPosition(c.rootPosition())
+        expected = dump_outline(c)
+        results = {}
+        for ext in ('.leo', '.leojsonl'):
+            fileName = os.path.join(temp_dir, 'ndjson' + ext)
+            fc.clearXmlFragments()
+            tracemalloc.start()
+            fc.write_Leo_file(fileName, outlineOnlyFlag=True)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            write_t = time_it(lambda: fc.write_Leo_file(fileName, outlineOnlyFlag=True))
+            t1 = time.perf_counter()
+            c2 = bridge.openLeoFile(fileName)
+            read_t = time.perf_counter() - t1
+            assert dump_outline(c2) == expected, f"{ext}: outlines differ"
+            c2.close()
+            results[ext] = write_t, peak, read_t, os.path.getsize(fileName)
+        c.close()
+    print(f"{len(expected)} nodes")
+    for ext, kind in (('.leo', '   xml'), ('.leojsonl', 'ndjson')):
+        write_t, peak, read_t, size = results[ext]
+        print(
+            f"{kind}: save: {write_t:6.3f} sec. open: {read_t:6.3f} sec. "
+            f"{size/1e6:5.1f} MB. peak memory during first save: {peak/1e6:6.1f} MB")
+#@+node:ekr.20261018213046.1: *3* bench_perf_stats
+@benchmark('perf-stats')
+def bench_perf_stats(bridge, g):
+    """Measure the overhead of g.app.perfStats in command and hook dispatch."""
+    import leo.core.leoApp as leoApp
+    n = 100000
+    with tempfile.TemporaryDirectory() as temp_dir:
+        c = bridge.openLeoFile(os.path.join(temp_dir, 'perf_stats.leo'))
+        pc = g.app.pluginsController
+        bunch = g.Bunch(fn=lambda tag, keywords: None, moduleName='bench_plugin')
+        keywords = {'c': c}
+
+        def command(event):
+            pass
+
+        def run_commands():
+            for i in range(n):
+                c.doCommand(command, 'bench-command')
+
+        def run_hooks():
+            for i in range(n):
+                pc.callTagHandler(bunch, 'bench-hook', keywords)
+
+        results = {}
+        for enabled in (False, True):
+            g.app.perfStats = leoApp.PerfStats() if enabled else None
+            results[enabled] = time_it(run_commands), time_it(run_hooks)
+        report = g.app.perfStats.report()
+        g.app.perfStats = None
+        c.close()
+    for kind, i in (('commands', 0), ('hooks', 1)):
+        off, on = results[False][i], results[True][i]
+        print(
+            f"{n} {kind:8}: off: {off:6.3f} sec. on: {on:6.3f} sec. "
+            f"overhead: {(on - off) / n * 1e6:5.2f} usec. per call")
+    print('')
+    print('\n'.join(report))
+#@+node:ekr.20261018213514.1: *3* bench_spell_suggest
+@benchmark('spell-suggest')
+def bench_spell_suggest(bridge, g):
+    """Compare spelling suggestions from edits1/edits2 and from a SpellIndex."""
+    import glob
+    import random
+    import re
+    from leo.commands.spellCommands import DefaultDict
+    # Use the words in Leo's sources and documentation as the main dictionary.
+    words = set()
+    for pattern in ('**/*.py', 'doc/*.txt'):
+        for fn in glob.glob(os.path.join(g.app.loadDir, '..', pattern), recursive=True):
+            with open(fn, 'rb') as f:
+                s = g.toUnicode(f.read())
+            for word in re.findall(r"\b[A-Za-z][a-z]{2,}\b", s):
+                words.add(word)
+                words.add(word.lower())
+    # Make misspellings that are one or two edits from a word.
+    rng = random.Random(1)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    aList, misspellings = sorted(words), []
+    while len(misspellings) < 200:
+        word = rng.choice(aList)
+        for n in range(rng.randint(1, 2)):
+            i = rng.randrange(len(word))
+            word = rng.choice((
+                word[:i] + word[i + 1 :],
+                word[:i] + rng.choice(letters) + word[i + 1 :],
+                word[:i] + rng.choice(letters) + word[i:],
+                word[:i] + word[i + 1 : i + 2] + word[i] + word[i + 2 :],
+            ))
+        if word and word not in words:
+            misspellings.append(word)
+    old_home = g.app.homeLeoDir
+    with tempfile.TemporaryDirectory() as temp_dir:
+        fn = os.path.join(temp_dir, 'main_spelling_dict.txt')
+        with open(fn, 'w') as f:
+            f.write('\n'.join(aList))
+        g.app.homeLeoDir = temp_dir
+        try:
+            d = DefaultDict()
+            d.add_words_from_dict('main', fn, words)
+            t1 = time.perf_counter()
+            d.index = d.create_index()
+            t2 = time.perf_counter()
+            d2 = DefaultDict()
+            d2.add_words_from_dict('main', fn, words)
+            d2.index = d2.create_index()
+            t3 = time.perf_counter()
+            size = os.path.getsize(os.path.join(temp_dir, 'spelling_index.pickle'))
+        finally:
+            g.app.homeLeoDir = old_home
+
+    def old_suggest(word):
+        known = lambda aList: sorted(z for z in set(aList) if z in words)
+        return known(d.edits1(word)) or known(d.edits2(word))
+
+    times = {'edits1/2': [], 'index': []}
+    for word in misspellings:
+        for kind, f in (('edits1/2', old_suggest), ('index', d.suggest)):
+            t = time.perf_counter()
+            result = f(word)
+            times[kind].append(time.perf_counter() - t)
+            if kind == 'edits1/2':
+                expected = result
+            else:
+                assert set(expected) <= set(result), (word, expected, result)
+    print(
+        f"{len(words)} words. index: create: {t2 - t1:.2f} sec. "
+        f"load: {t3 - t2:.2f} sec. size: {size/1e6:.1f} MB")
+    for kind, aList in times.items():
+        print(
+            f"{kind:8}: {len(aList)} misspellings. mean: {sum(aList)/len(aList)*1000:7.2f} ms. "
+            f"max: {max(aList)*1000:7.2f} ms.")
+#@+node:ekr.20261018213804.1: *3* bench_spell_check_outline
+@benchmark('spell-check-outline')
+def bench_spell_check_outline(bridge, g):
+    """Compare spell checking a whole outline with and without a SpellCheckIndex."""
+    import re
+    from leo.commands.spellCommands import DefaultWrapper, SpellCheckIndex
+    c = bridge.openLeoFile(os.path.join(g.app.loadDir, 'LeoPyRef.leo'))
+    vnodes = list(c.all_unique_nodes())
+    # Leave every tenth word out of the main dictionary.
+    words = set()
+    for v in vnodes:
+        words.update(re.findall(r"\b[A-Za-z][a-z]{2,}\b", v.b))
+    words = sorted(words)
+    del words[::10]
+    old = g.app.homeDir, g.app.homeLeoDir, g.app.spellDict
+    with tempfile.TemporaryDirectory() as temp_dir:
+        leo_dir = os.path.join(temp_dir, '.leo')
+        os.mkdir(leo_dir)
+        with open(os.path.join(leo_dir, 'main_spelling_dict.txt'), 'w') as f:
+            f.write('\n'.join(words))
+        g.app.homeDir, g.app.homeLeoDir, g.app.spellDict = temp_dir, leo_dir, None
+        try:
+            sc = DefaultWrapper(c)
+            sc.d.index = sc.d.create_index()
+        finally:
+            g.app.homeDir, g.app.homeLeoDir, g.app.spellDict = old
+    index = SpellCheckIndex(c, sc)
+
+    def full_walk():
+        """Check every word of every body, as SpellTabHandler.find once did."""
+        seen = set()
+        for v in vnodes:
+            for m in index.re_word.finditer(v.b):
+                word = m.group(0)
+                if word not in seen and not sc.process_word(word):
+                    seen.add(word)
+
+    changed = vnodes[::100]
+    t_walk = time_it(full_walk, repeat=1)
+    t_cold = time_it(index.refresh, repeat=1)
+    t_warm = time_it(index.refresh)
+    for v in changed:
+        v.b += ' xyzzy'
+    t_changed = time_it(index.refresh, repeat=1)
+    print(f"{len(vnodes)} nodes, {len(words)} words. {index.report()[0]}")
+    for kind, t in (
+        ('full walk', t_walk),
+        ('index: cold', t_cold),
+        ('index: warm', t_warm),
+        (f"index: {len(changed)} changed", t_changed),
+    ):
+        print(f"{kind:18}: {t*1000:9.2f} ms")
+#@+node:ekr.20261018214037.3: *3* bench_button_script
+@benchmark('button-script')
+def bench_button_script(bridge, g):
+    """Compare finding, composing and compiling an @button script with and without caches."""
+    from leo.plugins.mod_scripting import AtButtonCallback, ScriptingController
+    c = bridge.openLeoFile(None)
+    make_at_file_outline(c, n_files=20, n_nodes=1000, n_lines=5)
+    root = c.lastTopLevel().insertAfter()
+    root.h = '@button bench'
+    root.b = '@language python\n\n@others\n'
+    for i in range(200):
+        child = root.insertAsLastChild()
+        child.h = f"function_{i}"
+        child.b = ''.join(
+            f"def function_{i}_{j}(a, b):\n    return a + b * {j}\n\n" for j in range(10))
+    sc = ScriptingController(c)
+    cb = AtButtonCallback(
+        controller=sc, b=None, c=c, buttonText='bench',
+        docstring='', gnx=root.gnx, script=None)
+
+    def old_click():
+        for p in c.all_positions():
+            if p.gnx == root.gnx:
+                script = g.getScript(c, p, useSelectedText=False)
+                return compile(script + '\n', '<string>', 'exec')
+
+    def new_click():
+        return g.compileScript(cb.find_script() + '\n')
+
+    t_old = time_it(old_click)
+    t_cold = time_it(new_click, repeat=1)
+    t_warm = time_it(new_click)
+    root.firstChild().b += 'pass\n'
+    t_changed = time_it(new_click, repeat=1)
+    n = sum(1 for z in c.all_unique_nodes())
+    print(f"{n} nodes. script: {len(cb.find_script())} chars")
+    for kind, t in (
+        ('no caches', t_old),
+        ('caches: cold', t_cold),
+        ('caches: warm', t_warm),
+        ('caches: 1 changed', t_changed),
+    ):
+        print(f"{kind:18}: {t*1000:8.2f} ms")
+#@+node:ekr.20261018201736.1: *3* bench_incremental_save
+@benchmark('incremental-save')
+def bench_incremental_save(bridge, g):
+    """Save a large outline with and without cached xml fragments."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        fileName = os.path.join(temp_dir, 'incremental_save.leo')
+        c = bridge.openLeoFile(fileName)
+        fc, p = c.fileCommands, c.rootPosition()
+        body = ''.join(f"    a = b + {k}  # <line {k}> & more\n" for k in range(40))
+        for i in range(200):
+            if i > 0:
+                p = p.insertAfter()
+            p.h = f"organizer {i}"
+            for j in range(200):
+                child = p.insertAsLastChild()
+                child.h = f"node {i}.{j}"
+                child.b = body
+        c.selectPosition(c.rootPosition())
+        results = {}
+        for cached in (False, True):
+            fc.cacheXmlFragments = cached
+            fc.clearXmlFragments()
+            fc.write_Leo_file(fileName, outlineOnlyFlag=False)
+            n = 0
+
+            def save():
+                nonlocal n
+                n += 1
+                c.rootPosition().h = f"changed {n}"
+                fc.write_Leo_file(fileName, outlineOnlyFlag=False)
+
+            t = time_it(save)
+            with open(fileName, 'rb') as f:
+                results[cached] = t, f.read()
+        c.close()
+    full_t, full_s = results[False]
+    cached_t, cached_s = results[True]
+    assert full_s == cached_s, 'files differ'
+    print(f"       full: {full_t:6.3f} sec. {len(full_s)} bytes")
+    print(f"incremental: {cached_t:6.3f} sec. speedup: {full_t/cached_t:4.2f}x")
+#@+node:ekr.20261018212250.1: ** suite
+# The suite times Leo's hot paths on a synthetic outline. Its json
+# reports can be compared across commits with --compare.
+#@+node:ekr.20261018212250.2: *3* run_suite
+def run_suite(bridge, g, options):
+    """Run the suite, then write and compare json reports as options specify."""
+    import json
+    import platform
+    import leo.core.leoVersion as leoVersion
+    params = {
+        'at_files': options.at_files,
+        'body_lines': options.body_lines,
+        'clone_ratio': options.clone_ratio,
+        'depth': options.depth,
+        'nodes': options.nodes,
+        'repeat': options.repeat,
+        'seed': options.seed,
+    }
+    with tempfile.TemporaryDirectory() as temp_dir:
+        results, stats = time_suite(bridge, g, temp_dir, params)
+    report = {
+        'version': 1,
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'commit': g.gitCommitNumber(),
+        'leo': leoVersion.version,
+        'python': platform.python_version(),
+        'platform': sys.platform,
+        'cpus': os.cpu_count(),
+        'params': params,
+        'stats': stats,
+        'results': results,
+    }
+    print(', '.join(f"{key}: {val}" for key, val in stats.items()))
+    for name, t in results.items():
+        print(f"{name:16} {t:8.3f} sec.")
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"wrote {options.json}")
+    if options.compare:
+        with open(options.compare) as f:
+            old_report = json.load(f)
+        if compare_reports(old_report, report, options.threshold):
+            sys.exit(1)
+#@+node:ekr.20261018212250.3: *3* time_suite
+def time_suite(bridge, g, temp_dir, params):
+    """
+    Time core operations on a synthetic outline.
+
+    Return (results, stats). Keys of results are operation names, values
+    are the best times in seconds.
+    """
+    g.app.loadManager.createAllImporterData()
+    repeat = params.get('repeat')
+    results = {}
+    fileName = os.path.join(temp_dir, 'suite.leo')
+    c = bridge.openLeoFile(fileName)
+    at, fc, find, u = c.atFileCommands, c.fileCommands, c.findCommands, c.undoer
+    fc.setDefaultDirectoryForNewFiles(fileName)
+        # Write @file nodes to temp_dir.
+    t1 = time.perf_counter()
+    make_synthetic_outline(c, **{key: val for key, val in params.items() if key != 'repeat'})
+    results['generate'] = time.perf_counter() - t1
+    vnodes = list(c.all_unique_nodes())
+    stats = {
+        'positions': len(list(c.all_positions(copy=False))),
+        'vnodes': len(vnodes),
+        'body_bytes': sum(len(v.b) for v in vnodes),
+    }
+    results['traversal'] = time_it(
+        lambda: (list(c.all_positions(copy=False)), list(c.all_unique_nodes())), repeat)
+    # External files.
+    roots = [z.copy() for z in c.all_unique_positions() if z.isAnyAtFileNode()]
+
+    def write_all():
+        # writeAll writes only dirty @<file> trees, or the selected tree.
+        for p in roots:
+            p.setDirty()
+        at.writeAll()
+
+    results['at-file-write'] = time_it(write_all, repeat)
+    at.cacheAtFileReads = False
+    results['at-file-read'] = time_it(lambda: at.readAll(c.rootPosition()), repeat)
+    # Save and open. Opening a file that is already open does nothing.
+    leoName = os.path.join(temp_dir, 'suite_copy.leo')
+    fc.cacheXmlFragments = False
+    results['save-leo'] = time_it(
+        lambda: fc.write_Leo_file(leoName, outlineOnlyFlag=True), repeat)
+    dbNames = [os.path.join(temp_dir, f"suite_{i}.db") for i in range(repeat)]
+
+    def close_db():
+        c.sqlite_connection.close()
+        c.sqlite_connection = None
+
+    results['save-db'] = time_it(
+        lambda: fc.write_Leo_file(dbNames.pop(), outlineOnlyFlag=True),
+        repeat, cleanup=close_db)
+    dbName = os.path.join(temp_dir, 'suite_0.db')
+    results['open-leo'] = time_it(lambda: bridge.openLeoFile(leoName).close(), repeat)
+    results['open-db'] = time_it(lambda: bridge.openLeoFile(dbName).close(), repeat)
+    # Find and replace.
+    find.find_text, find.change_text = 'alpha_1 ', 'ALPHA_1 '
+    find.ignore_case = find.pattern_match = find.whole_word = False
+    find.findAllUniqueFlag = find.node_only = find.suboutline_only = False
+    find.search_headline = find.search_body = True
+    find.checkArgs = lambda: True
+    find.initInHeadline = lambda: None
+    c.suppressHeadChanged = True
+        # Undo calls c.endEditing, which can change headlines without a gui.
+    results['find-all'] = time_it(find.findAll, repeat, cleanup=u.undo)
+    results['replace-all'] = time_it(find.changeAll, repeat, cleanup=u.undo)
+    find.changeAll()
+    results['undo'] = time_it(u.undo, repeat, cleanup=u.redo)
+    u.undo()
+    results['redo'] = time_it(u.redo, repeat, cleanup=u.undo)
+    c.close()
+    # Import.
+    s = make_import_corpus('.py', 5000)
+    c = bridge.openLeoFile(None)
+    root = c.rootPosition()
+    root.h = '@file test.py'
+
+    def delete_import():
+        root.b = ''
+        root.deleteAllChildren()
+
+    results['import'] = time_it(
+        lambda: c.importCommands.createOutline(fileName='test.py', parent=root.copy(), s=s),
+        repeat, cleanup=delete_import)
+    c.close()
+    return results, stats
+#@+node:ekr.20261018212250.4: *3* make_synthetic_outline
+def make_synthetic_outline(c,
+    seed=1, nodes=10000, depth=4, clone_ratio=0.02, body_lines=10, at_files=10,
+):
+    """
+    Replace c's outline by a random outline. The same arguments always
+    create the same outline.
+
+    nodes:       the number of nodes, not counting clones.
+    depth:       the maximum depth of the outline.
+    clone_ratio: the number of clones, as a fraction of nodes.
+    body_lines:  the average number of lines in each body.
+    at_files:    the number of @file trees. They contain half of all nodes.
+    """
+    import random
+    rng = random.Random(seed)
+    words = ('alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta', 'eta', 'theta')
+
+    def body():
+        return ''.join(
+            f"{rng.choice(words)}_{rng.randrange(100)} = {rng.choice(words)}({k})\n"
+                for k in range(rng.randint(0, 2 * body_lines)))
+
+    def grow(root, n, at_file):
+        """Add n random descendants to root. Return their positions."""
+        parents, result = [(root, 1)], []
+        for i in range(n):
+            parent, level = rng.choice(parents)
+            if at_file and not parent.hasChildren():
+                parent.b = parent.b + '@others\n'
+            child = parent.insertAsLastChild()
+            child.h = f"{rng.choice(words)} {i}"
+            child.b = body()
+            result.append(child)
+            if level < depth:
+                parents.append((child, level + 1))
+        return result
+
+    root = c.rootPosition()
+    while root.hasNext():
+        root.next().doDelete()
+    root.deleteAllChildren()
+    p = root
+    n_file_nodes = nodes // 2 if at_files else 0
+    for i in range(at_files):
+        if i > 0:
+            p = p.insertAfter()
+        p.h = f"@file module_{i}.py"
+        p.b = body()
+        grow(p, n_file_nodes // at_files - 1, at_file=True)
+    p = p.insertAfter() if at_files else p
+    p.h = 'organizer'
+    p.b = body()
+    positions = grow(p, nodes - n_file_nodes - at_files - 1, at_file=False)
+    if positions and clone_ratio > 0:
+        clones = p.insertAfter()
+        clones.h = 'clones'
+        for i in range(int(nodes * clone_ratio)):
+            clone = rng.choice(positions).clone()
+            clone.moveToLastChildOf(clones)
+    c.selectPosition(c.rootPosition())
+#@+node:ekr.20261018212250.5: *3* compare_reports
+def compare_reports(old_report, new_report, threshold):
+    """
+    Print the ratio of new to old times for each operation.
+    Return the list of operations that are slower by more than threshold.
+    """
+    if old_report.get('params') != new_report.get('params'):
+        print('warning: the reports used different parameters')
+    old_commit = (old_report.get('commit') or '?')[:8]
+    new_commit = (new_report.get('commit') or '?')[:8]
+    print(f"\n{'operation':16} {old_commit:>9} {new_commit:>9}   ratio")
+    old, new = old_report.get('results', {}), new_report.get('results', {})
+    regressions = []
+    for name in new:
+        if name not in old:
+            continue
+        ratio = new[name] / old[name] if old[name] else 1.0
+        slower = ratio > threshold
+        if slower:
+            regressions.append(name)
+        print(
+            f"{name:16} {old[name]:9.3f} {new[name]:9.3f} {ratio:7.2f}x"
+            f"{' SLOWER' if slower else ''}")
+    if regressions:
+        print(f"\n{len(regressions)} operations are more than {threshold:.2f}x slower")
+    return regressions
+#@-others
+if __name__ == '__main__':
+    main()
+#@@language python
+#@@tabwidth -4
+#@@pagewidth 70
+#@-leo
@@ -556,6 +556,21 @@ class SqlitePickleShare:
     def _makedirs(self, fn, mode=0o777):
 
         os.makedirs(fn, mode)
+    #@+node:ekr.20261018201052.1: *3* begin_batch & end_batch (SqlitePickleShare)
+    def begin_batch(self):
+        """
+        Start a transaction.
+
+        Otherwise every write commits separately, which is slow when writing
+        many values.
+        """
+        if not self.conn.in_transaction:
+            self.conn.execute('begin')
+
+    def end_batch(self):
+        """Commit the transaction started by begin_batch."""
+        if self.conn.in_transaction:
+            self.conn.commit()
     #@+node:vitalije.20170716201700.11: *3* _openFile (SqlitePickleShare)
     def _openFile(self, fn, mode='r'):
         """ Open this file.  Return a file object.
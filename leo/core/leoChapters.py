@@ -198,8 +198,8 @@ class ChapterController:
     def findAnyChapterNode(self):
         """Return True if the outline contains any @chapter node."""
         cc = self
-        for p in cc.c.all_unique_positions():
-            if p.h.startswith('@chapter '):
+        for v in cc.c.all_unique_nodes():
+            if v.h.startswith('@chapter '):
                 return True
         return False
     #@+node:ekr.20071028091719: *4* cc.findChapterNameForPosition
@@ -1318,7 +1318,7 @@ class JEditColorizer(BaseJEditColorizer):
         c = self.c
         self.colorRangeWithTag(s, 0, j, 'leokeyword')
         # New in Leo 5.5: optionally colorize doc parts using reStructuredText
-        if c.config.getBool('color-doc-parts-as-rest'):
+        if c.config.snapshot.color_doc_parts_as_rest:
             # Switch langauges.
             self.after_doc_language = self.language
             self.language = 'rest'
@@ -1352,7 +1352,7 @@ class JEditColorizer(BaseJEditColorizer):
                 return j
         # Color the next line.
         self.setRestart(self.restartDocPart)
-        if self.c.config.getBool('color-doc-parts-as-rest'):
+        if self.c.config.snapshot.color_doc_parts_as_rest:
             # Do *not* colorize the text here.
             return 0
         self.colorRangeWithTag(s, 0, len(s), 'docpart')
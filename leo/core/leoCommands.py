@@ -8,12 +8,13 @@ import leo.core.leoGlobals as g
 import leo.core.leoNodes as leoNodes
     # The leoCommands ctor now does most leo.core.leo* imports.
     # This breaks circular dependencies.
-import itertools
 import os
 import re
 import sys
 import time
 import tokenize  # for c.checkAllPythonCode
+import unittest
+import weakref
 try:
     import tabnanny  # for Check Python command # Does not exist in jython
 except ImportError:
@@ -121,6 +122,20 @@ class Commands:
         self.navTime = None
 
         self.sqlite_connection = None
+        # Caches for directives. None disables a cache.
+        self.directivesCache = weakref.WeakKeyDictionary()
+            # Keys are vnodes, values are tuples. See g.get_directives_dict.
+        self.pathCache = {}
+            # Keys are tuples, values are paths. See c.scanAtPathDirectives.
+        # Indices for finding positions. None disables an index.
+        self.childIndexCache = weakref.WeakKeyDictionary()
+            # Keys are vnodes, values are dicts. See v.indexOfChild.
+        self.unlIndex = weakref.WeakKeyDictionary()
+            # Keys are vnodes, values are tuples.
+            # See v.childIndicesWithHeadline and g.findExactUNL.
+        self.outlineChanges = None
+            # None, or a set of vnodes that have been linked, unlinked or
+            # renamed. See efc.update_index.
     #@+node:ekr.20120217070122.10466: *5* c.initDebugIvars
     def initDebugIvars(self):
         """Init Commander debugging ivars."""
@@ -669,9 +684,9 @@ class Commands:
                 # g.inScript is a synonym for g.app.inScript.
             if c.write_script_file:
                 scriptFile = self.writeScriptFile(script)
-                exec(compile(script, scriptFile, 'exec'), d)
+                exec(g.compileScript(script, scriptFile), d)
             else:
-                exec(script, d)
+                exec(g.compileScript(script), d)
         finally:
             g.inScript = g.app.inScript = False
     #@+node:ekr.20171123135625.6: *4* c.redirectScriptOutput
@@ -775,14 +790,14 @@ class Commands:
     def all_nodes(self):
         """A generator returning all vnodes in the outline, in outline order."""
         c = self
-        for p in c.all_positions():
-            yield p.v
+        for v, depth in c.all_nodes_with_depth():
+            yield v
 
     def all_unique_nodes(self):
         """A generator returning each vnode of the outline."""
         c = self
-        for p in c.all_unique_positions(copy=False):
-            yield p.v
+        for v, depth in c.all_nodes_with_depth(unique=True):
+            yield v
 
     # Compatibility with old code...
 
@@ -790,6 +805,60 @@ class Commands:
     all_vnodes_iter = all_nodes
     all_unique_tnodes_iter = all_unique_nodes
     all_unique_vnodes_iter = all_unique_nodes
+    #@+node:ekr.20261018203007.1: *5* c.all_nodes_with_depth
+    def all_nodes_with_depth(self, unique=False):
+        """
+        A generator yielding (v, depth) for all vnodes in the outline, in
+        outline order. Top-level nodes have depth 0.
+
+        Unlike c.all_positions, this generator creates no positions, so it
+        is much faster. Use it when a position is not needed.
+
+        unique: yield each vnode only once, skipping the subtrees of
+                vnodes already seen, like c.all_unique_positions.
+        """
+        c = self
+        seen = set() if unique else None
+        stack = [iter(c.hiddenRootNode.children)]
+        while stack:
+            for v in stack[-1]:
+                if seen is not None:
+                    if v in seen:
+                        continue
+                    seen.add(v)
+                yield v, len(stack) - 1
+                if v.children:
+                    stack.append(iter(v.children))
+                    break
+            else:
+                stack.pop()
+    #@+node:ekr.20261018203007.2: *5* c.all_nodes_with_parents
+    def all_nodes_with_parents(self, unique=False):
+        """
+        A generator yielding (v, parent_v, childIndex) for all vnodes in the
+        outline, in outline order, without creating positions.
+
+        parent_v.children[childIndex] is v. The parent of top-level nodes
+        is c.hiddenRootNode.
+
+        unique: yield each vnode only once, like c.all_unique_positions.
+        """
+        c = self
+        seen = set() if unique else None
+        stack = [(c.hiddenRootNode, enumerate(c.hiddenRootNode.children))]
+        while stack:
+            parent_v, it = stack[-1]
+            for i, v in it:
+                if seen is not None:
+                    if v in seen:
+                        continue
+                    seen.add(v)
+                yield v, parent_v, i
+                if v.children:
+                    stack.append((v, enumerate(v.children)))
+                    break
+            else:
+                stack.pop()
     #@+node:ekr.20091001141621.6044: *5* c.all_positions
     def all_positions(self, copy=True):
         """A generator return all positions of the outline, in outline order."""
@@ -917,6 +986,48 @@ class Commands:
                 p.moveToNodeAfterTree()
             else:
                 p.moveToThreadNext()
+    #@+node:ekr.20261018215308.1: *5* c.positions_where
+    def positions_where(self, predicate, root=None, unique=False):
+        """
+        A generator yielding a new position p for each node for which
+        predicate(p.v) is True, in outline order.
+
+        Only matching nodes get positions, so this is much faster than
+        testing all positions when few nodes match.
+
+        root:   search only root and its subtree.
+        unique: skip the subtrees of vnodes already seen,
+                like c.all_unique_positions.
+        """
+        c = self
+        seen = set() if unique else None
+        if root:
+            if predicate(root.v):
+                yield root.copy()
+            if seen is not None:
+                seen.add(root.v)
+            stack = root.stack + [(root.v, root._childIndex)]
+            parent_v = root.v
+        else:
+            stack, parent_v = [], c.hiddenRootNode
+        base = len(stack)
+        iters = [enumerate(parent_v.children)]
+        while iters:
+            for i, v in iters[-1]:
+                if seen is not None:
+                    if v in seen:
+                        continue
+                    seen.add(v)
+                if predicate(v):
+                    yield leoNodes.Position(v, i, stack[:])
+                if v.children:
+                    stack.append((v, i))
+                    iters.append(enumerate(v.children))
+                    break
+            else:
+                iters.pop()
+                if len(stack) > base:
+                    stack.pop()
     #@+node:ekr.20150316175921.5: *5* c.safe_all_positions
     def safe_all_positions(self, copy=True):
         """
@@ -928,6 +1039,33 @@ class Commands:
         while p:
             yield p.copy() if copy else p
             p.safeMoveToThreadNext()
+    #@+node:ekr.20261018203007.3: *5* c.self_and_subtree_nodes
+    def self_and_subtree_nodes(self, v, unique=False):
+        """
+        A generator yielding (v2, depth) for v and all vnodes in v's
+        subtree, in outline order, without creating positions.
+
+        v has depth 0. v may be a position.
+
+        unique: yield each vnode only once, like p.unique_subtree.
+        """
+        if not isinstance(v, leoNodes.VNode):
+            v = v.v
+        seen = {v} if unique else None
+        yield v, 0
+        stack = [iter(v.children)]
+        while stack:
+            for child in stack[-1]:
+                if seen is not None:
+                    if child in seen:
+                        continue
+                    seen.add(child)
+                yield child, len(stack)
+                if child.children:
+                    stack.append(iter(child.children))
+                    break
+            else:
+                stack.pop()
     #@+node:ekr.20060906211747: *4* c.Getters
     #@+node:ekr.20040803140033: *5* c.currentPosition
     def currentPosition(self):
@@ -1177,20 +1315,19 @@ class Commands:
         assert(c == context)
         positions = []
         for immediate in v.parents:
-            if v in immediate.children:
-                n = immediate.children.index(v)
-            else:
+            n = immediate.indexOfChild(v)
+            if n < 0:
                 continue
             stack = [(v, n)]
             while immediate.parents:
                 parent = immediate.parents[0]
-                if immediate in parent.children:
-                    n = parent.children.index(immediate)
-                else:
+                n = parent.indexOfChild(immediate)
+                if n < 0:
                     break
-                stack.insert(0, (immediate, n),)
+                stack.append((immediate, n))
                 immediate = parent
             else:
+                stack.reverse()
                 v, n = stack.pop()
                 p = leoNodes.Position(v, n, stack)
                 positions.append(p)
@@ -1205,16 +1342,16 @@ class Commands:
         stack = []
         while v.parents:
             parent = v.parents[0]
-            if v in parent.children:
-                n = parent.children.index(v)
-            else:
+            n = parent.indexOfChild(v)
+            if n < 0:
                 return None
-            stack.insert(0, (v, n),)
+            stack.append((v, n))
             v = parent
         # v.parents includes the hidden root node.
         if not stack:
             # a VNode not in the tree
             return None
+        stack.reverse()
         v, n = stack.pop()
         p = leoNodes.Position(v, n, stack)
         return p
@@ -1237,14 +1374,14 @@ class Commands:
     #@+node:ekr.20031218072017.2984: *5* c.clearAllMarked
     def clearAllMarked(self):
         c = self
-        for p in c.all_unique_positions(copy=False):
-            p.v.clearMarked()
+        for v in c.all_unique_nodes():
+            v.clearMarked()
     #@+node:ekr.20031218072017.2985: *5* c.clearAllVisited
     def clearAllVisited(self):
         c = self
-        for p in c.all_unique_positions(copy=False):
-            p.v.clearVisited()
-            p.v.clearWriteBit()
+        for v in c.all_unique_nodes():
+            v.clearVisited()
+            v.clearWriteBit()
     #@+node:ekr.20191215044636.1: *5* c.clearChanged
     def clearChanged(self):
         """clear the marker that indicates that the .leo file has been changed."""
@@ -2081,6 +2218,15 @@ class Commands:
         """
         c = self
         c.scanAtPathDirectivesCount += 1  # An important statistic.
+        # Step 0: Use the cached path if all inputs are the same.
+        key = (
+            c.openDirectory, g.app.config.relative_path_base_directory, g.app.loadDir,
+            tuple((d.get('path'), d.get('@path_in_body')) for d in aList if 'path' in d),
+        )
+        if c.pathCache is not None:
+            path = c.pathCache.get(key)
+            if path:
+                return path
         # Step 1: Compute the starting path.
         # The correct fallback directory is the absolute path to the base.
         if c.openDirectory:  # Bug fix: 2008/9/18
@@ -2111,8 +2257,13 @@ class Commands:
         paths.reverse()
         # Step 3: Compute the full, effective, absolute path.
         path = g.os_path_finalize_join(*paths)  # #1341.
-        return path or g.getBaseDirectory(c)
-            # 2010/10/22: A useful default.
+        if not path:
+            return g.getBaseDirectory(c)
+                # 2010/10/22: A useful default.
+        # Path expressions may have different values each time.
+        if c.pathCache is not None and '{{' not in repr(key):
+            c.pathCache[key] = path
+        return path
     #@+node:ekr.20080828103146.12: *4* c.scanAtRootDirectives (no longer used)
     # No longer used. Was called only by scanLanguageDirectives.
 
@@ -2253,6 +2404,8 @@ class Commands:
             if label == "cantundo": label = "undo"
             g.app.commandName = label
         if not g.doHook("command1", c=c, p=p, label=label):
+            perf = g.app.perfStats
+            t = perf and perf.start()
             try:
                 c.inCommand = True
                 val = c.executeAnyCommand(command, event)
@@ -2265,6 +2418,8 @@ class Commands:
                     raise
                 g.es_print("exception executing command")
                 g.es_exception(c=c)
+            if perf:
+                perf.stop(t, 'command', label or self.command_name)
             if c and c.exists:
                 if c.requestCloseWindow:
                     c.requestCloseWindow = False
@@ -3511,8 +3666,8 @@ class Commands:
     #@+node:ekr.20031218072017.2981: *6* c.canUnmarkAll
     def canUnmarkAll(self):
         c = self
-        for p in c.all_unique_positions():
-            if p.isMarked():
+        for v in c.all_unique_nodes():
+            if v.isMarked():
                 return True
         return False
     #@+node:ekr.20040323172420: *6* Slow routines: no longer used
@@ -3691,7 +3846,9 @@ class Commands:
         safe_at_file=True,
         theTypes=None,
         # force_at_others=False, # tag:no-longer-used
-        ignore_pattern=None
+        ignore_pattern=None,
+        parallel=None,
+        progress=None,
     ):
         #@+<< docstring >>
         #@+node:ekr.20130823083943.12614: *4* << docstring >>
@@ -3706,6 +3863,10 @@ class Commands:
             safe_at_file=True True: produce @@file nodes instead of @file nodes.
             theTypes=None     A list of file extensions to import.
                               None is equivalent to ['.py']
+            parallel=None     True: scan files in worker processes.
+                              None: use @bool parallel-recursive-import.
+            progress=None     A function f(n, total, path), called after
+                              importing each file. Returning False cancels.
 
         This method cleans imported files as follows:
 
@@ -3726,7 +3887,9 @@ class Commands:
                     safe_at_file=safe_at_file,
                     theTypes=['.py'] if not theTypes else theTypes,
                     # force_at_others = force_at_others,  # tag:no-longer-used
-                    ignore_pattern=ignore_pattern
+                    ignore_pattern=ignore_pattern,
+                    parallel=parallel,
+                    progress=progress,
                 )
                 cc.run(dir_)
             finally:
@@ -3964,12 +4127,9 @@ class Commands:
         c = self
         pat = re.compile(regex, flags)
         res = leoNodes.PosList()
-        for p in c.all_positions():
-            m = re.match(pat, p.h)
-            if m:
-                pc = p.copy()
-                pc.mo = m
-                res.append(pc)
+        for p in c.positions_where(lambda v: pat.match(v.h)):
+            p.mo = pat.match(p.h)
+            res.append(p)
         return res
     #@+node:ville.20090311200059.1: *5* c.find_b
     def find_b(self, regex, flags=re.IGNORECASE | re.MULTILINE):
@@ -3980,16 +4140,9 @@ class Commands:
         c = self
         pat = re.compile(regex, flags)
         res = leoNodes.PosList()
-        for p in c.all_positions():
-            m = re.finditer(pat, p.b)
-            t1, t2 = itertools.tee(m, 2)
-            try:
-                t1.__next__()
-            except StopIteration:
-                continue
-            pc = p.copy()
-            pc.matchiter = t2
-            res.append(pc)
+        for p in c.positions_where(lambda v: pat.search(v.b)):
+            p.matchiter = re.finditer(pat, p.b)
+            res.append(p)
         return res
     #@+node:ekr.20150410095543.1: *4* c.findNodeOutsideAnyAtFileTree
     def findNodeOutsideAnyAtFileTree(self, target):
@@ -3997,13 +4150,12 @@ class Commands:
         c = self
         if target.isCloned():
             v = target.v
-            for p in c.all_positions():
-                if p.v == v:
-                    for parent in p.self_and_parents(copy=False):
-                        if parent.isAnyAtFileNode():
-                            break
-                    else:
-                        return p
+            for p in c.positions_where(lambda v2: v2 is v):
+                for parent in p.self_and_parents(copy=False):
+                    if parent.isAnyAtFileNode():
+                        break
+                else:
+                    return p
         return target
     #@+node:ekr.20171124155725.1: *3* c.Settings
     #@+node:ekr.20171114114908.1: *4* c.registerReloadSettings
@@ -4019,6 +4171,7 @@ class Commands:
         other known classes.
         """
         c = self
+        c.config.clearSnapshot()
         table = [
             g.app.gui,
             g.app.pluginsController,
@@ -4043,6 +4196,114 @@ class Commands:
                     g.es_exception()
                     c.configurables.remove(obj)
     #@-others
+#@+node:ekr.20261019093021.1: ** class TestCommands
+class TestCommands(unittest.TestCase):
+    #@+others
+    #@+node:ekr.20261019093021.2: *3* TestCommands.bridge
+    def bridge(self):
+        """Return an instance of Leo's bridge."""
+        import leo.core.leoBridge as leoBridge
+        return leoBridge.controller(gui='nullGui',
+            loadPlugins=False,
+            readSettings=False,
+            silent=True,
+            verbose=False,
+        )
+    #@+node:ekr.20261019093021.3: *3* TestCommands.make_outline
+    def make_outline(self):
+        """Return a commander whose outline contains nested clones."""
+        c = self.bridge().openLeoFile(None)
+        root = c.rootPosition()
+        root.h = 'root'
+        for i in range(3):
+            child = root.insertAsLastChild()
+            child.h = f"child {i}"
+            for j in range(2):
+                child.insertAsLastChild().h = f"grandchild {i} {j}"
+        # A clone of a node with children, in another subtree.
+        clone = root.firstChild().clone()
+        clone.moveToLastChildOf(root.lastChild())
+        # A clone of a node that contains a clone.
+        clone = root.lastChild().clone()
+        clone.moveAfter(root)
+        # A top-level clone.
+        clone = root.lastChild().firstChild().clone()
+        clone.moveAfter(c.lastTopLevel())
+        return c
+    #@+node:ekr.20261019093021.4: *3* TestCommands.unique_subtree
+    def unique_subtree(self, c, root=None):
+        """
+        Yield positions in outline order, skipping the subtrees of vnodes
+        already seen, as c.all_unique_positions does.
+        """
+        seen = set()
+        p = root.copy() if root else c.rootPosition()
+        after = root.nodeAfterTree() if root else None
+        while p and p != after:
+            if p.v in seen:
+                p.moveToNodeAfterTree()
+            else:
+                seen.add(p.v)
+                yield p.copy()
+                p.moveToThreadNext()
+    #@+node:ekr.20261019093021.5: *3* TestCommands.test_vnode_generators
+    def test_vnode_generators(self):
+        """Test the vnode generators against the position generators."""
+        c = self.make_outline()
+        all_positions = list(c.all_positions())
+        unique_positions = list(c.all_unique_positions())
+        self.assertEqual(unique_positions, list(self.unique_subtree(c)))
+        self.assertGreater(len(all_positions), len(unique_positions))
+        # c.all_nodes_with_depth.
+        self.assertEqual(
+            list(c.all_nodes_with_depth()),
+            [(p.v, p.level()) for p in all_positions])
+        self.assertEqual(
+            list(c.all_nodes_with_depth(unique=True)),
+            [(p.v, p.level()) for p in unique_positions])
+        # c.all_nodes_with_parents.
+        self.assertEqual(
+            list(c.all_nodes_with_parents()),
+            [(p.v, p._parentVnode(), p._childIndex) for p in all_positions])
+        self.assertEqual(
+            list(c.all_nodes_with_parents(unique=True)),
+            [(p.v, p._parentVnode(), p._childIndex) for p in unique_positions])
+        # c.self_and_subtree_nodes.
+        for p in all_positions:
+            self.assertEqual(
+                list(c.self_and_subtree_nodes(p)),
+                [(z.v, z.level() - p.level()) for z in p.self_and_subtree()])
+            self.assertEqual(
+                list(c.self_and_subtree_nodes(p.v, unique=True)),
+                [(z.v, z.level() - p.level()) for z in self.unique_subtree(c, p)])
+        c.close()
+    #@+node:ekr.20261019093021.6: *3* TestCommands.test_positions_where
+    def test_positions_where(self):
+        """Test c.positions_where against the position generators."""
+        c = self.make_outline()
+
+        def predicate(v):
+            return v.h.startswith('grandchild 0') or v.h == 'child 2'
+
+        def check(result, expected):
+            result = list(result)
+            self.assertEqual(result, expected)
+            # The positions have correct stacks.
+            for p in result:
+                self.assertTrue(c.positionExists(p), p)
+                self.assertTrue(predicate(p.v), p)
+
+        check(c.positions_where(predicate),
+            [p for p in c.all_positions() if predicate(p.v)])
+        check(c.positions_where(predicate, unique=True),
+            [p for p in c.all_unique_positions() if predicate(p.v)])
+        for root in c.all_positions():
+            check(c.positions_where(predicate, root=root),
+                [p for p in root.self_and_subtree() if predicate(p.v)])
+            check(c.positions_where(predicate, root=root, unique=True),
+                [p for p in self.unique_subtree(c, root) if predicate(p.v)])
+        c.close()
+    #@-others
 #@-others
 #@@language python
 #@@tabwidth -4
@@ -305,6 +305,10 @@ class ParserBaseClass:
         if not aList:
             return 'skip'
         name = aList[0]
+        lm = g.app.loadManager
+        if lm:
+            lm.settingsEnvNames.add(name)
+                # Part of the key of the settings cache.
         env = os.getenv(name)
         env = env.lower().strip() if env else 'none'
         for s in aList[1:]:
@@ -977,7 +981,8 @@ class ActiveSettingsOutline:
         Open hidden commanders for leoSettings.leo, myLeoSettings.leo and theme.leo.
         """
         lm = g.app.loadManager
-        lm.readGlobalSettingsFiles()
+        lm.readGlobalSettingsFiles(useCache=False)
+            # Open the settings commanders.
         # Make sure to reload the local file.
         c = g.app.commanders()[0]
         fn = c.fileName()
@@ -1732,6 +1737,8 @@ class LocalConfigManager:
             self.initEncoding(key)
         for key in sorted(list(g.app.config.ivarsDict.keys())):
             self.initIvar(key)
+        self._snapshot = None
+            # The cached SettingsSnapshot. See c.config.snapshot.
     #@+node:ekr.20041118104414: *4* c.config.initEncoding
     def initEncoding(self, key):
         # Important: the key is munged.
@@ -2193,6 +2200,7 @@ class LocalConfigManager:
                 c.mFileName) != g.os_path_finalize(path):  # #1341.
                 g.es("over-riding setting:", name, "from", path)
         d[key] = g.GeneralSetting(kind, path=c.mFileName, val=val, tag='setting')
+        self.clearSnapshot()
     #@+node:ekr.20190905082644.1: *3* c.config.settingIsActiveInPath
     def settingIsActiveInPath(self, gs, target_path):
         """Return True if settings file given by path actually defines the setting, gs."""
@@ -2226,7 +2234,80 @@ class LocalConfigManager:
         c.setChanged(redrawFlag=False)
         p.setDirty()
         c.redraw_later()
+    #@+node:ekr.20261018211009.2: *3* c.config.snapshot & clearSnapshot
+    @property
+    def snapshot(self):
+        """
+        Return a SettingsSnapshot of this commander's settings, creating a new
+        snapshot if the settings have changed.
+
+        Commanders without local settings share lm.globalSettingsDict, so
+        compare the dict's change count, not just the dict itself.
+        """
+        d = self.settingsDict
+        snapshot = self._snapshot
+        if (
+            snapshot is None
+            or snapshot._settings_dict is not d
+            or snapshot._changes != getattr(d, 'changes', 0)
+        ):
+            snapshot = self._snapshot = SettingsSnapshot(d)
+        return snapshot
+
+    def clearSnapshot(self):
+        """
+        Make c.config.snapshot create a new snapshot, for this commander and
+        all commanders sharing its settings dict.
+        """
+        self._snapshot = None
+        if isinstance(self.settingsDict, g.TypedDict):
+            self.settingsDict.changes += 1
     #@-others
+#@+node:ekr.20261018211009.1: ** class SettingsSnapshot
+class SettingsSnapshot:
+    """
+    A snapshot of the typed values of a commander's settings, for code that
+    gets settings often. Get the snapshot with c.config.snapshot.
+
+    Attributes are setting names, with '_' in place of '-':
+
+        if c.config.snapshot.log_show_save_time:
+
+    The first access to an attribute munges the name. Later accesses are
+    ordinary attribute lookups.
+
+    An attribute's value is the value c.config.get returns for the setting's
+    own kind, with @bool settings that are not True or False and @int
+    settings that are not ints converted to None. The value is None if the
+    setting does not exist.
+    """
+
+    def __init__(self, settingsDict):
+        """Ctor for SettingsSnapshot class."""
+        self._settings_dict = settingsDict
+        self._changes = getattr(settingsDict, 'changes', 0)
+        # Munged names never contain '_', so they can't clash with these ivars.
+        d = self.__dict__
+        for key, gs in (settingsDict.items() if settingsDict else []):
+            val, kind = gs.val, gs.kind
+            if val in ('None', 'none', ''):
+                val = ''  # As in c.config.getValFromDict.
+            elif kind == 'bool':
+                val = val if val in (True, False) else None
+            elif kind == 'int':
+                try:
+                    val = int(val)
+                except(TypeError, ValueError):
+                    val = None
+            d[key] = val
+
+    def __getattr__(self, name):
+        """Called only for names that are not yet in self.__dict__."""
+        if name.startswith('__'):
+            raise AttributeError(name)
+        val = self.__dict__.get(g.app.config.munge(name))
+        setattr(self, name, val)
+        return val
 #@+node:ekr.20041119203941.3: ** class SettingsTreeParser (ParserBaseClass)
 class SettingsTreeParser(ParserBaseClass):
     """A class that inits settings found in an @settings tree.
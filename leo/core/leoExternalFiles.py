@@ -5,9 +5,13 @@
 import leo.core.leoGlobals as g
 import getpass
 import os
+import stat
+import struct
 import subprocess
+import sys
 import tempfile
 import time
+import unittest
 #@+others
 #@+node:ekr.20160306110233.1: ** class ExternalFile
 class ExternalFile:
@@ -35,6 +39,115 @@ class ExternalFile:
         '''Return True if the external file still exists.'''
         return g.os_path_exists(self.path)
     #@-others
+#@+node:ekr.20261018202757.1: ** class FileWatcher
+class FileWatcher:
+    '''
+    A class reporting changes to watched files using Linux's inotify.
+
+    fw.ok is False if inotify is not available. The ExternalFilesController
+    then polls the modification times of the watched files.
+    '''
+    # Flags from <sys/inotify.h>.
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_NONBLOCK = 0x00000800
+    IN_CLOEXEC = 0x00080000
+    #@+others
+    #@+node:ekr.20261018202757.2: *3* fw.ctor
+    def __init__(self):
+        '''Ctor for FileWatcher class.'''
+        self.dirs_d = {}
+            # Keys are directories, values are watch descriptors.
+        self.fd = None
+        self.libc = None
+        self.ok = False
+        self.wd_d = {}
+            # Keys are watch descriptors, values are directories.
+        if not sys.platform.startswith('linux'):
+            return
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        except Exception:
+            return
+        if fd < 0:
+            return
+        self.fd, self.libc, self.ok = fd, libc, True
+    #@+node:ekr.20261018202757.3: *3* fw.close
+    def close(self):
+        '''Stop watching all files.'''
+        if self.fd is not None:
+            try:
+                os.close(self.fd)
+            except OSError:
+                pass
+        self.dirs_d, self.wd_d = {}, {}
+        self.fd, self.ok = None, False
+    #@+node:ekr.20261018202757.4: *3* fw.poll
+    def poll(self):
+        '''
+        Return the set of real paths changed since the last call,
+        or None if the kernel's event queue overflowed.
+        '''
+        changed = set()
+        if not self.ok:
+            return changed
+        header = struct.Struct('iIII')
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                self.close()
+                return None
+            if not data:
+                break
+            i = 0
+            while i + header.size <= len(data):
+                wd, mask, cookie, n = header.unpack_from(data, i)
+                i += header.size
+                name = data[i : i + n].rstrip(b'\0')
+                i += n
+                if mask & self.IN_Q_OVERFLOW:
+                    return None
+                directory = self.wd_d.get(wd)
+                if mask & self.IN_IGNORED:
+                    # The directory no longer exists.
+                    if directory:
+                        del self.wd_d[wd]
+                        self.dirs_d.pop(directory, None)
+                elif directory and name:
+                    changed.add(os.path.join(directory, os.fsdecode(name)))
+        return changed
+    #@+node:ekr.20261018202757.5: *3* fw.watch
+    def watch(self, path):
+        '''
+        Watch the directory containing path.
+
+        Watching directories handles editors that save files by renaming.
+        '''
+        if not self.ok:
+            return False
+        directory = os.path.dirname(g.os_path_realpath(path))
+        if directory in self.dirs_d:
+            return True
+        mask = self.IN_MODIFY | self.IN_ATTRIB | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+        if wd < 0:
+            # ENOSPC: too many watches. Poll this file instead.
+            return False
+        self.dirs_d[directory] = wd
+        self.wd_d[wd] = directory
+        return True
+    #@-others
 #@+node:ekr.20150405073203.1: ** class ExternalFilesController
 class ExternalFilesController:
     '''
@@ -67,6 +180,17 @@ class ExternalFilesController:
         self.has_changed_d = {}
             # Keys are commanders. Values are bools.
             # Used only to limit traces.
+        self.index_d = {}
+            # Keys are commanders. Values are (d, polled, paths_d) tuples.
+            # d: keys are real paths, values are lists of @<file> vnodes.
+            # polled: real paths that self.watcher can not watch.
+            # paths_d: keys are @<file> vnodes, values are real paths.
+        self.pending_d = {}
+            # Keys are commanders. Values are sets of real paths
+            # that self.watcher has reported as changed.
+        self.size_d = {}
+            # Keys are full paths, values are file sizes.
+            # Updated whenever checksum_d is updated.
         self.unchecked_commanders = []
             # Copy of g.app.commanders()
         self.unchecked_files = []
@@ -77,6 +201,7 @@ class ExternalFilesController:
             # get_time(path), see set_time() for notes.
         self.yesno_all_time = 0  # previous yes/no to all answer, time of answer
         self.yesno_all_answer = None  # answer, 'yes-all', or 'no-all'
+        self.watcher = FileWatcher()
         g.app.idleTimeManager.add_callback(self.on_idle)
     #@+node:ekr.20150405105938.1: *3* efc.entries
     #@+node:ekr.20150405194745.1: *4* efc.check_overwrite (called from c.checkTimeStamp)
@@ -137,6 +262,7 @@ class ExternalFilesController:
                 c.outerUpdate()
         if 1:
             # Fix #262: Improve performance when @bool check-for-changed-external-files is True.
+            self.poll_watcher()
             if self.unchecked_files:
                 # Check all external files.
                 for ef in self.unchecked_files:
@@ -154,6 +280,12 @@ class ExternalFilesController:
                     z for z in g.app.commanders() if self.is_enabled(z)
                 ]
                 self.unchecked_files = [z for z in self.files if z.exists()]
+                # Forget closed commanders.
+                for z in list(self.index_d):
+                    if z not in self.unchecked_commanders:
+                        del self.index_d[z]
+                        self.pending_d.pop(z, None)
+                        z.outlineChanges = None
         else:
             # First, check all existing open-with files.
             for ef in self.files:  # A list of ExternalFile instances.
@@ -169,12 +301,36 @@ class ExternalFilesController:
         '''
         Check all external files corresponding to @<file> nodes in c for
         changes.
+
+        Scan the entire outline only when c has no index. Otherwise, update
+        the index for the nodes in c.outlineChanges, then check only the
+        files that self.watcher has reported as changed and the files whose
+        modification times have changed.
         '''
-        # #1100: always scan the entire file for @<file> nodes.
-        # #1134: Nested @<file> nodes are no longer valid, but this will do no harm.
-        for p in c.all_unique_positions():
-            if p.isAnyAtFileNode():
-                self.idle_check_at_file_node(c, p)
+        index = self.index_d.get(c)
+        if not index:
+            self.index_commander(c)
+            return
+        if c.outlineChanges:
+            self.update_index(c, c.outlineChanges)
+        d, polled, paths_d = index
+        paths = self.pending_d.get(c) or set()
+        self.pending_d[c] = set()
+        for path in polled:
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            if mtime != self._time_d.get(path):
+                paths.add(path)
+        for path in sorted(paths):
+            for v in list(d.get(path, [])):
+                p = c.vnode2position(v)
+                if self.is_valid_entry(c, p, path):
+                    self.idle_check_at_file_node(c, p)
+                else:
+                    # An @path directive in a body has changed.
+                    self.update_index(c, [v])
     #@+node:ekr.20150403044823.1: *5* efc.idle_check_at_file_node
     def idle_check_at_file_node(self, c, p):
         '''Check the @<file> node at p for external changes.'''
@@ -195,7 +351,94 @@ class ExternalFilesController:
                 c.redraw()
             # Always update the path & time to prevent future warnings.
             self.set_time(path)
-            self.checksum_d[path] = self.checksum(path)
+            self.update_checksum(path)
+    #@+node:ekr.20261018202757.6: *5* efc.index_commander & helper
+    def index_commander(self, c):
+        '''
+        Check all @<file> nodes in c for changes, as in Leo 6.2, and
+        create c's index of @<file> nodes.
+
+        From now on, the link primitives and v.setHeadString add vnodes to
+        c.outlineChanges, and efc.update_index keeps the index up to date.
+        '''
+        index = {}, set(), {}
+        # #1100: always scan the entire file for @<file> nodes.
+        # #1134: Nested @<file> nodes are no longer valid, but this will do no harm.
+        for p in c.all_unique_positions():
+            if p.isAnyAtFileNode():
+                self.add_index_entry(c, index, p)
+                self.idle_check_at_file_node(c, p)
+        self.index_d[c] = index
+        self.pending_d[c] = set()
+        c.outlineChanges = set()
+    #@+node:ekr.20261019090112.1: *6* efc.add_index_entry
+    def add_index_entry(self, c, index, p):
+        '''Add p, an @<file> node, to c's index. Return its real path.'''
+        d, polled, paths_d = index
+        path = g.os_path_realpath(g.fullPath(c, p))
+        if path not in d and not self.watcher.watch(path):
+            polled.add(path)
+        d.setdefault(path, []).append(p.v)
+        paths_d[p.v] = path
+        return path
+    #@+node:ekr.20261019090112.2: *5* efc.update_index
+    def update_index(self, c, vnodes):
+        '''
+        Update c's index for the given vnodes and their descendants.
+
+        The vnodes have been linked, unlinked or renamed, so the @<file>
+        nodes in their subtrees may have been added, removed or moved to
+        other paths. Check new @<file> nodes as efc.index_commander does.
+        '''
+        index = self.index_d.get(c)
+        if not index:
+            return
+        d, polled, paths_d = index
+        if vnodes is c.outlineChanges:
+            c.outlineChanges = set()
+        seen = set()
+        stack = list(vnodes)
+        while stack:
+            v = stack.pop()
+            if v in seen:
+                continue
+            seen.add(v)
+            stack.extend(v.children)
+            old_path = paths_d.pop(v, None)
+            if old_path:
+                aList = d.get(old_path, [])
+                if v in aList:
+                    aList.remove(v)
+                if not aList:
+                    d.pop(old_path, None)
+                    polled.discard(old_path)
+            if v.isAnyAtFileNode():
+                p = c.vnode2position(v)
+                if p and c.positionExists(p):
+                    path = self.add_index_entry(c, index, p)
+                    if path != old_path:
+                        self.idle_check_at_file_node(c, p)
+    #@+node:ekr.20261018202757.8: *5* efc.is_valid_entry
+    def is_valid_entry(self, c, p, path):
+        '''Return True if p is still an @<file> node for path.'''
+        return bool(
+            p and c.positionExists(p) and p.isAnyAtFileNode() and
+            g.os_path_realpath(g.fullPath(c, p)) == path
+        )
+    #@+node:ekr.20261018202757.9: *5* efc.poll_watcher
+    def poll_watcher(self):
+        '''Add the paths reported by self.watcher to self.pending_d.'''
+        if not self.watcher.ok:
+            return
+        changed = self.watcher.poll()
+        if changed is None:
+            # Events have been lost. Rescan all outlines.
+            self.index_d, self.pending_d = {}, {}
+        elif changed:
+            for c, pending in self.pending_d.items():
+                index = self.index_d.get(c)
+                if index:
+                    pending.update(changed.intersection(index[0]))
     #@+node:ekr.20150407124259.1: *5* efc.idle_check_open_with_file & helper
     def idle_check_open_with_file(self, ef):
         '''Update the open-with node given by ef.'''
@@ -459,6 +702,7 @@ class ExternalFilesController:
         for ef in self.files[:]:
             self.destroy_temp_file(ef)
         self.files = []
+        self.watcher.close()
     #@+node:ekr.20150405110219.1: *3* efc.utilities
     # pylint: disable=no-value-for-parameter
     #@+node:ekr.20150405200212.1: *4* efc.ask
@@ -483,7 +727,7 @@ class ExternalFilesController:
                 where = 'the outline node'
         else:
             where = p.h
-        _is_leo = path.endswith(('.leo', '.db'))
+        _is_leo = path.endswith(('.leo', '.db', '.leojsonl'))
         if _is_leo:
             s = '\n'.join([
                 f"{g.splitLongFileName(path)} has changed outside Leo.",
@@ -505,10 +749,12 @@ class ExternalFilesController:
     def checksum(self, path):
         '''Return the checksum of the file at the given path.'''
         import hashlib
+        h = hashlib.md5()
         # #1454: Explicitly close the file.
         with open(path, 'rb') as f:
-            s = f.read()
-        return hashlib.md5(s).hexdigest()
+            for s in iter(lambda: f.read(1 << 20), b''):
+                h.update(s)
+        return h.hexdigest()
     #@+node:ekr.20031218072017.2614: *4* efc.destroy_temp_file
     def destroy_temp_file(self, ef):
         '''Destroy the *temp* file corresponding to ef, an ExternalFile instance.'''
@@ -533,22 +779,29 @@ class ExternalFilesController:
     #@+node:ekr.20150403045207.1: *4* efc.has_changed
     def has_changed(self, c, path):
         '''Return True if p's external file has changed outside of Leo.'''
-        if not g.os_path_exists(path):
+        try:
+            st = os.stat(path)
+        except OSError:
             return False
-        if g.os_path_isdir(path):
+        if stat.S_ISDIR(st.st_mode):
             return False
         #
         # First, check the modification times.
         old_time = self.get_time(path)
-        new_time = self.get_mtime(path)
+        new_time = st.st_mtime
         if not old_time:
             # Initialize.
             self.set_time(path, new_time)
-            self.checksum_d[path] = self.checksum(path)
+            self.update_checksum(path)
             return False
         if old_time == new_time:
             return False
         #
+        # A change in size means the contents have changed.
+        old_size = self.size_d.get(path)
+        if old_size is not None and old_size != st.st_size:
+            return True
+        #
         # Check the checksums *only* if the mod times don't match.
         old_sum = self.checksum_d.get(path)
         new_sum = self.checksum(path)
@@ -592,7 +845,13 @@ class ExternalFilesController:
         Hence the need to call realpath() here.
         '''
         t = new_time or self.get_mtime(path)
-        self._time_d[g.os_path_realpath(path)] = t
+        path = g.os_path_realpath(path)
+        self._time_d[path] = t
+    #@+node:ekr.20261018202757.10: *4* efc.update_checksum
+    def update_checksum(self, path):
+        '''Update the checksum and size of the file at the given path.'''
+        self.size_d[path] = os.stat(path).st_size
+        self.checksum_d[path] = self.checksum(path)
     #@+node:ekr.20190218055230.1: *4* efc.warn
     def warn(self, c, path, p):
         '''
@@ -616,6 +875,93 @@ class ExternalFilesController:
             title='External file changed',
         )
     #@-others
+#@+node:ekr.20261018202757.11: ** class TestExternalFilesController
+class TestExternalFilesController(unittest.TestCase):
+    #@+others
+    #@+node:ekr.20261018230731.1: *3* TestExternalFilesController.bridge
+    def bridge(self):
+        """Return an instance of Leo's bridge."""
+        import leo.core.leoBridge as leoBridge
+        return leoBridge.controller(gui='nullGui',
+            loadPlugins=False,
+            readSettings=False,
+            silent=True,
+            verbose=False,
+        )
+    #@+node:ekr.20261018202757.12: *3* TestExternalFilesController.test_idle_check_commander
+    def test_idle_check_commander(self):
+        """Test that idle_check_commander checks only changed files."""
+        import leo.core.leoApp as leoApp
+        bridge = self.bridge()
+        # The bridge does not create an IdleTimeManager.
+        if not g.app.idleTimeManager:
+            g.app.idleTimeManager = leoApp.IdleTimeManager()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            c = bridge.openLeoFile(os.path.join(temp_dir, 'test_file.leo'))
+            path = os.path.join(temp_dir, 'test.txt')
+            with open(path, 'w') as f:
+                f.write('line 1\n')
+            p = c.rootPosition()
+            p.h = f"@clean {path}"
+            efc = ExternalFilesController(c)
+            checked = []
+            old_check = efc.idle_check_at_file_node
+
+            def check(c, p):
+                checked.append(p.h)
+                old_check(c, p)
+
+            efc.idle_check_at_file_node = check
+            try:
+                efc.idle_check_commander(c)
+                self.assertEqual(len(checked), 1)
+                efc.poll_watcher()
+                efc.idle_check_commander(c)
+                self.assertEqual(len(checked), 1)
+                with open(path, 'w') as f:
+                    f.write('line 1\nline 2\n')
+                t = os.stat(path).st_mtime + 10
+                os.utime(path, (t, t))
+                efc.poll_watcher()
+                self.assertTrue(efc.has_changed(c, path))
+                efc.idle_check_commander(c)
+                self.assertEqual(len(checked), 2)
+                # Adding, renaming and deleting @<file> nodes updates the index.
+                scans = []
+                efc.index_commander = scans.append
+
+                def paths():
+                    d, polled, paths_d = efc.index_d[c]
+                    self.assertEqual(
+                        sorted(paths_d.values()), sorted(z for z in d for v in d[z]))
+                    return sorted(os.path.basename(z) for z in d)
+
+                path2 = os.path.join(temp_dir, 'test2.txt')
+                with open(path2, 'w') as f:
+                    f.write('line 1\n')
+                p2 = p.insertAfter()
+                p2.h = f"@clean {path2}"
+                efc.idle_check_commander(c)
+                self.assertEqual(paths(), ['test.txt', 'test2.txt'])
+                self.assertEqual(checked[-1], p2.h)
+                p2.h = '@clean test3.txt'
+                efc.idle_check_commander(c)
+                self.assertEqual(paths(), ['test.txt', 'test3.txt'])
+                # Moving an @<file> node under an @path node changes its path.
+                p3 = p2.insertAfter()
+                p3.h = '@path sub'
+                p2.moveToLastChildOf(p3)
+                efc.idle_check_commander(c)
+                d = efc.index_d[c][0]
+                self.assertTrue(any(z.endswith(os.path.join('sub', 'test3.txt')) for z in d), d)
+                p3.doDelete()
+                efc.idle_check_commander(c)
+                self.assertEqual(paths(), ['test.txt'])
+                self.assertEqual(scans, [])
+                self.assertFalse(c.outlineChanges)
+            finally:
+                efc.shut_down()
+    #@-others
 #@-others
 #@@language python
 #@@tabwidth -4
@@ -13,7 +13,8 @@ except Exception:
 import leo.core.leoGlobals as g
 import leo.core.leoNodes as leoNodes
 import binascii
-from collections import defaultdict
+import codecs
+from collections import defaultdict, OrderedDict
 import difflib
 import time
 import io
@@ -22,9 +23,11 @@ BytesIO = io.BytesIO
 import os
 import pickle
 import tempfile
+import unittest
 import zipfile
 import sqlite3
 import hashlib
+import json
 from contextlib import contextmanager
 #@-<< imports >>
 PRIVAREA = '---begin-private-area---'
@@ -53,11 +56,18 @@ class FastRead:
         self.gnx2vnode = gnx2vnode
     #@+others
     #@+node:ekr.20180604110143.1: *3* fast.readFile/FromClipboard & helper
-    def readFile(self, path):
-        """Read the file, change splitter ratiors, and return its hidden vnode."""
-        with open(path, 'rb') as f:
-            s = f.read()
-        v, g_element = self.readWithElementTree(path, s)
+    def readFile(self, path, streaming=False):
+        """
+        Read the file, change splitter ratiors, and return its hidden vnode.
+
+        streaming: use fast.readWithIterparse instead of building an ElementTree.
+        """
+        if streaming:
+            v, g_element = self.readWithIterparse(path), None
+        else:
+            with open(path, 'rb') as f:
+                s = f.read()
+            v, g_element = self.readWithElementTree(path, s)
         if not v:  # #1510.
             return None
         self.scanGlobals(g_element)
@@ -89,6 +99,8 @@ class FastRead:
     #@+node:ekr.20180602062323.7: *4* fast.readWithElementTree & helpers
     # #1510: https://en.wikipedia.org/wiki/Valid_characters_in_XML.
     translate_table = {z: None for z in range(20) if chr(z) not in '\t\r\n'}
+    chunk_size = 1 << 20
+        # The number of bytes fast.readWithIterparse reads at once.
 
     def readWithElementTree(self, path, s):
 
@@ -115,6 +127,126 @@ class FastRead:
         hidden_v = self.scanVnodes(gnx2body, self.gnx2vnode, gnx2ua, v_elements)
         self.handleBits()
         return hidden_v, g_element
+    #@+node:ekr.20261018204329.1: *4* fast.readWithIterparse & helper
+    def readWithIterparse(self, path):
+        """
+        Read the .leo file at path without building an ElementTree.
+        Return its hidden vnode, or None.
+        """
+        new_gnxs = set()
+        try:
+            with open(path, 'rb') as f:
+                hidden_v = self.scanEvents(f, new_gnxs)
+        except ElementTree.ParseError as e:
+            # Forget the vnodes created so far.
+            for gnx in new_gnxs:
+                self.gnx2vnode.pop(gnx, None)
+            g.es_print(f"\nbad .leo file: {g.shortFileName(path)}", color='red')
+            g.es_print(g.toUnicode(e))
+            print('')
+            return None
+        self.handleBits()
+        return hidden_v
+    #@+node:ekr.20261018204329.2: *5* fast.scanEvents
+    def scanEvents(self, f, new_gnxs):
+        """
+        Create the outline from the xml events of the open file f.
+
+        Create vnodes as <v> elements arrive, and set body text as <t>
+        elements arrive. Clear all elements after use, so that only a few
+        elements exist at any time.
+
+        Add the gnxs of all new vnodes to new_gnxs.
+        """
+        c, gnx2vnode = self.c, self.gnx2vnode
+        decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        parser = ElementTree.XMLPullParser(events=('start', 'end'))
+
+        def events():
+            while True:
+                data = f.read(self.chunk_size)
+                if not data:
+                    break
+                parser.feed(decoder.decode(data).translate(self.translate_table))
+                    # Fix #1036, #1046 and #1510.
+                yield from parser.read_events()
+            parser.feed(decoder.decode(b'', True))
+            parser.close()
+            yield from parser.read_events()
+
+        gnx = 'hidden-root-vnode-gnx'
+        hidden_v = leoNodes.VNode(context=c, gnx=gnx)
+        hidden_v._headString = '<hidden root vnode>'
+        gnx2vnode[gnx] = hidden_v
+        stack = [hidden_v]
+            # The vnodes of all open <v> elements.
+        skip = 0
+            # > 0: within a clone's <v> element. Ignore its contents.
+        linked_gnxs, t_gnxs = set(), set()
+        vnodes_e = tnodes_e = None
+        for event, e in events():
+            tag = e.tag
+            if event == 'start':
+                if tag == 'v':
+                    if skip:
+                        skip += 1
+                        continue
+                    parent_v = stack[-1]
+                    gnx = e.attrib['t']
+                    v = gnx2vnode.get(gnx)
+                    if v:
+                        # A clone.
+                        skip = 1
+                    else:
+                        v = leoNodes.VNode(context=c, gnx=gnx)
+                        v._headString = 'PLACE HOLDER'
+                        gnx2vnode[gnx] = v
+                        new_gnxs.add(gnx)
+                        self.scanVnodeAttributes(v, e.attrib, {})
+                    parent_v.children.append(v)
+                    v.parents.append(parent_v)
+                    linked_gnxs.add(gnx)
+                    stack.append(v)
+                elif tag == 'vnodes':
+                    vnodes_e = e
+                elif tag == 'tnodes':
+                    tnodes_e = e
+                continue
+            # An end event.
+            if tag == 'v':
+                if skip:
+                    skip -= 1
+                if not skip:
+                    stack.pop()
+                e.clear()
+                if len(stack) == 1 and vnodes_e is not None:
+                    vnodes_e.clear()
+            elif tag == 'vh':
+                if not skip:
+                    stack[-1]._headString = g.toUnicode(e.text or '')
+                e.clear()
+            elif tag == 't':
+                gnx = e.attrib['tx']
+                if gnx in linked_gnxs:
+                    v = gnx2vnode[gnx]
+                    t_gnxs.add(gnx)
+                    # The body overrides any previous body text.
+                    v._bodyString = g.toUnicode(e.text or '')
+                    if gnx in new_gnxs and len(e.attrib) > 1:
+                        # The uA's of the <v> element take precedence.
+                        uaDict = {
+                            key: self.resolveUa(key, val)
+                                for key, val in e.attrib.items() if key != 'tx'
+                        }
+                        uaDict.update(getattr(v, 'unknownAttributes', {}))
+                        v.unknownAttributes = uaDict
+                e.clear()
+                if tnodes_e is not None:
+                    tnodes_e.clear()
+        # Like scanVnodes, clear the body text of clones without <t> elements.
+        for gnx in linked_gnxs - new_gnxs - t_gnxs:
+            gnx2vnode[gnx]._bodyString = ''
+        return hidden_v
     #@+node:ekr.20180624125321.1: *5* fast.handleBits (reads c.db)
     def handleBits(self):
         """Restore the expanded and marked bits from c.db."""
@@ -281,7 +413,7 @@ class FastRead:
     #@+node:ekr.20180602062323.9: *5* fast.scanVnodes & helper
     def scanVnodes(self, gnx2body, gnx2vnode, gnx2ua, v_elements):
 
-        c, fc = self.c, self.c.fileCommands
+        c = self.c
         #@+<< define v_element_visitor >>
         #@+node:ekr.20180605102822.1: *6* << define v_element_visitor >>
         def v_element_visitor(parent_e, parent_v):
@@ -313,39 +445,9 @@ class FastRead:
                     v._bodyString = body
                     v._headString = 'PLACE HOLDER'
                     #@-<< Make a new vnode, linked to the parent >>
-                    #@+<< handle all other v attributes >>
-                    #@+node:ekr.20180605075113.1: *7* << handle all other v attributes >>
-                    # Like fc.handleVnodeSaxAttrutes.
-                    #
-                    # The native attributes of <v> elements are a, t, vtag, tnodeList,
-                    # marks, expanded, and descendentTnode/VnodeUnknownAttributes.
-                    d = e.attrib
-                    s = d.get('tnodeList', '')
-                    tnodeList = s and s.split(',')
-                    if tnodeList:
-                        # This tnodeList will be resolved later.
-                        v.tempTnodeList = tnodeList
-                    s = d.get('descendentTnodeUnknownAttributes')
-                    if s:
-                        aDict = fc.getDescendentUnknownAttributes(s, v=v)
-                        if aDict:
-                            fc.descendentTnodeUaDictList.append(aDict)
-                    s = d.get('descendentVnodeUnknownAttributes')
-                    if s:
-                        aDict = fc.getDescendentUnknownAttributes(s, v=v)
-                        if aDict:
-                            fc.descendentVnodeUaDictList.append((v, aDict),)
-                    #
-                    # Handle vnode uA's
-                    uaDict = gnx2ua[gnx]
+                    self.scanVnodeAttributes(v, e.attrib, gnx2ua[gnx])
                         # gnx2ua is a defaultdict(dict)
                         # It might already exists because of tnode uA's.
-                    for key, val in d.items():
-                        if key not in self.nativeVnodeAttributes:
-                            uaDict[key] = self.resolveUa(key, val)
-                    if uaDict:
-                        v.unknownAttributes = uaDict
-                    #@-<< handle all other v attributes >>
                     # Handle all inner elements.
                     v_element_visitor(e, v)
 
@@ -361,6 +463,41 @@ class FastRead:
         # Traverse the tree of v elements.
         v_element_visitor(v_elements, hidden_v)
         return hidden_v
+    #@+node:ekr.20180605075113.1: *5* fast.scanVnodeAttributes
+    def scanVnodeAttributes(self, v, d, uaDict):
+        """
+        Handle all attributes of a <v> element for a new vnode v.
+
+        d is the element's attribute dict.
+        uaDict contains the uA's of the corresponding <t> element.
+        """
+        # Like fc.handleVnodeSaxAttrutes.
+        #
+        # The native attributes of <v> elements are a, t, vtag, tnodeList,
+        # marks, expanded, and descendentTnode/VnodeUnknownAttributes.
+        fc = self.c.fileCommands
+        s = d.get('tnodeList', '')
+        tnodeList = s and s.split(',')
+        if tnodeList:
+            # This tnodeList will be resolved later.
+            v.tempTnodeList = tnodeList
+        s = d.get('descendentTnodeUnknownAttributes')
+        if s:
+            aDict = fc.getDescendentUnknownAttributes(s, v=v)
+            if aDict:
+                fc.descendentTnodeUaDictList.append(aDict)
+        s = d.get('descendentVnodeUnknownAttributes')
+        if s:
+            aDict = fc.getDescendentUnknownAttributes(s, v=v)
+            if aDict:
+                fc.descendentVnodeUaDictList.append((v, aDict),)
+        #
+        # Handle vnode uA's
+        for key, val in d.items():
+            if key not in self.nativeVnodeAttributes:
+                uaDict[key] = self.resolveUa(key, val)
+        if uaDict:
+            v.unknownAttributes = uaDict
     #@-others
 #@+node:ekr.20160514120347.1: ** class FileCommands
 class FileCommands:
@@ -420,6 +557,26 @@ class FileCommands:
             # 2011/12/10: This dict is never re-inited.
         self.vnodesDict = {}
             # keys are gnx strings; values are ignored
+        self.cacheXmlFragments = c.config.getBool('cache-leo-xml', default=True)
+            # True: reuse the xml of unchanged nodes when saving.
+        self.streamLeoReads = c.config.getBool('stream-leo-reads', default=False)
+            # True: read .leo files incrementally with an iterparse-based reader.
+        self.lazyLoader = None
+            # The LazyBodyLoader for the LazyVNodes of this outline.
+        self.oldTnodeFragments = {}
+        self.oldVnodeFragments = {}
+        self.tnodeFragments = {}
+            # Keys are vnodes, values are tuples (body, <t> element).
+        self.vnodeFragments = {}
+            # Keys are vnodes, values are tuples (key, (forceWrite, <vh> element)).
+        self.sqliteFileName = None
+            # The .db file whose vnodes table matches self.sqliteRows.
+        self.sqliteHashes = {}
+            # Keys are paths, values are tuples (mtime, size, md5 hash).
+        self.sqliteRows = {}
+            # Keys are gnxs, values are the sqliteRowKey of the row in the vnodes table.
+        self.sqliteUas = {}
+            # Keys are gnxs, values are tuples (v.u, pickled v.u). See fc.sqliteRowKey.
     #@+node:ekr.20031218072017.3020: *3* fc.Reading
     #@+node:ekr.20060919104836: *4*  fc.Reading Top-level
     #@+node:ekr.20031218072017.1559: *5* fc.Paste
@@ -544,6 +701,8 @@ class FileCommands:
         """
         fc, c = self, self.c
         t1 = time.time()
+        perf = g.app.perfStats
+        t = perf and perf.start()
         c.clearChanged()  # May be set when reading @file nodes.
         fc.warnOnReadOnlyFiles(fileName)
         fc.checking = False
@@ -559,8 +718,11 @@ class FileCommands:
             # Read the .leo file and create the outline.
             if fileName.endswith('.db'):
                 v = fc.retrieveVnodesFromDb(theFile) or fc.initNewDb(theFile)
+            elif fileName.endswith('.leojsonl'):
+                v = fc.retrieveVnodesFromNdjson(theFile)
             else:
-                v = FastRead(c, self.gnxDict).readFile(fileName)
+                v = FastRead(c, self.gnxDict).readFile(fileName,
+                    streaming=fc.streamLeoReads)
                 if v:
                     c.hiddenRootNode = v
             if v:
@@ -591,6 +753,8 @@ class FileCommands:
         if c.changed:
             fc.propegateDirtyNodes()
         fc.initReadIvars()
+        if perf:
+            perf.stop(t, 'read', fileName)
         t2 = time.time()
         g.es(f"read outline in {t2 - t1:2.2f} seconds")
         return v, c.frame.ratio
@@ -950,6 +1114,11 @@ class FileCommands:
         """
 
         c, fc = self.c, self
+        if c.config.getBool('lazy-load-db-outlines', default=False):
+            vnodes = fc.retrieveLazyVnodesFromDb(conn)
+            if vnodes is None:
+                return None
+            return fc.linkVnodesFromDb(conn, vnodes)
         sql = '''select gnx, head, 
              body,
              children,
@@ -980,7 +1149,15 @@ class FileCommands:
                 g.internalError(er)
             # there is no vnodes table
             return None
+        return fc.linkVnodesFromDb(conn, vnodes)
+    #@+node:ekr.20261018202224.1: *6* fc.linkVnodesFromDb
+    def linkVnodesFromDb(self, conn, vnodes):
+        """
+        Link the vnodes read by retrieveVnodesFromDb.
 
+        Their children and parents ivars are lists of gnxs.
+        """
+        c, fc = self.c, self
         rootChildren = [x for x in vnodes if 'hidden-root-vnode-gnx' in x.parents]
         if not rootChildren:
             g.trace('there should be at least one top level node!')
@@ -993,12 +1170,84 @@ class FileCommands:
             v.children = [findNode(x) for x in v.children]
             v.parents = [findNode(x) for x in v.parents]
         c.hiddenRootNode.children = rootChildren
+        # The next save need only write the rows that differ from the table.
+        fc.sqliteFileName = g.os_path_finalize(fc.mFileName)
+        fc.sqliteRows = {v.gnx: fc.sqliteRowKey(v)[0] for v in vnodes}
         (w, h, x, y, r1, r2, encp) = fc.getWindowGeometryFromDb(conn)
         c.frame.setTopGeometry(w, h, x, y)
         c.frame.resizePanesToRatio(r1, r2)
         p = fc.decodePosition(encp)
         c.setCurrentPosition(p)
         return rootChildren[0]
+    #@+node:ekr.20261018202224.2: *6* fc.retrieveLazyVnodesFromDb
+    def retrieveLazyVnodesFromDb(self, conn):
+        """
+        Return a list of LazyVNodes, one for each row of the vnodes table.
+
+        Leo loads body text and uA's only when first used.
+        """
+        c = self.c
+        sql = '''select gnx, head,
+             children,
+             parents,
+             iconVal,
+             statusBits from vnodes'''
+        vnodes = []
+        try:
+            fileName = conn.execute('pragma database_list').fetchone()[2]
+            budget = c.config.getInt('lazy-load-db-budget')
+            if budget is None:
+                budget = 100
+            loader = LazyBodyLoader(fileName, budget=budget * 1024 * 1024)
+            self.closeLazyLoader()
+            self.lazyLoader = loader
+            for row in conn.execute(sql):
+                (gnx, h, children, parents, iconVal, statusBits) = row
+                v = LazyVNode(context=c, gnx=gnx, loader=loader)
+                v._headString = h
+                v.children = children.split()
+                v.parents = parents.split()
+                v.iconVal = iconVal
+                v.statusBits = statusBits
+                vnodes.append(v)
+        except sqlite3.Error as er:
+            if er.args[0].find('no such table') < 0:
+                g.internalError(er)
+            return None
+        return vnodes
+    #@+node:ekr.20261018215031.1: *6* fc.closeLazyLoader & rebindLazyVnodes
+    def closeLazyLoader(self):
+        """Close the .db file containing the data of LazyVNodes."""
+        if self.lazyLoader:
+            self.lazyLoader.close()
+
+    def rebindLazyVnodes(self, fileName):
+        """
+        Called after save-as has written the outline to fileName.
+
+        Unloaded data of LazyVNodes is in a .db file that no longer belongs
+        to this outline. Load it from fileName if it is a .db file.
+        Otherwise, load it now.
+        """
+        c, fc = self.c, self
+        loader = fc.lazyLoader
+        fileName = g.os_path_finalize(fileName)
+        if not loader or loader.fileName == fileName:
+            return
+        lazy = [z for z in fc.gnxDict.values() if isinstance(z, LazyVNode)]
+        if fileName.endswith('.db') and fileName == fc.sqliteFileName:
+            # Undo may restore deleted vnodes, which fileName does not contain.
+            outline = set(c.all_unique_nodes())
+            for v in lazy:
+                if v not in outline:
+                    v.materialize()
+            loader.rebind(fileName)
+            fc.unpinLazyVnodes(fileName)
+        else:
+            for v in lazy:
+                v.materialize()
+            loader.close()
+            fc.lazyLoader = None
     #@+node:vitalije.20170815162307.1: *6* fc.initNewDb
     def initNewDb(self, conn):
         """ Initializes tables and returns None"""
@@ -1029,6 +1278,59 @@ class FileCommands:
         except sqlite3.OperationalError:
             pass
         return geom
+    #@+node:ekr.20261018211846.1: *5* fc.retrieveVnodesFromNdjson
+    def retrieveVnodesFromNdjson(self, theFile):
+        """
+        Create the outline from a .leojsonl file, one record at a time.
+
+        Records may mention children before defining them, so this method
+        links each vnode as soon as its record appears.
+
+        Return the first top-level vnode, or None.
+        """
+        c, fc = self.c, self
+        gnx2vnode = fc.gnxDict
+
+        def getVnode(gnx):
+            v = gnx2vnode.get(gnx)
+            if not v:
+                v = leoNodes.VNode(context=c, gnx=gnx)
+            return v
+
+        hidden_v = c.hiddenRootNode
+        hidden_v.children = []
+        try:
+            records = fc.readNdjsonRecords(theFile)
+            header = next(records, None)
+            if not header or header.get('format') != 'leo-ndjson':
+                raise ValueError('missing header')
+            for gnx in header['children']:
+                v = getVnode(gnx)
+                hidden_v.children.append(v)
+                v.parents.append(hidden_v)
+            for d in records:
+                v = getVnode(d['gnx'])
+                v._headString = d['h']
+                v._bodyString = d['b']
+                v.statusBits = d.get('status', 0)
+                if 'u' in d:
+                    v.u = d['u']
+                elif 'u_pickle' in d:
+                    v.u = pickle.loads(binascii.unhexlify(d['u_pickle']))
+                for gnx in d['children']:
+                    child = getVnode(gnx)
+                    v.children.append(child)
+                    child.parents.append(v)
+        except (KeyError, TypeError, ValueError, pickle.UnpicklingError) as e:
+            g.error(f"bad .leojsonl file: {fc.mFileName}: {e}")
+            return None
+        return hidden_v.children[0] if hidden_v.children else None
+    #@+node:ekr.20261018211846.2: *6* fc.readNdjsonRecords
+    def readNdjsonRecords(self, theFile):
+        """Yield the records of a .leojsonl file, reading one line at a time."""
+        for line in theFile:
+            if line.strip():
+                yield json.loads(line)
     #@+node:ekr.20031218072017.3032: *3* fc.Writing
     #@+node:ekr.20070413045221.2: *4*  fc.Top-level
     #@+node:ekr.20070413061552: *5* fc.putSavedMessage
@@ -1140,6 +1442,7 @@ class FileCommands:
             try:
                 if self.write_Leo_file(fileName, outlineOnlyFlag=False):
                     c.clearChanged()  # Clears all dirty bits.
+                    self.rebindLazyVnodes(fileName)
                     self.putSavedMessage(fileName)
             finally:
                 c.ignoreChangedPaths = False  # #1367.
@@ -1178,6 +1481,21 @@ class FileCommands:
                 g.error("exception deleting backup file:", fileName)
                 g.es_exception(full=False)
             return False
+    #@+node:ekr.20261018201103.2: *4* fc.clearXmlFragments
+    def clearXmlFragments(self, keep=False):
+        """
+        Start a new generation of cached xml fragments.
+
+        keep=True: the fragments of the last save become candidates for
+        reuse. Fragments not reused during this save are discarded, so the
+        caches never hold deleted nodes for long.
+        """
+        if keep:
+            self.oldTnodeFragments = self.tnodeFragments
+            self.oldVnodeFragments = self.vnodeFragments
+        else:
+            self.oldTnodeFragments, self.oldVnodeFragments = {}, {}
+        self.tnodeFragments, self.vnodeFragments = {}, {}
     #@+node:ekr.20031218072017.1470: *4* fc.put & helpers
     def put(self, s):
         """Put string s to self.outputFile. All output eventually comes here."""
@@ -1300,13 +1618,25 @@ class FileCommands:
             self.put_nl()
     #@+node:ekr.20031218072017.1577: *5* fc.putTnode
     def putTnode(self, v):
+        # Reuse the previous save's <t> element if v's body has not changed.
+        # Nodes with uA's are never cached: their uA's may change in place,
+        # and a uA may have been added since the previous save.
+        b = v._bodyString
+        hasUA = hasattr(v, 'unknownAttributes')
+        data = self.oldTnodeFragments.get(v) if self.cacheXmlFragments else None
+        if data and data[0] is b and not hasUA:
+            self.tnodeFragments[v] = data
+            self.put(data[1])
+            return
         # Call put just once.
         gnx = v.fileIndex
         # pylint: disable=consider-using-ternary
-        ua = hasattr(v, 'unknownAttributes') and self.putUnknownAttributes(v) or ''
-        b = v.b
+        ua = hasUA and self.putUnknownAttributes(v) or ''
         body = xml.sax.saxutils.escape(b) if b else ''
-        self.put(f'<t tx="{gnx}"{ua}>{body}</t>\n')
+        s = f'<t tx="{gnx}"{ua}>{body}</t>\n'
+        if self.cacheXmlFragments and not hasUA:
+            self.tnodeFragments[v] = b, s
+        self.put(s)
     #@+node:ekr.20031218072017.1575: *5* fc.putTnodes
     def putTnodes(self):
         """Puts all tnodes as required for copy or save commands"""
@@ -1318,16 +1648,16 @@ class FileCommands:
         """Put all referenced tnodes."""
         c = self.c
         if self.usingClipboard:  # write the current tree.
-            theIter = self.currentPosition.self_and_subtree(copy=False)
+            theIter = (p.v for p in self.currentPosition.self_and_subtree(copy=False))
         else:  # write everything
-            theIter = c.all_unique_positions(copy=False)
+            theIter = c.all_unique_nodes()
         # Populate tnodes
         tnodes = {}
-        for p in theIter:
+        for v in theIter:
             # Make *sure* the file index has the proper form.
             # pylint: disable=unbalanced-tuple-unpacking
-            index = p.v.fileIndex
-            tnodes[index] = p.v
+            index = v.fileIndex
+            tnodes[index] = v
         # Put all tnodes in index order.
         for index in sorted(tnodes):
             v = tnodes.get(index)
@@ -1346,21 +1676,8 @@ class FileCommands:
         fc = self
         v = p.v
         #
-        # Precompute constants.
-        isAuto = p.isAtAutoNode() and p.atAutoNodeName().strip()
-        isEdit = p.isAtEditNode() and p.atEditNodeName().strip() and not p.hasChildren()
-            # Write the entire @edit tree if it has children.
-        isFile = p.isAtFileNode()
-        isShadow = p.isAtShadowFileNode()
-        isThin = p.isAtThinFileNode()
-        #
-        # Set forcewrite.
-        if isIgnore or p.isAtIgnoreNode():
-            forceWrite = True
-        elif isAuto or isEdit or isFile or isShadow or isThin:
-            forceWrite = False
-        else:
-            forceWrite = True
+        # Compute forceWrite and the <vh> element, reusing the previous save's data.
+        forceWrite, vh = fc.getVnodeFragment(p, isIgnore)
         #
         # Set the write bit if necessary.
         gnx = v.fileIndex
@@ -1375,7 +1692,7 @@ class FileCommands:
             fc.put(v_head + '</v>\n')
         else:
             fc.vnodesDict[gnx] = True
-            v_head += f"<vh>{xml.sax.saxutils.escape(p.v.headString() or '')}</vh>"
+            v_head += vh
             # New in 4.2: don't write child nodes of @file-thin trees
             # (except when writing to clipboard)
             if p.hasChildren() and (forceWrite or self.usingClipboard):
@@ -1400,6 +1717,40 @@ class FileCommands:
             # Fix #1023: never put marked/expanded bits.
                 # attrs.append(self.putDescendentAttributes(p))
         return ''.join(attrs)
+    #@+node:ekr.20261018201103.1: *6* fc.getVnodeFragment
+    def getVnodeFragment(self, p, isIgnore):
+        """
+        Return (forceWrite, vh) for p.v, where vh is p.v's <vh> element.
+
+        The result depends only on p.v's headline, body and whether p.v has
+        children. Strings are immutable, so setHeadString and setBodyString
+        invalidate the cached data simply by replacing v._headString or
+        v._bodyString.
+        """
+        fc, v = self, p.v
+        key = (v._headString, v._bodyString, bool(v.children), isIgnore)
+        data = fc.oldVnodeFragments.get(v) if fc.cacheXmlFragments else None
+        if data and all(a is b for a, b in zip(data[0], key)):
+            fc.vnodeFragments[v] = data
+            return data[1]
+        isAuto = p.isAtAutoNode() and p.atAutoNodeName().strip()
+        isEdit = p.isAtEditNode() and p.atEditNodeName().strip() and not p.hasChildren()
+            # Write the entire @edit tree if it has children.
+        isFile = p.isAtFileNode()
+        isShadow = p.isAtShadowFileNode()
+        isThin = p.isAtThinFileNode()
+        #
+        # Set forcewrite.
+        if isIgnore or p.isAtIgnoreNode():
+            forceWrite = True
+        elif isAuto or isEdit or isFile or isShadow or isThin:
+            forceWrite = False
+        else:
+            forceWrite = True
+        vh = f"<vh>{xml.sax.saxutils.escape(v._headString or '')}</vh>"
+        if fc.cacheXmlFragments:
+            fc.vnodeFragments[v] = key, (forceWrite, vh)
+        return forceWrite, vh
     #@+node:ekr.20031218072017.1579: *5* fc.putVnodes & helper
     new = True
 
@@ -1412,6 +1763,8 @@ class FileCommands:
         self.currentPosition = p or c.p
         self.rootPosition = c.rootPosition()
         self.vnodesDict = {}
+        if not self.usingClipboard:
+            self.clearXmlFragments(keep=True)
         if self.usingClipboard:
             self.expanded_gnxs, self.marked_gnxs = set(), set()
                 # These will be ignored.
@@ -1434,8 +1787,12 @@ class FileCommands:
         if not c.mFileName:
             return  # New.
         current = [str(z) for z in self.currentPosition.archivedPosition()]
-        expanded = [v.gnx for v in c.all_unique_nodes() if v.isExpanded()]
-        marked = [v.gnx for v in c.all_unique_nodes() if v.isMarked()]
+        expanded, marked = [], []
+        for v in c.all_unique_nodes():
+            if v.isExpanded():
+                expanded.append(v.gnx)
+            if v.isMarked():
+                marked.append(v.gnx)
         c.db['expanded'] = ','.join(expanded)
         c.db['marked'] = ','.join(marked)
         c.db['current_position'] = ','.join(current)
@@ -1501,19 +1858,25 @@ class FileCommands:
         if fc.isReadOnly(fileName):
             return False
 
+        perf = g.app.perfStats
+        t = perf and perf.start()
         if fileName and fileName.endswith('.db'):
-            return fc.exportToSqlite(fileName)
-
-        try:
-            fc.putCount = 0
-            fc.toString = toString
-            if toString:
-                ok = fc.writeToStringHelper(fileName)
-            else:
-                ok = fc.writeToFileHelper(fileName, toOPML)
-        finally:
-            fc.outputFile = None
-            fc.toString = False
+            ok = fc.exportToSqlite(fileName)
+        elif fileName and fileName.endswith('.leojsonl'):
+            ok = fc.exportToNdjson(fileName)
+        else:
+            try:
+                fc.putCount = 0
+                fc.toString = toString
+                if toString:
+                    ok = fc.writeToStringHelper(fileName)
+                else:
+                    ok = fc.writeToFileHelper(fileName, toOPML)
+            finally:
+                fc.outputFile = None
+                fc.toString = False
+        if perf and not toString:
+            perf.stop(t, 'write', fileName)
         return ok
 
     write_LEO_file = write_Leo_file  # For compatibility with old plugins.
@@ -1669,44 +2032,142 @@ class FileCommands:
         theFile.close()
     #@+node:vitalije.20170630172118.1: *5* fc.exportToSqlite
     def exportToSqlite(self, fileName):
-        """Dump all vnodes to sqlite database. Returns True on success."""
+        """
+        Write all changed vnodes to the sqlite database. Returns True on success.
+
+        Only inserted, deleted and changed vnodes are written if the vnodes
+        table was written (or read) by this commander. All changes happen
+        in a single transaction.
+        """
         # fc = self
         c = self.c; fc = self
         if c.sqlite_connection is None:
             c.sqlite_connection = sqlite3.connect(fileName,
                                         isolation_level='DEFERRED')
         conn = c.sqlite_connection
-
-        def dump_u(v):
-            try:
-                s = pickle.dumps(v.u, protocol=1)
-            except pickle.PicklingError:
-                s = ''
-                g.trace('unpickleable value', repr(v.u))
-            return s
-
-        dbrow = lambda v: (
-                v.gnx,
-                v.h,
-                v.b,
-                ' '.join(x.gnx for x in v.children),
-                ' '.join(x.gnx for x in v.parents),
-                v.iconVal,
-                v.statusBits,
-                dump_u(v)
-            )
+        if not conn.in_transaction:
+            conn.execute('pragma journal_mode=wal;')
+        fileName = g.os_path_finalize(fileName)
+        incremental = fileName == fc.sqliteFileName and fc.hasVnodesTable(conn)
+        oldRows = fc.sqliteRows if incremental else {}
         ok = False
         try:
-            fc.prepareDbTables(conn)
+            if not conn.in_transaction:
+                # sqlite3 does not start transactions for ddl statements.
+                conn.execute('begin')
+            if not incremental:
+                fc.prepareDbTables(conn)
             fc.exportDbVersion(conn)
-            fc.exportVnodesToSqlite(conn, (dbrow(v) for v in c.all_unique_nodes()))
+            newRows, rows = fc.computeSqliteChanges(oldRows)
+            fc.exportVnodesToSqlite(conn, rows)
+            deleted = [gnx for gnx in oldRows if gnx not in newRows]
+            for gnx in deleted:
+                # Undo may restore v after its row is gone.
+                v = fc.gnxDict.get(gnx)
+                if isinstance(v, LazyVNode):
+                    v.materialize()
+            conn.executemany('delete from vnodes where gnx=?',
+                [(gnx,) for gnx in deleted])
             fc.exportGeomToSqlite(conn)
             fc.exportHashesToSqlite(conn)
             conn.commit()
+            fc.sqliteFileName, fc.sqliteRows = fileName, newRows
+            fc.unpinLazyVnodes(fileName)
             ok = True
         except sqlite3.Error as e:
+            conn.rollback()
+            fc.sqliteFileName, fc.sqliteRows = None, {}
             g.internalError(e)
         return ok
+    #@+node:ekr.20261018201918.1: *6* fc.computeSqliteChanges
+    def computeSqliteChanges(self, oldRows):
+        """
+        Compare all vnodes with oldRows, a dict describing the vnodes table.
+
+        Return (newRows, rows), where newRows describes the table after the
+        save and rows is a list of rows to be inserted or replaced.
+        """
+        c, fc = self.c, self
+        newRows, rows = {}, []
+        for v in c.all_unique_nodes():
+            key, ua = fc.sqliteRowKey(v)
+            gnx = v.gnx
+            newRows[gnx] = key
+            if oldRows.get(gnx) != key:
+                rows.append((
+                    gnx,
+                    v.h,
+                    v.b,
+                    ' '.join(x.gnx for x in v.children),
+                    ' '.join(x.gnx for x in v.parents),
+                    v.iconVal,
+                    v.statusBits,
+                    v.loader.loadUaBlob(v) if ua is None else ua,
+                ))
+        return newRows, rows
+    #@+node:ekr.20261018215031.2: *6* fc.unpinLazyVnodes
+    def unpinLazyVnodes(self, fileName):
+        """
+        Called after saving the outline to fileName.
+
+        If fileName contains the data of LazyVNodes, let the loader evict the
+        body text of changed LazyVNodes: the .db file now contains it.
+        """
+        c, fc = self.c, self
+        loader = fc.lazyLoader
+        if not loader or loader.fileName != fileName:
+            return
+        for v in c.all_unique_nodes():
+            if isinstance(v, LazyVNode) and v.bodyVersion > 0:
+                ua = fc.sqliteRows[v.gnx][-1]
+                if ua is not None:
+                    v.uaBlob = ua
+                loader.unpin(v)
+                fc.sqliteRows[v.gnx] = fc.sqliteRowKey(v)[0]
+    #@+node:ekr.20261018201918.2: *6* fc.sqliteRowKey
+    empty_ua = pickle.dumps({}, protocol=1)
+
+    def sqliteRowKey(self, v):
+        """
+        Return (key, ua) for v's row in the vnodes table.
+
+        ua is the pickled value of v.u. Equal keys denote equal rows.
+        For LazyVNodes, None denotes data that has not changed since Leo
+        read the .db file.
+        Comparing keys is fast: they contain the same string objects until
+        v changes.
+
+        v.u is pickled again only if v is dirty or v.u is a new object.
+        Code that changes v.u in place must mark v dirty, as usual.
+        """
+        lazy = isinstance(v, LazyVNode)
+        if lazy and v.lazyUa is v.unloaded:
+            ua = None  # Unchanged: still in the .db file.
+        else:
+            d = getattr(v, 'unknownAttributes', None)
+            if d:
+                data = self.sqliteUas.get(v.gnx)
+                if data and data[0] is d and not v.isDirty():
+                    ua = data[1]
+                else:
+                    try:
+                        ua = pickle.dumps(d, protocol=1)
+                    except pickle.PicklingError:
+                        ua = ''
+                        g.trace('unpickleable value', repr(d))
+                    self.sqliteUas[v.gnx] = d, ua
+            else:
+                ua = self.empty_ua
+            if lazy and ua == v.uaBlob:
+                ua = None
+        # Don't load unchanged body text.
+        body = None if lazy and v.bodyVersion == 0 else v._bodyString
+        key = (
+            v._headString, body,
+            tuple(v.children), tuple(v.parents),
+            v.iconVal, v.statusBits, ua,
+        )
+        return key, ua
     #@+node:vitalije.20170705075107.1: *6* fc.decodePosition
     def decodePosition(self, s):
         """Creates position from its string representation encoded by fc.encodePosition."""
@@ -1745,10 +2206,17 @@ class FileCommands:
         )
         conn.execute(
             '''create table if not exists extra_infos(name primary key, value)''')
+    #@+node:ekr.20261018201918.3: *6* fc.hasVnodesTable
+    def hasVnodesTable(self, conn):
+        """Return True if conn's database contains the vnodes table."""
+        row = conn.execute(
+            "select name from sqlite_master where type='table' and name='vnodes'"
+        ).fetchone()
+        return bool(row)
     #@+node:vitalije.20170701161851.1: *6* fc.exportVnodesToSqlite
     def exportVnodesToSqlite(self, conn, rows):
         conn.executemany(
-            '''insert into vnodes
+            '''replace into vnodes
             (gnx, head, body, children, parents,
                 iconVal, statusBits, ua)
             values(?,?,?,?,?,?,?,?);''',
@@ -1776,15 +2244,31 @@ class FileCommands:
             "replace into extra_infos(name, value) values('dbversion', ?)", ('1.0',))
     #@+node:vitalije.20170701162204.1: *6* fc.exportHashesToSqlite
     def exportHashesToSqlite(self, conn):
-        c = self.c
+        """
+        Write the md5 hashes of all external files that have changed since
+        the last save. Unchanged files (same mtime and size) are not reread.
+        """
+        c, fc = self.c, self
+        oldHashes, newHashes = fc.sqliteHashes, {}
 
         def md5(x):
             try:
-                s = open(x, 'rb').read()
+                st = os.stat(x)
+            except Exception:
+                return ''
+            data = oldHashes.get(x)
+            if data and data[:2] == (st.st_mtime_ns, st.st_size):
+                newHashes[x] = data
+                return data[2]
+            try:
+                with open(x, 'rb') as f:
+                    s = f.read()
             except Exception:
                 return ''
             s = s.replace(b'\r\n', b'\n')
-            return hashlib.md5(s).hexdigest()
+            h = hashlib.md5(s).hexdigest()
+            newHashes[x] = st.st_mtime_ns, st.st_size, h
+            return h
 
         files = set()
 
@@ -1801,6 +2285,72 @@ class FileCommands:
         conn.executemany(
             'replace into extra_infos(name, value) values(?,?)',
             map(lambda x: (x[1], md5(x[0])), files))
+        fc.sqliteHashes = newHashes
+    #@+node:ekr.20261018211846.3: *5* fc.exportToNdjson
+    def exportToNdjson(self, fileName):
+        """
+        Write the outline to a .leojsonl file. Return True on success.
+
+        The first line is a header. Each following line describes one vnode.
+        Records are written as they are created, so memory use does not
+        depend on the size of the outline.
+        """
+        c, fc = self.c, self
+        ok, backupName = fc.createBackupFile(fileName)
+        if not ok:
+            return False
+        theFile = None
+        try:
+            theFile = open(fileName, 'w', encoding='utf-8', newline='\n')
+            theFile.writelines(
+                json.dumps(d, ensure_ascii=False) + '\n' for d in fc.ndjsonRecords())
+            theFile.close()
+            c.setFileTimeStamp(fileName)
+            if backupName and g.os_path_exists(backupName):
+                fc.deleteFileWithMessage(backupName, 'backup')
+            return True
+        except Exception:
+            fc.handleWriteLeoFileException(fileName, backupName, theFile)
+            return False
+    #@+node:ekr.20261018211846.4: *6* fc.ndjsonRecords
+    def ndjsonRecords(self):
+        """
+        Yield the records of a .leojsonl file: a header, then one record
+        for each vnode, in outline order.
+
+        Vnode records contain gnx, h, b, children (a list of gnxs), status
+        (v.statusBits without the dirty bit) and, if v.u is not empty,
+        either u (json-compatible uA's) or u_pickle (hex-encoded pickle).
+        """
+        c = self.c
+        yield {
+            'format': 'leo-ndjson',
+            'version': 1,
+            'children': [v.gnx for v in c.hiddenRootNode.children],
+        }
+        for v in c.all_unique_nodes():
+            d = {
+                'gnx': v.gnx,
+                'h': v.h,
+                'b': v.b,
+                'children': [z.gnx for z in v.children],
+                'status': v.statusBits & ~v.dirtyBit,
+            }
+            if v.u:
+                try:
+                    # Non-string keys would not survive the round trip.
+                    isJson = json.loads(json.dumps(v.u)) == v.u
+                except (TypeError, ValueError):
+                    isJson = False
+                if isJson:
+                    d['u'] = v.u
+                else:
+                    try:
+                        d['u_pickle'] = binascii.hexlify(
+                            pickle.dumps(v.u, protocol=1)).decode('ascii')
+                    except Exception:
+                        g.warning('can not pickle uA of', v.h)
+            yield d
     #@+node:ekr.20031218072017.2012: *4* fc.writeAtFileNodes
     @cmd('write-at-file-nodes')
     def writeAtFileNodes(self, event=None):
@@ -1975,21 +2525,21 @@ class FileCommands:
         Called *before* reading external files.
         """
         c = self.c
-        for p in c.all_unique_positions(copy=False):
-            if hasattr(p.v, 'tempTnodeList'):
+        for v in c.all_unique_nodes():
+            if hasattr(v, 'tempTnodeList'):
                 result = []
-                for tnx in p.v.tempTnodeList:
+                for tnx in v.tempTnodeList:
                     index = self.canonicalTnodeIndex(tnx)
                     # new gnxs:
                     index = g.toUnicode(index)
-                    v = self.gnxDict.get(index)
-                    if v:
-                        result.append(v)
+                    v2 = self.gnxDict.get(index)
+                    if v2:
+                        result.append(v2)
                     else:
                         g.trace(f"*** No VNode for {tnx}")
                 if result:
-                    p.v.tnodeList = result
-                delattr(p.v, 'tempTnodeList')
+                    v.tnodeList = result
+                delattr(v, 'tempTnodeList')
     #@+node:ekr.20031218072017.3045: *4* fc.setDefaultDirectoryForNewFiles
     def setDefaultDirectoryForNewFiles(self, fileName):
         """Set c.openDirectory for new files for the benefit of leoAtFile.scanAllDirectives."""
@@ -2015,6 +2565,164 @@ class FileCommands:
             current = self.archivedPositionToPosition(str_pos)
         c.setCurrentPosition(current or c.rootPosition())
     #@-others
+#@+node:ekr.20261018202211.1: ** class LazyBodyLoader
+class LazyBodyLoader:
+    """
+    Load the body text and uA's of LazyVNodes from a .db file.
+
+    The loader evicts the body text of the least recently used unchanged
+    nodes when the loaded body text exceeds the budget. Changed nodes keep
+    their body text until Leo saves them to the .db file.
+    """
+    #@+others
+    #@+node:ekr.20261018202211.2: *3* loader.ctor
+    def __init__(self, fileName, budget):
+        self.budget = budget
+            # The maximum number of characters of evictable body text.
+        self.fileName = g.os_path_finalize(fileName)
+        self.conn = sqlite3.connect(fileName)
+        self.loaded = OrderedDict()
+            # Keys are unchanged LazyVNodes whose body text is in memory.
+            # Values are the lengths of their body text.
+        self.size = 0
+            # The total length of the body text in self.loaded.
+    #@+node:ekr.20261018202211.3: *3* loader.loadBody & helpers
+    def loadBody(self, v):
+        """Return v's body text from the .db file."""
+        row = self.conn.execute(
+            'select body from vnodes where gnx=?', (v.gnx,)).fetchone()
+        s = row[0] if row and row[0] else ''
+        self.loaded[v] = len(s)
+        self.size += len(s)
+        # Never evict v itself: the caller is about to set v.lazyBody.
+        self.evict()
+        return s
+    #@+node:ekr.20261018215031.3: *4* loader.evict
+    def evict(self):
+        """
+        Forget the body text of the least recently used nodes until the
+        loaded body text fits in the budget. Never forget the most recently
+        used node.
+        """
+        while self.size > self.budget and len(self.loaded) > 1:
+            v, n = self.loaded.popitem(last=False)
+            v.lazyBody = None
+            self.size -= n
+    #@+node:ekr.20261018202211.4: *4* loader.pin & unpin & touch
+    def pin(self, v):
+        """Keep v's body text in memory: v has changed."""
+        n = self.loaded.pop(v, None)
+        if n is not None:
+            self.size -= n
+
+    def unpin(self, v):
+        """Allow eviction of v's body text: the .db file contains it."""
+        v.bodyVersion = 0
+        self.loaded[v] = n = len(v.lazyBody)
+        self.size += n
+        self.evict()
+
+    def touch(self, v):
+        """Mark v as the most recently used node."""
+        if v in self.loaded:
+            self.loaded.move_to_end(v)
+    #@+node:ekr.20261018215031.4: *3* loader.close & rebind
+    def close(self):
+        """Close the connection to the .db file."""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def rebind(self, fileName):
+        """Load data from fileName, a new copy of the .db file."""
+        self.close()
+        self.fileName = g.os_path_finalize(fileName)
+        self.conn = sqlite3.connect(fileName)
+    #@+node:ekr.20261018202211.5: *3* loader.loadUa & loadUaBlob
+    def loadUa(self, v):
+        """Return v's uA's from the .db file, or None."""
+        v.uaBlob = self.loadUaBlob(v)
+        try:
+            return pickle.loads(g.toEncodedString(v.uaBlob))
+        except(EOFError, ValueError):
+            return None
+
+    def loadUaBlob(self, v):
+        """Return v's pickled uA's from the .db file."""
+        row = self.conn.execute(
+            'select ua from vnodes where gnx=?', (v.gnx,)).fetchone()
+        return row[0] if row else ''
+    #@-others
+#@+node:ekr.20261018202211.6: ** class LazyVNode
+class LazyVNode(leoNodes.VNode):
+    """
+    A VNode whose body text and uA's stay in a .db file until first used.
+
+    See @bool lazy-load-db-outlines.
+    """
+    unloaded = object()
+        # The value of v.lazyUa before Leo loads v's uA's.
+    #@+others
+    #@+node:ekr.20261018202211.7: *3* LazyVNode.ctor
+    def __init__(self, context, gnx, loader):
+        self.bodyVersion = 0
+        self.loader = None
+        super().__init__(context, gnx)
+        self.bodyVersion = 0
+            # The number of changes to the body text since Leo read the node.
+        self.lazyBody = None
+            # The body text, or None if it is (only) in the .db file.
+        self.lazyUa = self.unloaded
+            # The uA's, None if there are none.
+        self.loader = loader
+        self.uaBlob = None
+            # The pickled uA's in the .db file.
+    #@+node:ekr.20261018202211.8: *3* LazyVNode._bodyString
+    def __get_body(self):
+        s = self.lazyBody
+        if s is None:
+            s = self.lazyBody = self.loader.loadBody(self)
+        elif self.bodyVersion == 0:
+            self.loader.touch(self)
+        return s
+
+    def __set_body(self, s):
+        if self.loader and self.bodyVersion == 0:
+            self.loader.pin(self)
+        self.lazyBody = s
+        self.bodyVersion += 1
+
+    _bodyString = property(
+        __get_body, __set_body,
+        doc="LazyVNode body text, loaded when first used")
+    #@+node:ekr.20261018202211.9: *3* LazyVNode.unknownAttributes
+    def __get_ua(self):
+        d = self.lazyUa
+        if d is self.unloaded:
+            d = self.lazyUa = self.loader.loadUa(self)
+        if d is None:
+            raise AttributeError('unknownAttributes')
+        return d
+
+    def __set_ua(self, d):
+        self.lazyUa = d
+
+    def __del_ua(self):
+        self.lazyUa = None
+
+    unknownAttributes = property(
+        __get_ua, __set_ua, __del_ua,
+        doc="LazyVNode uA's, loaded when first used")
+    #@+node:ekr.20261018202211.10: *3* LazyVNode.materialize
+    def materialize(self):
+        """Load all of v's data, and never evict it."""
+        self.lazyBody = self._bodyString
+        self.loader.pin(self)
+        self.bodyVersion += 1
+        getattr(self, 'unknownAttributes', None)
+        self.uaBlob = None
+            # fc.sqliteRowKey must never ask the loader for the uA's.
+    #@-others
 #@+node:ekr.20180708114847.1: ** dump-clone-parents
 @g.command('dump-clone-parents')
 def dump_clone_parents(event):
@@ -2028,6 +2736,240 @@ def dump_clone_parents(event):
         if len(v.parents) > 1:
             print(v.h)
             g.printObj(v.parents)
+#@+node:ekr.20261018201717.1: ** class TestFileCommands
+class TestFileCommands(unittest.TestCase):
+    #@+others
+    #@+node:ekr.20261018230512.1: *3* TestFileCommands.bridge
+    def bridge(self):
+        """Return an instance of Leo's bridge."""
+        import leo.core.leoBridge as leoBridge
+        return leoBridge.controller(gui='nullGui',
+            loadPlugins=False,
+            readSettings=False,
+            silent=True,
+            verbose=False,
+        )
+    #@+node:ekr.20261018201717.2: *3* TestFileCommands.test_cached_xml_fragments
+    def test_cached_xml_fragments(self):
+        """Test that saves using cached xml fragments match full saves."""
+        import os
+        bridge = self.bridge()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fileName = f"{temp_dir}{os.sep}test_file.leo"
+            c = bridge.openLeoFile(fileName)
+            fc, root = c.fileCommands, c.rootPosition()
+            root.h = 'root <&>'
+            root.b = 'root body <&>\n'
+            for i in range(3):
+                child = root.insertAsLastChild()
+                child.h, child.b = f"child {i}", f"body {i}\n"
+            clone = root.firstChild().clone()
+            clone.moveToLastChildOf(root.lastChild())
+            root.lastChild().v.u = {'a': 1}
+
+            def write():
+                fc.write_Leo_file(fileName, outlineOnlyFlag=False)
+                with open(fileName, 'rb') as f:
+                    return f.read()
+
+            write()
+            self.assertTrue(fc.tnodeFragments)
+            self.assertTrue(fc.vnodeFragments)
+            # Change a headline and body and add a new node.
+            root.firstChild().h = 'changed'
+            root.firstChild().next().b = '@ignore\n'
+            root.lastChild().insertAsLastChild().h = 'new'
+            root.lastChild().v.u['b'] = 2
+            # Add a uA to a node whose <t> element is cached.
+            root.v.u = {'key': 'val'}
+            cached = write()
+            self.assertIn(b'key', cached)
+            fc.cacheXmlFragments = False
+            fc.clearXmlFragments()
+            full = write()
+            c.close()
+        self.assertEqual(cached, full)
+    #@+node:ekr.20261018202028.1: *3* TestFileCommands.test_incremental_sqlite_save
+    def test_incremental_sqlite_save(self):
+        """Test that incremental saves of .db files match full saves."""
+        import os
+        bridge = self.bridge()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fileName = f"{temp_dir}{os.sep}test_file.db"
+            c = bridge.openLeoFile(fileName)
+            fc, root = c.fileCommands, c.rootPosition()
+            for i in range(3):
+                child = root.insertAsLastChild()
+                child.h, child.b = f"child {i}", f"body {i}\n"
+            c.save()
+
+            def write():
+                fc.write_Leo_file(fileName, outlineOnlyFlag=False)
+                conn = sqlite3.connect(fileName)
+                rows = sorted(conn.execute('select * from vnodes'))
+                conn.close()
+                return rows
+
+            root.firstChild().h = 'changed'
+            root.firstChild().next().doDelete()
+            root.lastChild().insertAsLastChild().h = 'new'
+            root.lastChild().v.u = {'a': 1}
+            incremental = write()
+            fc.sqliteFileName = None
+            full = write()
+            # Saves pickle v.u only if v is dirty or v.u is a new object.
+            p = root.lastChild()
+            c.save()
+            blob = fc.sqliteUas[p.gnx][1]
+            c.save()
+            self.assertIs(fc.sqliteUas[p.gnx][1], blob)
+            p.v.u['b'] = 2
+            p.setDirty()
+            c.save()
+            self.assertEqual(pickle.loads(fc.sqliteUas[p.gnx][1]), {'a': 1, 'b': 2})
+            p.v.u = {'c': 3}
+            rows = write()
+            c.close()
+        self.assertEqual(len(incremental), 4)
+        self.assertEqual(incremental, full)
+        ua = {z[0]: z[-1] for z in rows}[p.gnx]
+        self.assertEqual(pickle.loads(ua), {'c': 3})
+    #@+node:ekr.20261018202432.1: *3* TestFileCommands.test_lazy_db_outline
+    def test_lazy_db_outline(self):
+        """Test reading .db outlines with @bool lazy-load-db-outlines = True."""
+        import os
+        bridge = self.bridge()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fileName = f"{temp_dir}{os.sep}test_file.db"
+            c = bridge.openLeoFile(fileName)
+            fc, root = c.fileCommands, c.rootPosition()
+            for i in range(10):
+                child = root.insertAsLastChild()
+                child.h, child.b = f"child {i}", f"body {i}\n" * 100
+                child.v.u = {'i': i}
+            c.save()
+            expected = [(p.h, p.b, p.v.u) for p in c.all_positions()]
+            # Read the outline again, lazily, with a tiny budget.
+            # c.config.settingsDict may be shared: restore it afterward.
+            d = c.config.settingsDict
+            keys = [g.app.config.munge(z)
+                for z in ('lazy-load-db-outlines', 'lazy-load-db-budget')]
+            old = {z: d.get(z) for z in keys}
+            try:
+                c.config.set(None, 'bool', 'lazy-load-db-outlines', True)
+                c.config.set(None, 'int', 'lazy-load-db-budget', 0)
+                fc.gnxDict = {}
+                conn = sqlite3.connect(fileName)
+                fc.getLeoFile(conn, fileName, readAtFileNodesFlag=False, silent=True)
+                conn.close()
+            finally:
+                for key, gs in old.items():
+                    if gs:
+                        d[key] = gs
+                    else:
+                        d.d.pop(key, None)
+                c.config.clearSnapshot()
+            v = c.rootPosition().firstChild().v
+            self.assertTrue(isinstance(v, LazyVNode))
+            self.assertEqual(v.lazyBody, None)
+            self.assertEqual([(p.h, p.b, p.v.u) for p in c.all_positions()], expected)
+            # Only the most recently loaded body remains in memory.
+            self.assertEqual(len(v.loader.loaded), 1)
+            self.assertEqual(v.lazyBody, None)
+            # Changed bodies are never evicted.
+            v.b = 'changed'
+            c.rootPosition().lastChild().b  # Load another body.
+            self.assertEqual(v.b, 'changed')
+            c.save()
+            conn = sqlite3.connect(fileName)
+            body = conn.execute(
+                'select body from vnodes where gnx=?', (v.gnx,)).fetchone()[0]
+            conn.close()
+            # Saved bodies may be evicted.
+            c.rootPosition().firstChild().next().b  # Load another body.
+            self.assertEqual(v.lazyBody, None)
+            self.assertEqual(v.b, 'changed')
+            # Save-as moves the loader to the new .db file.
+            loader = fc.lazyLoader
+            fileName2 = f"{temp_dir}{os.sep}test_file2.db"
+            fc.saveAs(fileName2)
+            self.assertEqual(loader.fileName, g.os_path_finalize(fileName2))
+            # Save-as to a .leo file loads everything.
+            expected = [(p.h, p.b, p.v.u) for p in c.all_positions()]
+            fc.saveAs(f"{temp_dir}{os.sep}test_file.leo")
+            self.assertEqual(fc.lazyLoader, None)
+            self.assertEqual(loader.conn, None)
+            self.assertEqual([(p.h, p.b, p.v.u) for p in c.all_positions()], expected)
+            c.close()
+        self.assertEqual(body, 'changed')
+    #@+node:ekr.20261018204329.3: *3* TestFileCommands.test_streaming_read
+    def test_streaming_read(self):
+        """Test reading .leo files with @bool stream-leo-reads = True."""
+        import os
+        bridge = self.bridge()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fileName = f"{temp_dir}{os.sep}test_file.leo"
+            c = bridge.openLeoFile(fileName)
+            fc, root = c.fileCommands, c.rootPosition()
+            root.h, root.b = 'root <&>', 'root body <&>\n'
+            for i in range(3):
+                child = root.insertAsLastChild()
+                child.h, child.b = f"child {i}", f"body {i}\n"
+                child.insertAsLastChild().h = f"grandchild {i}"
+            clone = root.firstChild().clone()
+            clone.moveToLastChildOf(root.lastChild())
+            root.lastChild().v.u = {'a': 1}
+            c.save()
+            expected = [(p.gnx, p.h, p.b, p.v.u, p.level()) for p in c.all_positions()]
+            fc.streamLeoReads = True
+            fc.gnxDict = {}
+            with open(fileName, 'rb') as f:
+                fc.getLeoFile(f, fileName, readAtFileNodesFlag=False, silent=True)
+            result = [(p.gnx, p.h, p.b, p.v.u, p.level()) for p in c.all_positions()]
+            c.close()
+        self.assertEqual(result, expected)
+    #@+node:ekr.20261018215852.1: *3* TestFileCommands.test_ndjson_round_trip
+    def test_ndjson_round_trip(self):
+        """Test reading and writing .leojsonl files."""
+        import os
+        bridge = self.bridge()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            fileName = f"{temp_dir}{os.sep}test_file.leojsonl"
+            c = bridge.openLeoFile(None)
+            fc, root = c.fileCommands, c.rootPosition()
+            root.h, root.b = 'root', 'root body\n'
+            for i in range(3):
+                child = root.insertAsLastChild()
+                child.h, child.b = f"child {i}", f"body {i}\n"
+                child.insertAsLastChild().h = f"grandchild {i}"
+            clone = root.firstChild().clone()
+            clone.moveToLastChildOf(root.lastChild())
+            root.firstChild().v.u = {'a': [1, 'b']}
+            root.lastChild().v.u = {'s': {1, 2}, (1, 2): 'tuple key'}
+            expected = [(p.gnx, p.h, p.b, p.v.u, p.level()) for p in c.all_positions()]
+            self.assertTrue(fc.exportToNdjson(fileName))
+            with open(fileName, encoding='utf-8') as f:
+                records = [json.loads(z) for z in f]
+            self.assertEqual(len(records), 1 + len(list(c.all_unique_nodes())))
+            d = {z.get('gnx'): z for z in records}
+            self.assertIn('u', d[root.firstChild().gnx])
+            self.assertIn('u_pickle', d[root.lastChild().gnx])
+            fc.gnxDict = {}
+            with open(fileName, encoding='utf-8') as f:
+                fc.getLeoFile(f, fileName, readAtFileNodesFlag=False, silent=True)
+            result = [(p.gnx, p.h, p.b, p.v.u, p.level()) for p in c.all_positions()]
+            self.assertEqual(result, expected)
+            # The clones share a vnode.
+            self.assertIs(c.rootPosition().firstChild().v,
+                c.rootPosition().lastChild().lastChild().v)
+            # A malformed line is an error, not an exception.
+            with open(fileName, 'a', encoding='utf-8') as f:
+                f.write('{"gnx": "malformed"\n')
+            fc.gnxDict = {}
+            with open(fileName, encoding='utf-8') as f:
+                self.assertIsNone(fc.retrieveVnodesFromNdjson(f))
+            c.close()
+    #@-others
 #@-others
 #@@language python
 #@@tabwidth -4
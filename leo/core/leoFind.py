@@ -2,7 +2,9 @@
 #@+node:ekr.20060123151617: * @file leoFind.py
 """Leo's gui-independent find classes."""
 import leo.core.leoGlobals as g
+import bisect
 import keyword
+import os
 import re
 import sys
 import time
@@ -178,6 +180,16 @@ class LeoFind:
         self.p = None
             # The position being searched.
             # Never saved between searches!
+        self.spans_cache = {}
+            # For backward searches. None disables the cache.
+            # Keys are tuples, values are (s, starts, ends, match_objects).
+        self.batch_vnodes = None
+            # The vnodes found by find.batchSearch, or None.
+            # A superset of the vnodes containing matches.
+        self.batch_chunk_size = 1000000
+            # The number of characters in each chunk of a parallel batch search.
+        self.findAllInParallel = False
+            # True: search large outlines in worker processes.
         self.unique_matches = set()
         self.was_in_headline = None
             # Fix bug: https://groups.google.com/d/msg/leo-editor/RAzVPihqmkI/-tgTQw0-LtwJ
@@ -213,6 +225,7 @@ class LeoFind:
     def reloadSettings(self):
         """LeoFind.reloadSettings."""
         c = self.c
+        self.findAllInParallel = c.config.getBool('parallel-find-all', default=False)
         self.ignore_dups = c.config.getBool('find-ignore-duplicates', default=False)
         self.minibuffer_mode = c.config.getBool('minibuffer-find-mode', default=False)
     #@+node:ekr.20060123065756.1: *3* LeoFind.Buttons (immediate execution)
@@ -537,12 +550,13 @@ class LeoFind:
         self.changeAll()
         # Bugs #947, #880 and #722:
         # Set ancestor @<file> nodes by brute force.
-        for p in c.all_positions():
+        for v in c.all_unique_nodes():
             if (
-                p.anyAtFileNodeName() and not p.v.isDirty()
-                and any([p2.v.isDirty() for p2 in p.subtree()])
+                v.anyAtFileNodeName() and not v.isDirty()
+                and any(v2.isDirty() for v2, depth in c.self_and_subtree_nodes(v) if depth)
             ):
-                p.setDirty()
+                v.setAllAncestorAtFileNodesDirty()
+                v.setDirty()
         c.redraw()
     #@+node:ekr.20150629072547.1: *4* find.preloadFindPattern
     def preloadFindPattern(self, w):
@@ -1430,27 +1444,34 @@ class LeoFind:
         if not self.search_headline and not self.search_body:
             return
         # #1428: Honor limiters in replace-all.
+        changes = None
+            # Keys are vnodes, values are (count_h, new_h, count_b, new_b).
         if self.node_only:
             positions = [c.p]
         elif self.suboutline_only:
             positions = c.p.self_and_subtree()
         else:
-            positions = c.all_unique_positions()
+            changes = self.batchSearch(list(c.all_unique_nodes()), replace=True)
+            # Create positions only for the changed nodes.
+            positions = c.positions_where(lambda v: v in changes, unique=True)
         count = 0
         for p in positions:
             count_h, count_b = 0, 0
-            undoData = u.beforeChangeNodeContents(p)
-            if self.search_headline:
-                count_h, new_h = self.batchSearchAndReplace(p.h)
+            if changes is None:
+                if self.search_headline:
+                    count_h, new_h = self.batchSearchAndReplace(p.h)
+                if self.search_body:
+                    count_b, new_b = self.batchSearchAndReplace(p.b)
+            elif p.v in changes:
+                count_h, new_h, count_b, new_b = changes[p.v]
+            if count_h or count_b:
+                undoData = u.beforeChangeNodeContents(p)
                 if count_h:
                     count += count_h
                     p.h = new_h
-            if self.search_body:
-                count_b, new_b = self.batchSearchAndReplace(p.b)
                 if count_b:
                     count += count_b
                     p.b = new_b
-            if count_h or count_b:
                 u.afterChangeNodeContents(p, 'Replace All', undoData)
         p = c.p
         u.afterChangeGroup(p, undoType, reportFlag=True)
@@ -1712,6 +1733,12 @@ class LeoFind:
         old_sparse_find = c.sparse_find
         try:
             c.sparse_find = False
+            if not self.node_only:
+                if self.suboutline_only:
+                    vnodes = [v for v, depth in c.self_and_subtree_nodes(p.v, unique=True)]
+                else:
+                    vnodes = list(c.all_unique_nodes())
+                self.batch_vnodes = self.batchSearch(vnodes)
             if clone_find:
                 count = self.doCloneFindAll(after, data, flatten, p, undoType)
             else:
@@ -1720,6 +1747,7 @@ class LeoFind:
             # c.contractAllHeadlines()
         finally:
             c.sparse_find = old_sparse_find
+            self.batch_vnodes = None
         if count:
             c.redraw()
         g.es("found", count, "matches for", self.find_text)
@@ -1790,8 +1818,7 @@ class LeoFind:
             p.moveToThreadNext()
         elif found:
             # Don't look at the node or it's descendants.
-            for p2 in p.self_and_subtree(copy=False):
-                skip.add(p2.v)
+            skip.update(v for v, depth in self.c.self_and_subtree_nodes(p))
             p.moveToNodeAfterTree()
         else:
             p.moveToThreadNext()
@@ -1864,6 +1891,8 @@ class LeoFind:
     #@+node:ekr.20160224141710.1: *6* find.findNextBatchMatch
     def findNextBatchMatch(self, p):
         """Find the next batch match at p."""
+        if self.batch_vnodes is not None and p.v not in self.batch_vnodes:
+            return False
         table = []
         if self.search_headline:
             table.append(p.h)
@@ -1874,6 +1903,133 @@ class LeoFind:
             pos, newpos = self.searchHelper(s, 0, len(s), self.find_text)
             if pos != -1: return True
         return False
+    #@+node:ekr.20261018205127.2: *4* find.batchSearch & helpers
+    def batchSearch(self, vnodes, replace=False):
+        """
+        Search the headlines and bodies of vnodes, a list of unique vnodes,
+        using the present find settings. This method never changes the outline.
+
+        replace=False: Return a set of vnodes. The set contains every vnode
+                       with a match. It may contain a few others.
+        replace=True:  Return a dict of the changes batchSearchAndReplace
+                       would make. Keys are vnodes, values are
+                       (count_h, new_h, count_b, new_b).
+
+        If @bool parallel-find-all is True, worker processes search large
+        outlines in chunks.
+        """
+        ivars = {
+            'change_text': self.change_text,
+            'find_text': self.find_text,
+            'findAllUniqueFlag': self.findAllUniqueFlag,
+            'ignore_case': self.ignore_case,
+            'match_obj': None,
+            'pattern_match': self.pattern_match,
+            're_obj': self.re_obj,
+            'reverse': False,
+            'search_body': self.search_body,
+            'search_headline': self.search_headline,
+            'spans_cache': None,
+            'whole_word': self.whole_word,
+        }
+        items = [(n, v.h, v.b) for n, v in enumerate(vnodes)]
+        results = None
+        if self.findAllInParallel and (os.cpu_count() or 1) > 1:
+            chunks = self.batchChunks(items)
+            if len(chunks) > 1:
+                try:
+                    executor = self.batchExecutor()
+                    futures_list = [
+                        executor.submit(batch_search, ivars, chunk, replace)
+                            for chunk in chunks]
+                    results = [z for future in futures_list for z in future.result()]
+                except Exception:
+                    self.shutdownBatchExecutor()  # The pool may be broken.
+                    results = None  # Search in the main thread.
+        if results is None:
+            results = batch_search(ivars, items, replace)
+        if replace:
+            return {vnodes[data[0]]: data[1:] for data in results}
+        return {vnodes[n] for n in results}
+    #@+node:ekr.20261019101544.1: *5* find.batchExecutor & shutdownBatchExecutor
+    def batchExecutor(self):
+        """
+        Return the executor for parallel batch searches, creating it if
+        necessary. All searches share the executor, so the workers start only
+        once.
+
+        Spawn the workers: forking would copy the whole Leo process, including
+        a running gui and its threads. batch_search does not use g.app, so
+        spawned workers need no initialization.
+        """
+        global batch_executor
+        if not batch_executor:
+            import concurrent.futures as futures
+            import multiprocessing
+            batch_executor = futures.ProcessPoolExecutor(
+                mp_context=multiprocessing.get_context('spawn'))
+        return batch_executor
+
+    def shutdownBatchExecutor(self):
+        """Shut down the executor for parallel batch searches, if it exists."""
+        global batch_executor
+        if batch_executor:
+            batch_executor.shutdown(wait=False)
+            batch_executor = None
+    #@+node:ekr.20261018205127.3: *5* find.batchChunks
+    def batchChunks(self, items):
+        """
+        Split items, a list of (n, h, b) tuples, into a list of lists.
+        Each list contains about self.batch_chunk_size characters.
+        """
+        chunks, chunk, size = [], [], 0
+        for item in items:
+            chunk.append(item)
+            size += len(item[1]) + len(item[2])
+            if size >= self.batch_chunk_size:
+                chunks.append(chunk)
+                chunk, size = [], 0
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+    #@+node:ekr.20261018205127.4: *5* find.batchSearchItems
+    def batchSearchItems(self, items, replace):
+        """
+        Search items, a list of (n, h, b) tuples.
+
+        replace=False: Return a list of the n's whose h or b may contain a match.
+        replace=True:  Return a list of (n, count_h, new_h, count_b, new_b)
+                       for all items containing a match.
+        """
+        result = []
+        for n, h, b in items:
+            if replace:
+                count_h, new_h, count_b, new_b = 0, None, 0, None
+                if self.search_headline:
+                    count_h, new_h = self.batchSearchAndReplace(h)
+                if self.search_body:
+                    count_b, new_b = self.batchSearchAndReplace(b)
+                if count_h or count_b:
+                    result.append((n, count_h, new_h, count_b, new_b))
+            elif (
+                self.search_headline and self.batchMatch(h) or
+                self.search_body and self.batchMatch(b)
+            ):
+                result.append(n)
+        return result
+    #@+node:ekr.20261018205127.5: *5* find.batchMatch
+    def batchMatch(self, s):
+        """
+        Return True if s contains a match, with or without '\\r' characters.
+
+        find.search ignores '\\r' on Windows, find.findNextBatchMatch does not.
+        """
+        for s2 in (s, s.replace('\r', '') if '\r' in s else None):
+            if s2:
+                pos, newpos = self.searchHelper(s2, 0, len(s2), self.find_text)
+                if pos != -1:
+                    return True
+        return False
     #@+node:ekr.20031218072017.3074: *4* find.findNext & helper
     def findNext(self, initFlag=True):
         """Find the next instance of the pattern."""
@@ -2109,6 +2265,9 @@ class LeoFind:
         if (self.ignore_dups or self.find_def_data) and p.v in self.find_seen:
             # Don't find defs/vars multiple times.
             return None, None
+        if self.batch_vnodes is not None and p.v not in self.batch_vnodes:
+            # find.batchSearch found no match in p's headline or body.
+            return None, None
         w = self.s_ctrl
         index = w.getInsertPoint()
         s = w.getAllText()
@@ -2164,12 +2323,19 @@ class LeoFind:
         regexp = self.pattern_match or self.findAllUniqueFlag
         word = self.whole_word
         if backwards: i, j = j, i
-        if not s[i:j] or not pattern:
+        if i >= j or i >= len(s) or not pattern:
+            # Like s[i:j], but without copying s.
             return -1, -1
         if regexp:
-            pos, newpos = self.regexHelper(s, i, j, pattern, backwards, nocase)
+            if backwards and self.spans_cache is not None:
+                pos, newpos = self.spansHelper(s, i, j, pattern, nocase, word=False, regexp=True)
+            else:
+                pos, newpos = self.regexHelper(s, i, j, pattern, backwards, nocase)
         elif backwards:
-            pos, newpos = self.backwardsHelper(s, i, j, pattern, nocase, word)
+            if word and self.spans_cache is not None:
+                pos, newpos = self.spansHelper(s, i, j, pattern, nocase, word=True, regexp=False)
+            else:
+                pos, newpos = self.backwardsHelper(s, i, j, pattern, nocase, word)
         else:
             pos, newpos = self.plainHelper(s, i, j, pattern, nocase, word)
         return pos, newpos
@@ -2248,6 +2414,60 @@ class LeoFind:
             return k, k + n
         # For pylint:
         return -1, -1
+    #@+node:ekr.20261018204832.1: *6* find.spansHelper & getSpans
+    def spansHelper(self, s, i, j, pattern, nocase, word, regexp):
+        """
+        Search backward for the last match in s[i:j], using the spans of all
+        matches in s. Used for backward regex and whole-word searches.
+
+        Return (-1, -1) on failure.
+        """
+        starts, ends, match_objects = self.getSpans(s, pattern, nocase, word, regexp)
+        n = bisect.bisect_right(ends, j) - 1
+        if n >= 0 and starts[n] >= i:
+            self.match_obj = match_objects[n] if regexp else None
+            return starts[n], ends[n]
+        self.match_obj = None
+        return -1, -1
+
+    def getSpans(self, s, pattern, nocase, word, regexp):
+        """
+        Return (starts, ends, match_objects), describing the non-empty,
+        non-overlapping matches of pattern in s, found in one forward pass.
+
+        The result is cached until the text, pattern or options change.
+        """
+        if regexp:
+            key = (self.p and self.p.v, self.in_headline, self.re_obj)
+        else:
+            key = (self.p and self.p.v, self.in_headline, pattern, nocase, word)
+        data = self.spans_cache.get(key)
+        if data and data[0] == s:
+            return data[1:]
+        starts, ends, match_objects = [], [], []
+        if regexp:
+            for mo in self.re_obj.finditer(s):
+                if mo.start() < mo.end():
+                    starts.append(mo.start())
+                    ends.append(mo.end())
+                    match_objects.append(mo)
+        else:
+            # Like backwardsHelper.
+            s2 = s.lower() if nocase else s
+            pattern = self.replaceBackSlashes(pattern.lower() if nocase else pattern)
+            n = len(pattern)
+            k = s2.find(pattern)
+            while k != -1 and n:
+                if not word or self.matchWord(s2, k, pattern):
+                    starts.append(k)
+                    ends.append(k + n)
+                    k = s2.find(pattern, k + n)
+                else:
+                    k = s2.find(pattern, k + 1)
+        if len(self.spans_cache) >= 100:
+            self.spans_cache.clear()
+        self.spans_cache[key] = s, starts, ends, match_objects
+        return starts, ends, match_objects
     #@+node:ekr.20060526093531: *6* find.plainHelper
     def plainHelper(self, s, i, j, pattern, nocase, word):
         """Do a plain search."""
@@ -2642,6 +2862,22 @@ class LeoFind:
             s = s[:-1]
         self.change_text = s
     #@-others
+#@+node:ekr.20261018205127.6: ** function: batch_search
+batch_executor = None
+    # The executor for parallel batch searches. See find.batchExecutor.
+
+def batch_search(ivars, items, replace):
+    """
+    Search items, a list of (n, h, b) tuples, without using any outline.
+
+    This function is safe to call in any worker process.
+
+    ivars: a dict of the LeoFind ivars that describe the search.
+    Return find.batchSearchItems(items, replace).
+    """
+    find = LeoFind.__new__(LeoFind)
+    find.__dict__.update(ivars)
+    return find.batchSearchItems(items, replace)
 #@+node:ekr.20200216063538.1: ** class TestFind
 class TestFind(unittest.TestCase):
     """Test cases for leoFind.py"""
@@ -2655,6 +2891,90 @@ class TestFind(unittest.TestCase):
         expected = r"""f' AA line\\n BB \3'"""
         result = x.makeRegexSubs(change_text, groups)
         assert result == expected, (expected, result)
+    #@+node:ekr.20261018205127.7: *3* test_batch_search
+    def test_batch_search(self):
+
+        class V:
+            def __init__(self, h, b):
+                self.h, self.b = h, b
+
+        x = LeoFind(c=g.NullObject(tag='c'))
+        x.ignore_case = x.findAllUniqueFlag = False
+        x.search_headline = x.search_body = True
+        x.change_text = 'xyz'
+        vnodes = [V(f"node {i}", f"line ab{i}\nab line\n" * (i % 3)) for i in range(100)]
+        for regexp, word, pattern in (
+            (False, False, 'ab1'),
+            (False, True, 'ab'),
+            (True, False, r'ab\d+$'),
+        ):
+            x.pattern_match, x.whole_word, x.find_text = regexp, word, pattern
+            x.re_obj = re.compile(pattern, re.MULTILINE) if regexp else None
+            found = {v for v in vnodes if x.batchMatch(v.h) or x.batchMatch(v.b)}
+            changes = {}
+            for v in vnodes:
+                count_h, new_h = x.batchSearchAndReplace(v.h)
+                count_b, new_b = x.batchSearchAndReplace(v.b)
+                if count_h or count_b:
+                    changes[v] = count_h, new_h, count_b, new_b
+            assert found and changes, pattern
+            for chunk_size in (1000000, 10):
+                x.batch_chunk_size = chunk_size
+                assert x.batchSearch(vnodes) == found, pattern
+                assert x.batchSearch(vnodes, replace=True) == changes, pattern
+                chunks = x.batchChunks([(n, v.h, v.b) for n, v in enumerate(vnodes)])
+                results = [z for chunk in chunks for z in batch_search(x.__dict__, chunk, True)]
+                assert {vnodes[z[0]]: z[1:] for z in results} == changes, pattern
+    #@+node:ekr.20261019101544.2: *3* test_parallel_batch_search
+    def test_parallel_batch_search(self):
+
+        class V:
+            def __init__(self, h, b):
+                self.h, self.b = h, b
+
+        x = LeoFind(c=g.NullObject(tag='c'))
+        x.ignore_case = x.findAllUniqueFlag = x.whole_word = False
+        x.search_headline = x.search_body = True
+        x.pattern_match, x.re_obj = True, re.compile(r'ab\d+$', re.MULTILINE)
+        x.find_text, x.change_text = r'ab\d+$', 'xyz'
+        x.findAllInParallel, x.batch_chunk_size = True, 100
+        vnodes = [V(f"node {i}", f"line ab{i}\nab line\n" * (i % 3)) for i in range(100)]
+        found = {v for v in vnodes if x.batchMatch(v.h) or x.batchMatch(v.b)}
+        items = [(n, v.h, v.b) for n, v in enumerate(vnodes)]
+        try:
+            for i in range(2):
+                assert x.batchSearch(vnodes) == found
+            # All searches share one executor, even on machines with one cpu.
+            executor = x.batchExecutor()
+            assert x.batchExecutor() is executor
+            future = executor.submit(batch_search, x.__dict__, items, False)
+            assert {vnodes[n] for n in future.result()} == found
+        finally:
+            x.shutdownBatchExecutor()
+    #@+node:ekr.20261018204832.2: *3* test_backward_search
+    def test_backward_search(self):
+        x = LeoFind(c=g.NullObject(tag='c'))
+        x.ignore_case = x.findAllUniqueFlag = False
+        x.reverse = True
+        s = 'abc ab abcd ab abc'
+        for regexp, word, pattern, expected in (
+            (False, True, 'ab', [12, 4]),
+            (False, True, 'abc', [15, 0]),
+            (True, False, r'ab\w*', [15, 12, 7, 4, 0]),
+            (True, False, r'\bab\b', [12, 4]),
+        ):
+            x.pattern_match, x.whole_word = regexp, word
+            x.re_obj = re.compile(pattern)
+            for cache in ({}, None):
+                x.spans_cache = cache
+                result, j = [], len(s)
+                while True:
+                    pos, newpos = x.searchHelper(s, j, 0, pattern)
+                    if pos == -1:
+                        break
+                    result.append(pos)
+                    j = pos
+                assert result == expected, (pattern, cache, expected, result)
     #@-others
 #@-others
 if __name__ == '__main__':
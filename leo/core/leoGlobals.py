@@ -28,7 +28,11 @@ in_bridge = False
     # import leo.core.leoTest as leoTest
 import binascii
 import codecs
-from functools import reduce
+import copy
+    # Import copy before unittest. copy tries to import Jython's org
+    # package. leoBridge puts leo/plugins/importers on sys.path, so spawned
+    # workers would import importers/org.py while unittest is half imported.
+from functools import lru_cache, reduce
 try:
     import gc
 except ImportError:
@@ -2304,6 +2308,8 @@ class TypedDict:
     __setitem__:  Type checks its arguments.
     __str__:      A concise summary of the inner dict.
     add_to_list:  A convenience method that adds a value to its key's list.
+    changes:      A count of the changes made by __setitem__, add_to_list
+                  and update. c.config.snapshot uses it.
     name:         The dict's name.
     setName:      Sets the dict's name, for use by __repr__.
     
@@ -2316,6 +2322,9 @@ class TypedDict:
     update:       Updates self.d from either a dict or a TypedDict.
     """
 
+    changes = 0
+        # A class attribute, so pickled TypedDicts need not contain it.
+
     def __init__(self, name, keyType, valType):
         self.d = {}
         self._name = name  # For __repr__ only.
@@ -2349,6 +2358,7 @@ class TypedDict:
         except TypeError:
             self._checkValType(val)  # val is not iterable.
         self.d[key] = val
+        self.changes += 1
     #@+node:ekr.20190904052828.1: *4* td.add_to_list
     def add_to_list(self, key, val):
         """Update the *list*, self.d [key]"""
@@ -2361,6 +2371,7 @@ class TypedDict:
         if val not in aList:
             aList.append(val)
             self.d[key] = aList
+            self.changes += 1
     #@+node:ekr.20120206134955.10150: *4* td.checking
     def _checkKeyType(self, key):
         if key and key.__class__ != self.keyType:
@@ -2416,6 +2427,7 @@ class TypedDict:
             self.d.update(d.d)
         else:
             self.d.update(d)
+        self.changes += 1
     #@-others
 #@+node:ville.20090827174345.9963: *3* class g.UiTypeException & g.assertui
 class UiTypeException(Exception):
@@ -2434,7 +2446,9 @@ class TestLeoGlobals(unittest.TestCase):
         # pylint: disable=import-self
         import leo.core.leoGlobals as leo_g
         import leo.core.leoApp as leoApp
-        leo_g.app = leoApp.LeoApp()
+        # Don't replace g.app: the singleton bridge controller of other tests uses it.
+        if not leo_g.app:
+            leo_g.app = leoApp.LeoApp()
         assert leo_g.comment_delims_from_extension(".py") == ('#', '', '')
         assert leo_g.comment_delims_from_extension(".c") == ('//', '/*', '*/')
         assert leo_g.comment_delims_from_extension(".html") == ('', '<!--', '-->')
@@ -2455,6 +2469,100 @@ class TestLeoGlobals(unittest.TestCase):
         html_delims = leo_g.comment_delims_from_extension('.html')
         assert leo_g.is_sentinel("<!--@+node-->", html_delims)
         assert not leo_g.is_sentinel("<!--comment-->", html_delims)
+    #@+node:ekr.20261019095230.1: *4* bridge
+    def bridge(self):
+        """Return an instance of Leo's bridge."""
+        import leo.core.leoBridge as leoBridge
+        return leoBridge.controller(gui='nullGui',
+            loadPlugins=False,
+            readSettings=False,
+            silent=True,
+            verbose=False,
+        )
+    #@+node:ekr.20261019095230.2: *4* test_find_exact_unl
+    def test_find_exact_unl(self):
+        c = self.bridge().openLeoFile(None)
+        root = c.rootPosition()
+        root.h = 'root'
+        for i in range(3):
+            child = root.insertAsLastChild()
+            child.h = 'child' if i < 2 else 'other'
+            for j in range(3):
+                child.insertAsLastChild().h = f"grandchild {j}"
+
+        def unl(p):
+            return [z.h for z in reversed(list(p.self_and_parents()))]
+
+        def check():
+            unls = [unl(p) for p in c.all_positions()]
+            unls.extend([['root', 'none'], ['none'], ['root', 'child', 'none']])
+            for aList in unls:
+                expected = [p for p in c.all_positions() if unl(p) == aList]
+                p = g.findExactUNL(c, aList)
+                if expected:
+                    # The first position in outline order.
+                    self.assertEqual(p, expected[0], aList)
+                    self.assertTrue(c.positionExists(p))
+                else:
+                    self.assertIsNone(p, aList)
+                found, depth, p2 = g.recursiveUNLFind(aList, c)
+                if expected:
+                    self.assertTrue(found)
+                    self.assertEqual(p2, expected[0])
+
+        check()
+        # Clones, including a clone that is the first match of its UNL.
+        clone = root.lastChild().firstChild().clone()
+        clone.moveToFirstChildOf(root.firstChild())
+        clone = root.lastChild().clone()
+        clone.moveAfter(root)
+        check()
+        # Renamed headlines.
+        root.firstChild().h = 'other'
+        root.lastChild().firstChild().h = 'renamed'
+        c.lastTopLevel().h = 'root'
+        check()
+        # Moves.
+        root.lastChild().moveToFirstChildOf(root)
+        root.firstChild().lastChild().moveToFirstChildOf(root.lastChild())
+        c.lastTopLevel().moveToFirstChildOf(root.firstChild().next())
+        check()
+        # Deletes.
+        root.firstChild().doDelete()
+        check()
+        # Direct assignments to v.children.
+        root.v.children.reverse()
+        check()
+        c.close()
+    #@+node:ekr.20261019095230.3: *4* test_index_of_child
+    def test_index_of_child(self):
+        c = self.bridge().openLeoFile(None)
+        root = c.rootPosition()
+        for i in range(5):
+            root.insertAsLastChild().h = f"child {i}"
+        # A clone that appears twice among the children.
+        clone = root.firstChild().clone()
+        clone.moveToLastChildOf(root)
+        v = root.v
+
+        def check():
+            for n, child in enumerate(v.children):
+                self.assertEqual(v.indexOfChild(child), v.children.index(child))
+                self.assertEqual(
+                    v.childIndicesWithHeadline(child.h),
+                    [i for i, z in enumerate(v.children) if z.h == child.h])
+            self.assertEqual(v.indexOfChild(c.hiddenRootNode), -1)
+
+        check()
+        root.firstChild().next().moveToLastChildOf(root)
+        check()
+        root.lastChild().h = 'child 0'
+        check()
+        root.firstChild().doDelete()
+        check()
+        v.children.reverse()
+        check()
+        c.close()
     #@-others
 #@+node:ekr.20140904112935.18526: *3* g.isTextWrapper & isTextWidget
 def isTextWidget(w):
@@ -3208,14 +3316,27 @@ def get_directives_dict(p, root=None):
     Scan p for @directives found in globalDirectiveList.
 
     Returns a dict containing the stripped remainder of the line
-    following the first occurrence of each recognized directive
+    following the first occurrence of each recognized directive.
+
+    The result is cached in c.directivesCache until p's headline or body
+    changes. Callers must not change the returned dict.
     """
     if root: root_node = root[0]
-    # c = p and p.v and p.v.context
-    d = {}
+    v = p.v
+    cache = getattr(v.context, 'directivesCache', None)
     # Do this every time so plugins can add directives.
-    pat = g.compute_directives_re()
-    directives_pat = re.compile(pat, re.MULTILINE)
+    directives_pat = g.get_directives_pat()
+    # Don't cache the error given for noweb roots in non-top-level nodes.
+    if cache is not None and not (root and not root_node):
+        data = cache.get(v)
+        if (
+            data and data[0] is v._headString and data[1] is v._bodyString
+            and data[2] == bool(root) and data[3] is directives_pat
+        ):
+            return data[4]
+    else:
+        cache = None
+    d = {}
     # The headline has higher precedence because it is more visible.
     for kind, s in (('head', p.h), ('body', p.b)):
         anIter = directives_pat.finditer(s)
@@ -3243,12 +3364,14 @@ def get_directives_dict(p, root=None):
             else:
                 g.es(f'{g.angleBrackets("*")} may only occur in a topmost node (i.e., without a parent)')
             break
+    if cache is not None:
+        cache[v] = v._headString, v._bodyString, bool(root), directives_pat, d
     return d
 #@+node:ekr.20090214075058.10: *4* g.compute_directives_re
 def compute_directives_re():
     """
     Return an re pattern which word matches all Leo directives.
-    Only g.get_directives_dict uses this pattern.
+    Only g.get_directives_pat uses this pattern.
     """
     global globalDirectiveList
     # Use a pattern that guarantees word matches.
@@ -3257,12 +3380,30 @@ def compute_directives_re():
     ]
     # Clearer w/o f-strings.
     return f"^@(%s)" % "|".join(aList)
+#@+node:ekr.20261018202540.1: *4* g.get_directives_pat
+g_directives_pat_data = None
+    # A tuple (globalDirectiveList, compiled pattern).
+
+def get_directives_pat():
+    """
+    Return the compiled pattern for compute_directives_re.
+
+    Recompile the pattern only when plugins change globalDirectiveList.
+    """
+    global g_directives_pat_data
+    key = tuple(globalDirectiveList)
+    if g_directives_pat_data and g_directives_pat_data[0] == key:
+        return g_directives_pat_data[1]
+    pat = re.compile(g.compute_directives_re(), re.MULTILINE)
+    g_directives_pat_data = key, pat
+    return pat
 #@+node:ekr.20080827175609.1: *3* g.get_directives_dict_list (must be fast)
 def get_directives_dict_list(p):
     """Scans p and all its ancestors for directives.
 
     Returns a list of dicts containing pointers to
-    the start of each directive"""
+    the start of each directive. The dicts are cached:
+    callers must not change them."""
     result = []
     p1 = p.copy()
     for p in p1.self_and_parents(copy=False):
@@ -3732,7 +3873,7 @@ def ensure_extension(name, ext):
     theFile, old_ext = g.os_path_splitext(name)
     if not name:
         return name  # don't add to an empty name.
-    if old_ext in ('.db', '.leo'):
+    if old_ext in ('.db', '.leo', '.leojsonl'):
         return name
     if old_ext and old_ext == ext:
         return name
@@ -4277,6 +4418,13 @@ def recursiveUNLFind(unlList, c, depth=0, p=None, maxdepth=0, maxp=None,
         nds = list(c.rootPosition().self_and_siblings())
         unlList = [i.replace('--%3E', '-->') for i in unlList if i.strip()]
         # drop empty parts so "-->node name" works
+        # Use c.unlIndex unless the search depends on indices or counts.
+        if unlList and not soft_idx and not hard_idx and not any(
+            recursiveUNLParts(z)[1] for z in unlList
+        ):
+            p = g.findExactUNL(c, [pos_pattern.sub('', z) for z in unlList])
+            if p:
+                return True, len(unlList) - 1, p
     else:
         nds = list(p.children())
     heads = [i.h for i in nds]
@@ -4366,6 +4514,36 @@ def recursiveUNLFind(unlList, c, depth=0, p=None, maxdepth=0, maxp=None,
             maxp = p
             maxdepth = p.level()
     return False, maxdepth, maxp
+#@+node:ekr.20261018203240.2: *4* g.findExactUNL
+def findExactUNL(c, unlList):
+    """
+    Return the first position, in outline order, whose headline and whose
+    ancestors' headlines are the items of unlList, or None.
+
+    This search follows only children whose headlines match, so it takes
+    O(len(unlList)) time when the matches are unique. See
+    v.childIndicesWithHeadline. Return None if c.unlIndex is None.
+    """
+    import leo.core.leoNodes as leoNodes
+    if c.unlIndex is None or not unlList:
+        return None
+    last = len(unlList) - 1
+
+    def find(parent_v, stack, i):
+        """
+        Return the first position matching unlList[i:] among the descendants
+        of parent_v, whose position has the given stack, or None.
+        """
+        for n in parent_v.childIndicesWithHeadline(unlList[i]):
+            v = parent_v.children[n]
+            if i == last:
+                return leoNodes.Position(v, n, stack)
+            p = find(v, stack + [(v, n)], i + 1)
+            if p:
+                return p
+        return None
+
+    return find(c.hiddenRootNode, [], 0)
 #@+node:tbrown.20171221094755.1: *4* g.recursiveUNLParts
 pos_pattern = re.compile(r':(\d+),?(\d+)?,?([-\d]+)?,?(\d+)?$')
 
@@ -4734,6 +4912,8 @@ def is_nl(s, i):
 def is_special(s, directive):
     """Return True if the body text contains the @ directive."""
     assert(directive and directive[0] == '@')
+    if directive not in s:
+        return False, -1  # An important optimization.
     lws = directive in ("@others", "@all")
         # Most directives must start the line.
     pattern = r'^\s*(%s\b)' if lws else r'^(%s\b)'
@@ -7419,6 +7599,16 @@ def getScript(c, p,
         g.es_exception()
         script = ''
     return script
+#@+node:ekr.20261018214037.1: *4* g.compileScript
+@lru_cache(maxsize=32)
+def compileScript(script, fileName='<string>'):
+    """
+    Return the code object for script.
+
+    Recently compiled scripts are cached, so running the same @button or
+    @command script again does not compile it again.
+    """
+    return compile(script, fileName, 'exec')
 #@+node:ekr.20170228082641.1: *4* g.composeScript
 def composeScript(c, p, s, forcePythonSentinels=True, useSentinels=True):
     """Compose a script from p.b."""
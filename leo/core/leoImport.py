@@ -25,6 +25,7 @@ except ImportError:
 import os
 import re
 import time
+import unittest
 import urllib
 #@-<< imports >>
 #@+others
@@ -1769,10 +1770,28 @@ class RecursiveImportController:
         safe_at_file=True,
         theTypes=None,
         ignore_pattern=None,
+        parallel=None,
+        progress=None,
     ):
-        """Ctor for RecursiveImportController class."""
+        """
+        Ctor for RecursiveImportController class.
+
+        parallel: True: scan files in worker processes.
+                  None: use @bool parallel-recursive-import.
+        progress: None or a function f(n, total, path), called after
+                  importing each file. total is None for serial imports.
+                  Returning False cancels the import.
+        """
         self.c = c
         self.add_path = add_path
+        self.cancelled = False
+        self.executor = None
+        self.pending = []
+            # A list of (p, path, future) for files scanned in worker processes.
+        self.progress = progress
+        if parallel is None:
+            parallel = c.config.getBool('parallel-recursive-import', default=False)
+        self.parallel = parallel and kind != '@edit' and (os.cpu_count() or 1) > 1
         self.file_pattern = re.compile(r'^(([@])+(auto|clean|edit|file|nosent))')
         self.kind = kind
             # in ('@auto', '@clean', '@edit', '@file', '@nosent')
@@ -1782,6 +1801,10 @@ class RecursiveImportController:
         self.safe_at_file = safe_at_file
         self.theTypes = theTypes
         self.ignore_pattern = ignore_pattern or re.compile(r'\.git|node_modules')
+    #@+node:ekr.20261018210343.1: *3* ric.cancel
+    def cancel(self):
+        """Stop the import. Files already imported remain in the outline."""
+        self.cancelled = True
     #@+node:ekr.20130823083943.12613: *3* ric.run & helpers
     def run(self, dir_):
         """
@@ -1801,10 +1824,19 @@ class RecursiveImportController:
             parent = last.insertAfter()
             parent.v.h = 'imported files'
             # Leo 5.6: Special case for a single file.
-            self.n_files = 0
+            self.n_files = self.n_done = 0
             if g.os_path_isfile(dir_):
                 g.es_print('\nimporting file:', dir_)
                 self.import_one_file(dir_, parent)
+            elif self.parallel:
+                self.executor = self.create_executor(parent)
+                try:
+                    self.import_dir(dir_, parent)
+                    self.graft_files()
+                finally:
+                    if self.executor:
+                        self.executor.shutdown()
+                    self.executor = None
             else:
                 self.import_dir(dir_, parent)
             self.post_process(parent, dir_)
@@ -1824,6 +1856,8 @@ class RecursiveImportController:
             f"imported {n} node{g.plural(n)} "
             f"in {self.n_files} file{g.plural(self.n_files)} "
             f"in {t2 - t1:2.2f} seconds")
+        if self.cancelled:
+            g.es_print('recursive import cancelled')
     #@+node:ekr.20130823083943.12597: *4* ric.import_dir
     def import_dir(self, dir_, parent):
         """Import selected files from dir_, a directory."""
@@ -1860,10 +1894,12 @@ class RecursiveImportController:
                 assert self.recursive
                 for dir_ in sorted(dirs):
                     self.import_dir(dir_, parent)
-    #@+node:ekr.20170404103953.1: *4* ric.import_one_file
+    #@+node:ekr.20170404103953.1: *4* ric.import_one_file & helpers
     def import_one_file(self, path, parent):
         """Import one file to the last top-level node."""
         c = self.c
+        if self.cancelled:
+            return
         self.n_files += 1
         assert parent and parent.v != self.root.v, g.callers()
         if self.kind == '@edit':
@@ -1871,6 +1907,16 @@ class RecursiveImportController:
             p.v.h = path.replace('\\', '/')
             s, e = g.readFileIntoString(path, kind=self.kind)
             p.v.b = s
+            self.report_progress(path)
+            return
+        if self.executor:
+            # Create the @file node now, so the outline's order does not depend
+            # on the order in which the workers finish. ric.graft_files fills it.
+            p = parent.insertAsLastChild()
+            p.v.h = f"@file {path}"
+            fileName = c.importCommands.get_import_filename(path, p)
+            future = self.executor.submit(import_file_data, fileName, p.h)
+            self.pending.append((p, path, future))
             return
         # #1484: Use this for @auto as well.
         c.importCommands.importFilesCommand(
@@ -1881,10 +1927,120 @@ class RecursiveImportController:
             treeType='@file',  # '@auto','@clean','@nosent' cause problems.
         )
         p = parent.lastChild()
+        self.set_kind(p)
+        self.report_progress(path)
+    #@+node:ekr.20261018210343.2: *5* ric.report_progress
+    def report_progress(self, path):
+        """Call the progress callback, if any, after importing path."""
+        self.n_done += 1
+        if self.progress:
+            total = len(self.pending) if self.executor else None
+            if self.progress(self.n_done, total, path) is False:
+                self.cancel()
+    #@+node:ekr.20261018210343.3: *5* ric.set_kind
+    def set_kind(self, p):
+        """Change p, an @file node, to the requested kind of node."""
         p.h = self.kind + p.h[5:]
             # Bug fix 2017/10/27: honor the requested kind.
         if self.safe_at_file:
             p.v.h = '@' + p.v.h
+    #@+node:ekr.20261018210343.4: *4* ric.create_executor
+    def create_executor(self, parent):
+        """
+        Return a pool of worker processes for ric.import_one_file, or None.
+
+        Unlike at.createReadExecutor, never fall back to threads:
+        init_import_worker replaces g.app.
+
+        Spawn the workers: forking would copy the whole Leo process, including
+        a running gui and its threads. init_import_worker creates a new g.app
+        in each worker from the settings and directives passed here.
+        """
+        import concurrent.futures as futures
+        import multiprocessing
+        import leo.core.leoApp as leoApp
+        c = self.c
+        settings = leoApp.PreviousSettings(c.config.settingsDict, c.config.shortcutsDict)
+        # The workers' @file nodes have no ancestors, so pass parent's directives.
+        d = c.scanAllDirectives(parent)
+        directives = ''.join(f"@{key} {d.get(key)}\n"
+            for key in ('encoding', 'language', 'tabwidth') if d.get(key))
+        try:
+            return futures.ProcessPoolExecutor(
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_import_worker,
+                initargs=(settings, directives),
+            )
+        except Exception:
+            g.es_print('recursive-import: can not create worker processes: importing files serially')
+            g.es_exception()
+            return None
+    #@+node:ekr.20261018210343.5: *4* ric.graft_files & helper
+    def graft_files(self):
+        """
+        Fill the @file nodes created by ric.import_one_file, in outline order,
+        using the node trees computed by the worker processes.
+
+        Import a file in this process if its worker failed.
+        """
+        c, ic = self.c, self.c.importCommands
+        t1 = time.time()
+        wait = 0.0
+        unused = []
+        for p, path, future in self.pending:
+            if self.cancelled:
+                future.cancel()
+                unused.append(p)
+                continue
+            t2 = time.time()
+            try:
+                data = future.result()
+            except Exception:
+                data = None
+            wait += time.time() - t2
+            g.setGlobalOpenDir(path)
+            try:
+                if data:
+                    tree, messages = data
+                    for s, color, newline in messages:
+                        g.es(s, color=color, newline=newline)
+                    self.graft_tree(p.v, tree)
+                    c.atFileCommands.rememberReadPath(path, p)
+                    ok = True
+                else:
+                    ok = bool(ic.createOutline(path, parent=p.copy()))
+                if ok:
+                    if not g.unitTesting:
+                        g.blue("imported", g.shortFileName(path))
+                    p.contract()
+                    p.setDirty()
+                    c.setChanged()
+            except Exception:
+                g.es_print('Exception importing', path)
+                g.es_exception()
+            self.set_kind(p)
+            self.report_progress(path)
+        if unused:
+            self.n_files -= len(unused)
+            c.deletePositionsInList(unused, redraw=False)
+        n = len(self.pending) - len(unused)
+        if n:
+            g.es_print(
+                f"scanned {n} file{g.plural(n)} "
+                f"in worker processes. waited {wait:2.2f} seconds, "
+                f"grafted in {time.time() - t1 - wait:2.2f} seconds")
+        self.pending = []
+    #@+node:ekr.20261018210343.6: *5* ric.graft_tree
+    def graft_tree(self, v, tree):
+        """Set v's body and create its descendants from tree."""
+        body, u, children = tree
+        v.b = body
+        if u:
+            v.u = u
+        for h, body, u, grand_children in children:
+            child = v.insertAsLastChild()
+            child.h = h
+            self.graft_tree(child, (body, u, grand_children))
     #@+node:ekr.20130823083943.12607: *4* ric.post_process & helpers
     def post_process(self, p, prefix):
         """
@@ -2489,6 +2645,174 @@ class ZimImportController:
             c.selectPosition(zimNode)
             c.redraw()
     #@-others
+#@+node:ekr.20261018210343.7: ** function: import_file_data
+# The scratch commander of a worker process. See init_import_worker.
+import_worker_commander = None
+
+def import_file_data(fileName, headline):
+    """
+    Import the file into a scratch outline in a worker process.
+
+    Return (tree, messages), where tree is (body, u, children) for the
+    @file node, each child is (headline, body, u, children) and messages
+    is a list of (s, color, newline) tuples for g.es.
+    """
+    c = import_worker_commander
+    root = c.rootPosition()
+    root.v._deleteAllChildren()
+    c.fileCommands.gnxDict = {}
+    p = root.insertAsLastChild()
+    p.v.h = headline
+    g.app.logWaiting = []
+    c.importCommands.createOutline(fileName, parent=p.copy())
+
+    def tree(v):
+        return [(z.h, z.b, z.u, tree(z)) for z in v.children]
+
+    messages = [z[:3] for z in g.app.logWaiting]
+    g.app.logWaiting = []
+    return (p.v.b, p.v.u, tree(p.v)), messages
+#@+node:ekr.20261018210343.8: ** function: init_import_worker
+def init_import_worker(settings, directives):
+    """
+    Create g.app and the scratch commander of a worker process.
+
+    settings is a PreviousSettings instance holding the settings of the
+    importing commander.
+
+    directives is the body of the scratch root, the parent of the imported
+    @file node: the effective @encoding, @language and @tabwidth directives
+    of the importing commander's parent node.
+
+    Like leoBridge, create a minimal g.app with a null gui. Unlike
+    leoBridge, read no settings files, load no plugins and keep all
+    messages in g.app.logWaiting. See import_file_data.
+    """
+    global import_worker_commander
+    import leo.core.leoApp as leoApp
+    import leo.core.leoConfig as leoConfig
+    import leo.core.leoNodes as leoNodes
+    import leo.core.leoPlugins as leoPlugins
+
+    def dummyDoHook(tag, *args, **keys):
+        pass
+
+    g.in_bridge = True
+        # Tell leoApp.createDefaultGui not to create a gui.
+    g.app = leoApp.LeoApp()
+    g.app.silentMode = True
+    leoPlugins.init()  # Sets g.app.pluginsController.
+    g.app.recentFilesManager = leoApp.RecentFilesManager()
+    g.app.loadManager = lm = leoApp.LoadManager()
+    lm.computeStandardDirectories()
+    g.app.leoID = 'importWorker'
+        # The worker's gnx's never leave the worker.
+    g.app.inBridge = True
+    g.app.nodeIndices = leoNodes.NodeIndices(g.app.leoID)
+    g.app.config = leoConfig.GlobalConfigManager()
+    g.app.db = g.NullObject()
+    g.app.commander_cacher = g.NullObject()
+    g.app.global_cacher = g.NullObject()
+    lm.globalSettingsDict, lm.globalBindingsDict = lm.createDefaultSettingsDicts()
+    g.app.gui = g.app.nullGui
+    g.app.log = None
+    g.doHook = dummyDoHook
+    lm.createAllImporterData()
+    g.app.initing = False
+    c = g.app.newCommander(None, gui=g.app.gui, previousSettings=settings)
+    c.frame.createFirstTreeNode()
+    root = c.rootPosition()
+    root.v.h, root.v.b = 'imported file', directives
+    c.tab_width = c.getTabWidth(root)
+    import_worker_commander = c
+#@+node:ekr.20261018231204.1: ** class TestRecursiveImportController
+class TestRecursiveImportController(unittest.TestCase):
+    #@+others
+    #@+node:ekr.20261018231204.2: *3* TestRecursiveImportController.bridge
+    def bridge(self):
+        """Return an instance of Leo's bridge."""
+        import leo.core.leoBridge as leoBridge
+        return leoBridge.controller(gui='nullGui',
+            loadPlugins=False,
+            readSettings=False,
+            silent=True,
+            verbose=False,
+        )
+    #@+node:ekr.20261018231204.3: *3* TestRecursiveImportController.test_parallel_import
+    def test_parallel_import(self):
+        """Test that parallel imports create the same outline as serial imports."""
+        import tempfile
+        bridge = self.bridge()
+        # The bridge does not create the importer data.
+        g.app.loadManager.createAllImporterData()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for i, dir_ in enumerate(('b', 'a', os.path.join('a', 'sub'))):
+                path = os.path.join(temp_dir, dir_)
+                os.makedirs(path, exist_ok=True)
+                for name in ('z.py', 'y.py'):
+                    with open(os.path.join(path, name), 'w') as f:
+                        f.write(
+                            f"class C{i}:\n\n"
+                            f"    def f{i}(self):\n"
+                            f"        a = '{dir_}/{name}'\n"
+                            f"        return a\n\n"
+                            f"    def g{i}(self):\n"
+                            f"        pass\n")
+            c = bridge.openLeoFile(os.path.join(temp_dir, 'test_file.leo'))
+
+            def run(parallel, progress=None):
+                c.selectPosition(c.rootPosition())
+                ric = RecursiveImportController(c, '@clean',
+                    theTypes=['.py'], parallel=parallel, progress=progress)
+                ric.parallel = parallel  # Even on one cpu.
+                ric.run(temp_dir)
+                p = c.lastTopLevel()
+                result = [(z.h, z.b, z.level() - p.level()) for z in p.subtree()]
+                c.deletePositionsInList([p], redraw=False)
+                return ric, result
+
+            calls = []
+
+            def progress(n, total, path):
+                calls.append((n, total, os.path.relpath(path, temp_dir)))
+
+            ric, expected = run(False)
+            self.assertEqual(ric.n_files, 6)
+            self.assertIn('C0.f0', [z[0] for z in expected])
+            ric, result = run(True, progress)
+            self.assertEqual(result, expected)
+            # Progress is reported in outline order.
+            self.assertEqual(calls, [(n + 1, 6, z) for n, z in enumerate([
+                os.path.join('a', 'y.py'), os.path.join('a', 'z.py'),
+                os.path.join('a', 'sub', 'y.py'), os.path.join('a', 'sub', 'z.py'),
+                os.path.join('b', 'y.py'), os.path.join('b', 'z.py'),
+            ])])
+            # Returning False from progress cancels the import.
+            ric, result = run(True, lambda n, total, path: n < 2)
+            self.assertTrue(ric.cancelled)
+            self.assertEqual(ric.n_files, 2)
+            self.assertEqual(
+                len([z for z in result if z[0].startswith('@@clean')]), 2)
+            # The workers are spawned, so they work with any gui.
+            import leo.core.leoGui as leoGui
+            gui = g.app.gui
+            try:
+                g.app.gui = leoGui.LeoGui('test')
+                ric = RecursiveImportController(c, '@clean', parallel=True)
+                executor = ric.create_executor(c.rootPosition())
+                try:
+                    path = os.path.join(temp_dir, 'a', 'y.py')
+                    future = executor.submit(import_file_data, path, f"@file {path}")
+                    (body, u, children), messages = future.result()
+                finally:
+                    executor.shutdown()
+            finally:
+                g.app.gui = gui
+            self.assertIn('@others', body)
+            self.assertEqual([z[0] for z in children], ['class C1'])
+            self.assertEqual([z[0] for z in children[0][3]], ['f1', 'g1'])
+            c.close()
+    #@-others
 #@+node:ekr.20101103093942.5938: ** Commands (leoImport)
 #@+node:ekr.20160504050255.1: *3* @g.command(import-free-mind-files)
 if lxml:
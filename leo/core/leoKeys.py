@@ -3711,7 +3711,7 @@ class KeyHandlerClass:
         """Search all visible nodes for a headline starting with stroke."""
         if not char: return
         c = self.c
-        if not c.config.getBool('plain-key-outline-search'):
+        if not c.config.snapshot.plain_key_outline_search:
             return
 
         def match(p):
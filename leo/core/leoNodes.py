@@ -5,6 +5,7 @@
 """Leo's fundamental data classes."""
 #@+<< imports >>
 #@+node:ekr.20060904165452.1: ** << imports >> (leoNodes.py)
+import bisect
 import copy
 import itertools
 import time
@@ -2406,11 +2407,13 @@ class VNode:
         # Fix bug: https://bugs.launchpad.net/leo-editor/+bug/1245535
         # API allows headlines to contain newlines.
         v = self
-        if g.isUnicode(s):
-            v._headString = s.replace('\n', '')
-            return
-        s = g.toUnicode(s, reportErrors=True)
-        v._headString = s.replace('\n', '')
+        if v.context.outlineChanges is not None:
+            v.context.outlineChanges.add(v)
+        if not g.isUnicode(s):
+            s = g.toUnicode(s, reportErrors=True)
+        old, v._headString = v._headString, s.replace('\n', '')
+        if v.parents and v.context.unlIndex is not None:
+            v._renameInUnlIndex(old)
 
     initBodyString = setBodyString
     initHeadString = setHeadString
@@ -2442,6 +2445,84 @@ class VNode:
         for v2 in v_and_parents(v):
             if v2.isAnyAtFileNode():
                 v2.setDirty()
+    #@+node:ekr.20261018203240.1: *3* v.indexOfChild
+    def indexOfChild(self, child):
+        """
+        Return n such that v.children[n] is child, or -1 if child is not a
+        child of v. Like v.children.index(child), but amortized O(1).
+
+        c.childIndexCache caches the indices of v's children. Each cached
+        index is verified, so code may change v.children directly.
+        """
+        v = self
+        cache = v.context.childIndexCache
+        if cache is None:
+            try:
+                return v.children.index(child)
+            except ValueError:
+                return -1
+        d = cache.get(v)
+        if d is not None:
+            n = d.get(id(child))
+            if n is not None and n < len(v.children) and v.children[n] is child:
+                return n
+        d = {}
+        for n, v2 in enumerate(v.children):
+            d.setdefault(id(v2), n)
+        cache[v] = d
+        return d.get(id(child), -1)
+    #@+node:ekr.20261019094512.1: *3* v.childIndicesWithHeadline & helper
+    def childIndicesWithHeadline(self, h):
+        """
+        Return the ascending list of all n such that v.children[n].h == h.
+
+        c.unlIndex maps vnodes to (children, len(children), d), where d maps
+        the headlines of v's children to their indices. The link primitives
+        drop v's entry and v.setHeadString updates the entries of the renamed
+        node's parents, so an entry costs O(len(v.children)) only after v's
+        children change. Entries are rebuilt if code has assigned v.children
+        directly, and the returned indices are verified.
+        """
+        v = self
+        index = v.context.unlIndex
+        children = v.children
+        entry = index.get(v) if index is not None else None
+        if entry and entry[0] is children and entry[1] == len(children):
+            result = entry[2].get(h, [])
+            if all(children[n]._headString == h for n in result):
+                return result
+        d = {}
+        for n, child in enumerate(children):
+            d.setdefault(child._headString, []).append(n)
+        if index is not None:
+            index[v] = children, len(children), d
+        return d.get(h, [])
+    #@+node:ekr.20261019094512.2: *4* v._renameInUnlIndex
+    def _renameInUnlIndex(self, old):
+        """Update the c.unlIndex entries of v's parents after v's headline changed."""
+        v = self
+        index = v.context.unlIndex
+        new = v._headString
+        if old == new:
+            return
+        for parent in dict.fromkeys(v.parents):
+            entry = index.get(parent)
+            if not entry:
+                continue
+            children, n_children, d = entry
+            old_list = d.get(old, [])
+            moved = [n for n in old_list if n < len(children) and children[n] is v]
+            if children is not parent.children or n_children != len(children) or not moved:
+                index.pop(parent, None)
+                continue
+            rest = [n for n in old_list if n not in moved]
+            if rest:
+                d[old] = rest
+            else:
+                del d[old]
+            new_list = d.setdefault(new, [])
+            for n in moved:
+                bisect.insort(new_list, n)
     #@+node:ekr.20130524063409.10700: *3* v.Inserting & cloning
     def cloneAsNthChild(self, parent_v, n):
         # Does not check for illegal clones!
@@ -2470,6 +2551,12 @@ class VNode:
         """Adjust links after adding a link to v."""
         v = self
         v.context.frame.tree.generation += 1
+        if v.context.childIndexCache is not None:
+            v.context.childIndexCache.pop(parent_v, None)
+        if v.context.unlIndex is not None:
+            v.context.unlIndex.pop(parent_v, None)
+        if v.context.outlineChanges is not None:
+            v.context.outlineChanges.add(v)
         parent_v.childrenModified()
             # For a plugin.
         # Update parent_v.children & v.parents.
@@ -2483,6 +2570,12 @@ class VNode:
         """Adjust links after adding a link to v."""
         v = self
         v.context.frame.tree.generation += 1
+        if v.context.childIndexCache is not None:
+            v.context.childIndexCache.pop(parent_v, None)
+        if v.context.unlIndex is not None:
+            v.context.unlIndex.pop(parent_v, None)
+        if v.context.outlineChanges is not None:
+            v.context.outlineChanges.add(v)
         parent_v.childrenModified()
             # For a plugin.
         # Update parent_v.children & v.parents.
@@ -2510,6 +2603,12 @@ class VNode:
         """Adjust links after cutting a link to v."""
         v = self
         v.context.frame.tree.generation += 1
+        if v.context.childIndexCache is not None:
+            v.context.childIndexCache.pop(parent_v, None)
+        if v.context.unlIndex is not None:
+            v.context.unlIndex.pop(parent_v, None)
+        if v.context.outlineChanges is not None:
+            v.context.outlineChanges.add(v)
         parent_v.childrenModified()
         assert parent_v.children[childIndex] == v
         del parent_v.children[childIndex]
@@ -318,6 +318,8 @@ class LeoPluginsController:
                     return None
         # Calls to registerHandler from inside the handler belong to moduleName.
         self.loadingModuleNameStack.append(moduleName)
+        perf = g.app.perfStats
+        t = perf and perf.start()
         try:
             result = handler(tag, keywords)
         except Exception:
@@ -325,6 +327,8 @@ class LeoPluginsController:
             g.es_exception()
             result = None
         self.loadingModuleNameStack.pop()
+        if perf:
+            perf.stop(t, 'idle' if tag == 'idle' else 'hook', f"{moduleName}: {tag}")
         return result
     #@+node:ekr.20100908125007.6018: *4* plugins.doPlugins (g.app.hookFunction)
     def doPlugins(self, tag, keywords):
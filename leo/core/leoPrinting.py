@@ -129,7 +129,7 @@ class PrintingController:
     @cmd('preview-marked-bodies')
     def preview_marked_bodies(self, event=None):
         """Preview the bodies of the marked nodes."""
-        nodes = [p.v for p in self.c.all_positions() if p.isMarked()]
+        nodes = [v for v in self.c.all_nodes() if v.isMarked()]
         doc = self.complex_document(nodes)
         self.preview_doc(doc)
     #@+node:ekr.20150420081906.1: *4* pr.preview_marked_html
@@ -139,7 +139,7 @@ class PrintingController:
         Preview the concatenated bodies of the marked nodes. The concatenated
         bodies must be valid html, including <html> and <body> elements.
         """
-        nodes = [p.v for p in self.c.all_positions() if p.isMarked()]
+        nodes = [v for v in self.c.all_nodes() if v.isMarked()]
         s = '\n'.join([z.b for z in nodes])
         doc = self.html_document(s)
         self.preview_doc(doc)
@@ -147,7 +147,7 @@ class PrintingController:
     @cmd('preview-marked-nodes')
     def preview_marked_nodes(self, event=None):
         """Preview the marked nodes."""
-        nodes = [p.v for p in self.c.all_positions() if p.isMarked()]
+        nodes = [v for v in self.c.all_nodes() if v.isMarked()]
         doc = self.complex_document(nodes, heads=True)
         self.preview_doc(doc)
     #@+node:ekr.20150419124739.23: *4* pr.preview_node
@@ -214,7 +214,7 @@ class PrintingController:
     @cmd('print-marked-bodies')
     def print_marked_bodies(self, event=None):
         """Print the body text of marked nodes."""
-        nodes = [p.v for p in self.c.all_positions() if p.isMarked()]
+        nodes = [v for v in self.c.all_nodes() if v.isMarked()]
         doc = self.complex_document(nodes)
         self.print_doc(doc)
     #@+node:ekr.20150420085054.1: *4* pr.print_marked_html
@@ -224,7 +224,7 @@ class PrintingController:
         Print the concatenated bodies of the marked nodes. The concatenated
         bodies must be valid html, including <html> and <body> elements.
         """
-        nodes = [p.v for p in self.c.all_positions() if p.isMarked()]
+        nodes = [v for v in self.c.all_nodes() if v.isMarked()]
         s = '\n'.join([z.b for z in nodes])
         doc = self.html_document(s)
         self.print_doc(doc)
@@ -232,7 +232,7 @@ class PrintingController:
     @cmd('print-marked-nodes')
     def print_marked_nodes(self, event=None):
         """Print all the marked nodes"""
-        nodes = [p.v for p in self.c.all_positions() if p.isMarked()]
+        nodes = [v for v in self.c.all_nodes() if v.isMarked()]
         doc = self.complex_document(nodes, heads=True)
         self.print_doc(doc)
     #@+node:ekr.20150419124739.22: *4* pr.print_node
@@ -0,0 +1,644 @@
+#@+leo-ver=5-thin
+#@+node:ekr.20261018211514.1: * @file leoServer.py
+"""
+An asyncio JSON-RPC server giving many clients concurrent access to Leo outlines.
+
+Usage: python -m leo.core.leoServer [--host HOST] [--port PORT]
+
+Clients connect with TCP and send JSON-RPC 2.0 requests, one per line.
+The server sends responses and notifications the same way.
+
+Requests (all params are passed by name):
+
+- open(path=None): open (or share) an outline. Returns its outline id.
+- close(outline, force=False): release an outline.
+- outlines(): describe all open outlines.
+- get_subtree(outline, gnx=None, offset=0, limit=100, bodies=True):
+  return one page of the subtree rooted at gnx, in outline order.
+- set_body(outline, gnx, body, version=None): change a body.
+- search(outline, pattern, regex=False, ignore_case=False,
+         headlines=True, bodies=True, offset=0, limit=100)
+- save(outline, path=None)
+
+Each outline has a version number that set_body increments. Clients that
+have opened an outline receive "delta" notifications describing each
+change instead of re-reading the outline.
+
+Requests on the same outline may read concurrently. Requests that change
+an outline wait until all reads of that outline complete.
+
+**Important**: Leo's core does not use this module in any way.
+"""
+import asyncio
+import contextlib
+import inspect
+import itertools
+import json
+import optparse
+import re
+from concurrent.futures import ThreadPoolExecutor
+import leo.core.leoBridge as leoBridge
+# Do not define g here.  Use the g returned by the bridge.
+# JSON-RPC error codes.
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+SERVER_ERROR = -32000
+NOT_FOUND = -32001
+CONFLICT = -32002
+LINE_LIMIT = 2 ** 26
+    # The longest allowed request or response, in bytes.
+param_types = {
+    'body': str,
+    'bodies': bool,
+    'force': bool,
+    'gnx': (str, type(None)),
+    'headlines': bool,
+    'ignore_case': bool,
+    'limit': int,
+    'offset': int,
+    'outline': str,
+    'path': (str, type(None)),
+    'pattern': str,
+    'regex': bool,
+    'version': (int, type(None)),
+}
+    # Keys are param names, values are the allowed types.
+#@+others
+#@+node:ekr.20261018211514.2: ** class LeoServer
+class LeoServer:
+    """An asyncio JSON-RPC server for Leo outlines."""
+    #@+others
+    #@+node:ekr.20261018211514.3: *3* server.ctor
+    def __init__(self, bridge, host='127.0.0.1', port=0):
+        self.bridge = bridge
+        self.g = bridge.globals()
+        self.host = host
+        self.port = port
+        self.chunk = 1000
+            # Long reads yield to the event loop after this many nodes.
+        self.executor = ThreadPoolExecutor(max_workers=1)
+            # Opens, saves and closes run in this thread, one at a time.
+        self.ids = itertools.count(1)
+        self.max_limit = 10000
+        self.open_lock = asyncio.Lock()
+        self.outlines = {}
+            # Keys are outline ids, values are Outlines.
+        self.paths = {}
+            # Keys are full paths, values are Outlines.
+        self.server = None
+        self.sessions = {}
+            # Keys are Sessions, values are the tasks running handle_client.
+        self.methods = {
+            'close': self.close,
+            'get_subtree': self.get_subtree,
+            'open': self.open,
+            'outlines': self.list_outlines,
+            'save': self.save,
+            'search': self.search,
+            'set_body': self.set_body,
+        }
+    #@+node:ekr.20261018211514.4: *3* server.serve, start & stop
+    async def serve(self):
+        """Serve requests until cancelled."""
+        await self.start()
+        print(f"leoServer listening on {self.host}:{self.port}", flush=True)
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def start(self):
+        """Start listening. Set self.port to the actual port."""
+        self.server = await asyncio.start_server(
+            self.handle_client, self.host, self.port, limit=LINE_LIMIT)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Stop listening, close all connections and wait for their handlers."""
+        self.server.close()
+        for session in self.sessions:
+            session.writer.close()
+        await asyncio.gather(*self.sessions.values(), return_exceptions=True)
+        await self.server.wait_closed()
+        self.executor.shutdown()
+    #@+node:ekr.20261018211514.5: *3* server.handle_client
+    async def handle_client(self, reader, writer):
+        """Serve one client connection."""
+        session = Session(writer)
+        self.sessions[session] = asyncio.current_task()
+        write_task = asyncio.ensure_future(session.write_loop())
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    # Each request runs in its own task, so reads run concurrently.
+                    task = asyncio.ensure_future(self.dispatch(session, line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+        except (ConnectionError, ValueError):
+            pass  # A reset connection or a line longer than LINE_LIMIT.
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            for outline in list(session.outlines):
+                outline.sessions.discard(session)
+                session.outlines.discard(outline)
+                await self.release(outline, force=False)
+            session.send(None)
+            await write_task
+            writer.close()
+            del self.sessions[session]
+    #@+node:ekr.20261018211514.6: *3* server.dispatch & helpers
+    async def dispatch(self, session, line):
+        """Handle a single JSON-RPC request."""
+        g = self.g
+        try:
+            request = json.loads(line)
+        except ValueError:
+            session.send(error_response(None, PARSE_ERROR, 'Parse error'))
+            return
+        if (
+            not isinstance(request, dict) or
+            request.get('jsonrpc') != '2.0' or
+            not isinstance(request.get('method'), str) or
+            not isinstance(request.get('params', {}), dict)
+        ):
+            session.send(error_response(None, INVALID_REQUEST, 'Invalid Request'))
+            return
+        rid = request.get('id')
+        try:
+            method = request.get('method')
+            handler = self.methods.get(method)
+            if not handler:
+                raise RpcError(METHOD_NOT_FOUND, f"Method not found: {method}")
+            params = request.get('params', {})
+            self.check_params(handler, params)
+            result = await handler(session, **params)
+            response = {'jsonrpc': '2.0', 'id': rid, 'result': result}
+        except RpcError as e:
+            response = error_response(rid, e.code, e.message, e.data)
+        except Exception as e:
+            g.es_exception()
+            response = error_response(rid, INTERNAL_ERROR, f"{e.__class__.__name__}: {e}")
+        if 'id' in request:
+            session.send(response)
+    #@+node:ekr.20261018211514.7: *4* server.check_params
+    def check_params(self, handler, params):
+        """Raise RpcError unless params match the handler's signature and param_types."""
+        for name, value in params.items():
+            types = param_types.get(name)
+            if not types:
+                continue  # The signature check below rejects unknown names.
+            if not isinstance(types, tuple):
+                types = (types,)
+            if (
+                not isinstance(value, types) or
+                # Python's bools are ints.
+                isinstance(value, bool) and bool not in types
+            ):
+                raise RpcError(INVALID_PARAMS, f"Invalid params: bad type for {name}")
+        try:
+            inspect.signature(handler).bind(None, **params)  # None stands for the session.
+        except TypeError as e:
+            raise RpcError(INVALID_PARAMS, f"Invalid params: {e}")
+    #@+node:ekr.20261018211514.8: *4* server.check_page
+    def check_page(self, offset, limit):
+        if offset < 0 or not 0 < limit <= self.max_limit:
+            raise RpcError(INVALID_PARAMS,
+                f"Invalid params: need offset >= 0 and 0 < limit <= {self.max_limit}")
+    #@+node:ekr.20261018211514.9: *4* server.find_outline & find_vnode
+    def find_outline(self, session, outline_id):
+        """Return the Outline with the given id, opened by session."""
+        outline = self.outlines.get(outline_id)
+        if not outline or session not in outline.sessions:
+            raise RpcError(NOT_FOUND, f"outline not open: {outline_id}")
+        return outline
+
+    def find_vnode(self, outline, gnx):
+        """Return the vnode with the given gnx, or the hidden root if gnx is None."""
+        c = outline.c
+        if gnx is None:
+            return c.hiddenRootNode
+        v = c.fileCommands.gnxDict.get(gnx)
+        if not v:
+            raise RpcError(NOT_FOUND, f"gnx not found: {gnx}")
+        return v
+    #@+node:ekr.20261018211514.10: *4* server.node_dict
+    def node_dict(self, v, level, bodies):
+        d = {
+            'gnx': v.gnx,
+            'h': v.h,
+            'level': level,
+            'children': [z.gnx for z in v.children],
+        }
+        if bodies:
+            d['b'] = v.b
+        return d
+    #@+node:ekr.20261018211514.11: *4* server.close_commander & save_commander
+    # These run in the executor's thread.
+
+    def close_commander(self, c):
+        """Close c, discarding unsaved changes."""
+        c.clearChanged()
+        self.g.app.closeLeoWindow(c.frame, finish_quit=False)
+
+    def save_commander(self, c, fileName):
+        c.mFileName = fileName
+        return c.fileCommands.save(fileName, silent=True)
+    #@+node:ekr.20261018211514.12: *4* server.run
+    async def run(self, func, *args):
+        """Run func(*args) in the executor's thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+    #@+node:ekr.20261018211514.13: *3* server.broadcast
+    def broadcast(self, outline, delta):
+        """Send a delta notification to all sessions that have opened the outline."""
+        delta['outline'] = outline.id
+        delta['version'] = outline.version
+        message = {'jsonrpc': '2.0', 'method': 'delta', 'params': delta}
+        for session in outline.sessions:
+            session.send(message)
+    #@+node:ekr.20261018211514.14: *3* server.release
+    async def release(self, outline, force):
+        """
+        Close the outline if no session has it open.
+
+        Keep changed outlines open unless force is True.
+        Return True if the outline was closed.
+        """
+        async with self.open_lock:
+            if outline.sessions or outline.id not in self.outlines:
+                return False
+            if outline.c.changed and not force:
+                return False
+            async with outline.lock.write():
+                await self.run(self.close_commander, outline.c)
+            del self.outlines[outline.id]
+            if self.paths.get(outline.path) is outline:
+                del self.paths[outline.path]
+            return True
+    #@+node:ekr.20261018211514.15: *3* server.Requests
+    #@+node:ekr.20261018211514.16: *4* server.close
+    async def close(self, session, outline, force=False):
+        """
+        Release the outline. The outline remains open while other sessions
+        use it, and while it has unsaved changes unless force is True.
+        """
+        o = self.find_outline(session, outline)
+        o.sessions.discard(session)
+        session.outlines.discard(o)
+        closed = await self.release(o, force)
+        return {'closed': closed}
+    #@+node:ekr.20261018211514.17: *4* server.get_subtree
+    async def get_subtree(self, session, outline, gnx=None, offset=0, limit=100, bodies=True):
+        """
+        Return one page of the subtree rooted at gnx, in outline order.
+
+        With gnx None, return the entire outline, excluding the hidden root.
+        With bodies False, omit the body text.
+        'next' is the offset of the next page, or None.
+        """
+        self.check_page(offset, limit)
+        o = self.find_outline(session, outline)
+        async with o.lock.read():
+            root = self.find_vnode(o, gnx)
+            nodes, next_offset = [], None
+            for n, (v, level) in enumerate(subtree_nodes(root, gnx is not None)):
+                if n >= offset + limit:
+                    next_offset = n
+                    break
+                if n >= offset:
+                    nodes.append(self.node_dict(v, level, bodies))
+                elif n % self.chunk == 0:
+                    await asyncio.sleep(0)
+            return {'version': o.version, 'nodes': nodes, 'next': next_offset}
+    #@+node:ekr.20261018211514.18: *4* server.list_outlines
+    async def list_outlines(self, session):
+        """Describe all open outlines."""
+        return [
+            {
+                'outline': o.id,
+                'path': o.path,
+                'changed': o.c.changed,
+                'version': o.version,
+                'sessions': len(o.sessions),
+            } for o in self.outlines.values()
+        ]
+    #@+node:ekr.20261018211514.19: *4* server.open
+    async def open(self, session, path=None):
+        """
+        Open the .leo file at the given path, or a new outline if path is None.
+
+        Sessions opening the same path share a single commander.
+        """
+        async with self.open_lock:
+            fileName = self.bridge.completeFileName(path or '')
+            o = self.paths.get(fileName) if fileName else None
+            if not o:
+                c = await self.run(self.bridge.openLeoFile, fileName)
+                if not c:
+                    raise RpcError(SERVER_ERROR, f"can not open {path}")
+                o = Outline(str(next(self.ids)), c)
+                self.outlines[o.id] = o
+                if o.path:
+                    self.paths[o.path] = o
+            o.sessions.add(session)
+            session.outlines.add(o)
+        return {
+            'outline': o.id,
+            'path': o.path,
+            'changed': o.c.changed,
+            'version': o.version,
+            'gnx': o.c.hiddenRootNode.gnx,
+            'children': [z.gnx for z in o.c.hiddenRootNode.children],
+        }
+    #@+node:ekr.20261018211514.20: *4* server.save
+    async def save(self, session, outline, path=None):
+        """Save the outline to its file, or to path if given."""
+        o = self.find_outline(session, outline)
+        fileName = self.bridge.completeFileName(path) if path else o.path
+        if not fileName:
+            raise RpcError(SERVER_ERROR, 'an untitled outline needs a path')
+        other = self.paths.get(fileName)
+        if other and other is not o:
+            raise RpcError(CONFLICT, f"another outline is open at {fileName}")
+        async with o.lock.write():
+            ok = await self.run(self.save_commander, o.c, fileName)
+            if not ok:
+                raise RpcError(SERVER_ERROR, f"can not save {fileName}")
+            if fileName != o.path:
+                if self.paths.get(o.path) is o:
+                    del self.paths[o.path]
+                o.path = fileName
+                self.paths[fileName] = o
+            self.broadcast(o, {'kind': 'saved', 'path': fileName})
+            return {'version': o.version, 'path': fileName}
+    #@+node:ekr.20261018211514.21: *4* server.search
+    async def search(self, session, outline, pattern,
+        regex=False, ignore_case=False, headlines=True, bodies=True,
+        offset=0, limit=100,
+    ):
+        """
+        Return one page of the nodes matching pattern, in outline order.
+
+        Clones match only once. 'next' is the offset of the next page, or None.
+        """
+        self.check_page(offset, limit)
+        o = self.find_outline(session, outline)
+        flags = re.IGNORECASE if ignore_case else 0
+        try:
+            pat = re.compile(pattern if regex else re.escape(pattern), flags)
+        except re.error as e:
+            raise RpcError(INVALID_PARAMS, f"Invalid params: bad pattern: {e}")
+        async with o.lock.read():
+            matches, n, next_offset = [], 0, None
+            for i, v in enumerate(o.c.all_unique_nodes()):
+                where = []
+                if headlines and pat.search(v.h):
+                    where.append('h')
+                if bodies and pat.search(v.b):
+                    where.append('b')
+                if where:
+                    if n >= offset + limit:
+                        next_offset = n
+                        break
+                    if n >= offset:
+                        matches.append({'gnx': v.gnx, 'h': v.h, 'where': where})
+                    n += 1
+                if i % self.chunk == 0:
+                    await asyncio.sleep(0)
+            return {'version': o.version, 'matches': matches, 'next': next_offset}
+    #@+node:ekr.20261018211514.22: *4* server.set_body
+    async def set_body(self, session, outline, gnx, body, version=None):
+        """
+        Set the body of the node with the given gnx.
+
+        If version is given, fail unless it is the outline's current version.
+        """
+        o = self.find_outline(session, outline)
+        async with o.lock.write():
+            if version is not None and version != o.version:
+                raise RpcError(CONFLICT,
+                    f"version conflict: outline version is {o.version}",
+                    {'version': o.version})
+            v = self.find_vnode(o, gnx)
+            if v is o.c.hiddenRootNode:
+                raise RpcError(INVALID_PARAMS, 'Invalid params: gnx is required')
+            changed = body != v.b
+            if changed:
+                v.b = body
+                v.setDirty()
+                v.setAllAncestorAtFileNodesDirty()
+                o.c.setChanged()
+                o.version += 1
+                self.broadcast(o, {'kind': 'body', 'gnx': gnx, 'b': body})
+            return {'version': o.version, 'changed': changed}
+    #@-others
+#@+node:ekr.20261018211514.23: ** class LeoClient
+class LeoClient:
+    """
+    A minimal asyncio client for LeoServer.
+
+    on_delta: an optional function called with the params of each delta.
+    """
+    #@+others
+    #@+node:ekr.20261018211514.24: *3* client.ctor
+    def __init__(self, on_delta=None):
+        self.futures = {}
+            # Keys are request ids, values are futures.
+        self.ids = itertools.count(1)
+        self.on_delta = on_delta
+        self.read_task = None
+        self.reader = self.writer = None
+    #@+node:ekr.20261018211514.25: *3* client.call
+    async def call(self, method, **params):
+        """Send a request and return its result. Raise RpcError on errors."""
+        rid = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.futures[rid] = future
+        request = {'jsonrpc': '2.0', 'id': rid, 'method': method, 'params': params}
+        self.writer.write(json.dumps(request).encode('utf-8') + b'\n')
+        await self.writer.drain()
+        return await future
+    #@+node:ekr.20261018211514.26: *3* client.connect & close
+    async def connect(self, host, port):
+        self.reader, self.writer = await asyncio.open_connection(
+            host, port, limit=LINE_LIMIT)
+        self.read_task = asyncio.ensure_future(self.read_loop())
+
+    async def close(self):
+        self.writer.close()
+        await self.read_task
+    #@+node:ekr.20261018211514.27: *3* client.read_loop
+    async def read_loop(self):
+        """Resolve the futures for responses and handle notifications."""
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if 'id' in message:
+                    future = self.futures.pop(message.get('id'), None)
+                    if not future or future.done():
+                        pass
+                    elif 'error' in message:
+                        future.set_exception(RpcError(**message.get('error')))
+                    else:
+                        future.set_result(message.get('result'))
+                elif message.get('method') == 'delta' and self.on_delta:
+                    self.on_delta(message.get('params'))
+        except ConnectionError:
+            pass
+        for future in self.futures.values():
+            if not future.done():
+                future.set_exception(ConnectionError('connection closed'))
+        self.futures = {}
+    #@-others
+#@+node:ekr.20261018211514.28: ** class Outline
+class Outline:
+    """An outline opened by one or more sessions."""
+
+    def __init__(self, outline_id, c):
+        self.c = c
+        self.id = outline_id
+        self.lock = ReadWriteLock()
+        self.path = c.mFileName
+        self.sessions = set()
+        self.version = 0
+#@+node:ekr.20261018211514.29: ** class ReadWriteLock
+class ReadWriteLock:
+    """
+    An asyncio lock held by any number of readers or by one writer.
+
+    Waiting writers block new readers, so writers do not starve.
+    """
+    #@+others
+    #@+node:ekr.20261018211514.30: *3* rwlock.ctor
+    def __init__(self):
+        self.condition = asyncio.Condition()
+        self.readers = 0
+        self.waiting_writers = 0
+        self.writer = False
+    #@+node:ekr.20261018211514.31: *3* rwlock.read & write
+    @contextlib.asynccontextmanager
+    async def read(self):
+        async with self.condition:
+            await self.condition.wait_for(
+                lambda: not self.writer and not self.waiting_writers)
+            self.readers += 1
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.readers -= 1
+                self.condition.notify_all()
+
+    @contextlib.asynccontextmanager
+    async def write(self):
+        async with self.condition:
+            self.waiting_writers += 1
+            try:
+                await self.condition.wait_for(
+                    lambda: not self.writer and not self.readers)
+            finally:
+                self.waiting_writers -= 1
+            self.writer = True
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.writer = False
+                self.condition.notify_all()
+    #@-others
+#@+node:ekr.20261018211514.32: ** class RpcError
+class RpcError(Exception):
+    """A JSON-RPC error."""
+
+    def __init__(self, code, message, data=None):
+        super().__init__(message)
+        self.code = code
+        self.data = data
+        self.message = message
+#@+node:ekr.20261018211514.33: ** class Session
+class Session:
+    """One client connection."""
+
+    def __init__(self, writer):
+        self.outlines = set()
+        self.queue = asyncio.Queue()
+        self.writer = writer
+
+    def send(self, message):
+        """Queue a message. None ends the write loop."""
+        self.queue.put_nowait(message)
+
+    async def write_loop(self):
+        """Write queued messages in order, one per line."""
+        while True:
+            message = await self.queue.get()
+            if message is None:
+                break
+            try:
+                self.writer.write(json.dumps(message).encode('utf-8') + b'\n')
+                await self.writer.drain()
+            except ConnectionError:
+                pass  # Discard messages to a closed connection.
+#@+node:ekr.20261018211514.34: ** functions
+#@+node:ekr.20261018211514.35: *3* function: error_response
+def error_response(rid, code, message, data=None):
+    error = {'code': code, 'message': message}
+    if data is not None:
+        error['data'] = data
+    return {'jsonrpc': '2.0', 'id': rid, 'error': error}
+#@+node:ekr.20261018211514.36: *3* function: subtree_nodes
+def subtree_nodes(root, include_root):
+    """Yield (v, level) for the vnodes of root's subtree, in outline order."""
+    if include_root:
+        stack = [(root, 0)]
+    else:
+        stack = [(z, 0) for z in reversed(root.children)]
+    while stack:
+        v, level = stack.pop()
+        yield v, level
+        stack.extend((z, level + 1) for z in reversed(v.children))
+#@+node:ekr.20261018211514.37: ** main & helpers
+def main():
+    """The main line of leoServer.py."""
+    options = scanOptions()
+    bridge = leoBridge.controller(
+        gui='nullGui',
+        loadPlugins=False,
+        readSettings=True,
+        silent=True,
+        verbose=False,
+    )
+    g = bridge.globals()
+    g.app.loadManager.createAllImporterData()
+        # The bridge does not do this. @auto nodes need importers.
+    server = LeoServer(bridge, options.host, options.port)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+#@+node:ekr.20261018211514.38: *3* scanOptions
+def scanOptions():
+    """Handle all options."""
+    parser = optparse.OptionParser(usage='python -m leo.core.leoServer [options]')
+    add = parser.add_option
+    add('--host', dest='host', default='127.0.0.1',
+        help='the interface to listen on')
+    add('--port', dest='port', type='int', default=8370,
+        help='the port to listen on. 0 picks an unused port')
+    options, args = parser.parse_args()
+    return options
+#@-others
+if __name__ == '__main__':
+    main()
+#@@language python
+#@@tabwidth -4
+#@-leo
@@ -0,0 +1,204 @@
+#@+leo-ver=5-thin
+#@+node:ekr.20261018211515.1: * @file leoServerLoadTest.py
+"""
+A load test for leoServer.py.
+
+Usage: python -m leo.core.leoServerLoadTest [options]
+
+By default, this script starts a local leoServer in a separate process,
+writes a synthetic .leo file and runs many concurrent clients against it.
+Use --port to test an already-running local server instead.
+
+All clients share a single outline. Each client sends a random mix of
+get_subtree, search, set_body and save requests. The script reports the
+latency of each kind of request and checks that every client received a
+delta for every changed body.
+
+**Important**: Leo's core does not use this module in any way.
+"""
+import asyncio
+import optparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from xml.sax.saxutils import escape, quoteattr
+from leo.core.leoServer import LeoClient
+#@+others
+#@+node:ekr.20261018211515.2: ** main & helpers
+def main():
+    """The main line of leoServerLoadTest.py."""
+    options = scanOptions()
+    with tempfile.TemporaryDirectory() as tempdir:
+        path = os.path.join(tempdir, 'load_test.leo')
+        gnxs = write_outline(path, options.nodes)
+        proc = None
+        try:
+            if options.port:
+                port = options.port
+            else:
+                proc, port = start_server(tempdir)
+            ok = asyncio.run(run_load(options, port, path, gnxs))
+        finally:
+            if proc:
+                proc.terminate()
+                proc.wait()
+    sys.exit(0 if ok else 1)
+#@+node:ekr.20261018211515.3: *3* scanOptions
+def scanOptions():
+    """Handle all options."""
+    parser = optparse.OptionParser(usage='python -m leo.core.leoServerLoadTest [options]')
+    add = parser.add_option
+    add('--clients', dest='clients', type='int', default=20,
+        help='the number of concurrent clients')
+    add('--host', dest='host', default='127.0.0.1',
+        help='the host of the server given by --port')
+    add('--nodes', dest='nodes', type='int', default=5000,
+        help='the number of nodes in the test outline')
+    add('--port', dest='port', type='int', default=0,
+        help='test the server at this port instead of starting one')
+    add('--requests', dest='requests', type='int', default=200,
+        help='the number of requests sent by each client')
+    add('--seed', dest='seed', type='int', default=1,
+        help='the seed of the random request mix')
+    options, args = parser.parse_args()
+    return options
+#@+node:ekr.20261018211515.4: *3* start_server
+def start_server(home):
+    """Start leoServer in a new process. Return (proc, port)."""
+    leo_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, HOME=home, PYTHONPATH=leo_dir)
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'leo.core.leoServer', '--port', '0'],
+        env=env, stdout=subprocess.PIPE, universal_newlines=True)
+    for line in proc.stdout:
+        if line.startswith('leoServer listening on'):
+            return proc, int(line.rsplit(':', 1)[1])
+    raise RuntimeError('leoServer did not start')
+#@+node:ekr.20261018211515.5: ** write_outline
+def write_outline(path, n):
+    """
+    Write a .leo file containing n nodes, ten children per parent.
+    Return the list of gnxs.
+    """
+    gnxs = [f"loadtest.20200101000000.{i}" for i in range(1, n + 1)]
+    vnodes, tnodes = [], []
+
+    def put_node(i):
+        gnx = gnxs[i]
+        vnodes.append(f"<v t={quoteattr(gnx)}><vh>node {i}</vh>")
+        tnodes.append(f"<t tx={quoteattr(gnx)}>{escape(body_text(i))}</t>")
+        for j in range(10 * i + 1, min(n, 10 * i + 11)):
+            put_node(j)
+        vnodes.append('</v>')
+
+    put_node(0)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        f.write('<leo_file xmlns:leo="http://leoeditor.com/namespaces/'
+            'leo-python-editor/1.1" >\n')
+        f.write('<leo_header file_format="2"/>\n')
+        f.write('<vnodes>\n%s\n</vnodes>\n' % '\n'.join(vnodes))
+        f.write('<tnodes>\n%s\n</tnodes>\n' % '\n'.join(tnodes))
+        f.write('</leo_file>\n')
+    return gnxs
+#@+node:ekr.20261018211515.6: *3* body_text
+words = ['alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta', 'eta', 'theta']
+
+def body_text(i):
+    return '\n'.join(f"line {j}: {words[(i + j) % len(words)]} {i}" for j in range(10))
+#@+node:ekr.20261018211515.7: ** run_load & helpers
+async def run_load(options, port, path, gnxs):
+    """Run all clients. Return True if all clients saw all deltas."""
+    host = options.host
+    deltas = [0] * options.clients
+    clients = []
+    for i in range(options.clients):
+
+        def on_delta(params, i=i):
+            if params.get('kind') == 'body':
+                deltas[i] += 1
+
+        client = LeoClient(on_delta)
+        await client.connect(host, port)
+        clients.append(client)
+    outline_ids = [(await z.call('open', path=path)).get('outline') for z in clients]
+    latencies = {}
+    t1 = time.perf_counter()
+    changes = await asyncio.gather(*(
+        run_client(options, i, clients[i], outline_ids[i], gnxs, latencies)
+            for i in range(options.clients)))
+    t2 = time.perf_counter()
+    # A round trip ensures each client has read all earlier deltas.
+    for client in clients:
+        await client.call('outlines')
+    await clients[0].call('save', outline=outline_ids[0])
+    for client, outline_id in zip(clients, outline_ids):
+        await client.call('close', outline=outline_id)
+        await client.close()
+    report(options, latencies, t2 - t1)
+    expected = sum(changes)
+    ok = all(z == expected for z in deltas)
+    if ok:
+        print(f"deltas: ok. Each client received {expected} body deltas")
+    else:
+        print(f"deltas: FAIL. Expected {expected} per client, got {sorted(set(deltas))}")
+    return ok
+#@+node:ekr.20261018211515.8: *3* run_client
+async def run_client(options, n, client, outline_id, gnxs, latencies):
+    """Send options.requests random requests. Return the number of changed bodies."""
+    rng = random.Random(options.seed * 1000 + n)
+    changes = 0
+    for i in range(options.requests):
+        r = rng.random()
+        if r < 0.5:
+            method = 'get_subtree'
+            params = {
+                'gnx': rng.choice(gnxs[:len(gnxs) // 10 or 1]),
+                'limit': 50,
+            }
+        elif r < 0.7:
+            method = 'search'
+            params = {
+                'pattern': rng.choice(words) + f" {rng.randrange(len(gnxs))}\\b",
+                'regex': True,
+            }
+        elif r < 0.99:
+            method = 'set_body'
+            params = {
+                'gnx': rng.choice(gnxs),
+                'body': f"client {n} request {i}\n",
+            }
+        else:
+            method = 'save'
+            params = {}
+        t1 = time.perf_counter()
+        result = await client.call(method, outline=outline_id, **params)
+        latencies.setdefault(method, []).append(time.perf_counter() - t1)
+        if method == 'set_body' and result.get('changed'):
+            changes += 1
+    return changes
+#@+node:ekr.20261018211515.9: *3* report
+def report(options, latencies, elapsed):
+    n = sum(len(z) for z in latencies.values())
+    print(
+        f"clients: {options.clients} requests: {n} nodes: {options.nodes}\n"
+        f"elapsed: {elapsed:.2f} sec, {n / elapsed:.0f} requests/sec\n")
+    print(f"{'request':12} {'count':>6} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for method in sorted(latencies):
+        aList = sorted(latencies.get(method))
+        mean = sum(aList) / len(aList)
+        p50 = aList[len(aList) // 2]
+        p95 = aList[min(len(aList) - 1, int(len(aList) * 0.95))]
+        print(
+            f"{method:12} {len(aList):6} {mean*1000:8.2f} {p50*1000:8.2f} "
+            f"{p95*1000:8.2f} {aList[-1]*1000:8.2f}")
+    print('')
+#@-others
+if __name__ == '__main__':
+    main()
+#@@language python
+#@@tabwidth -4
+#@-leo
@@ -41,6 +41,9 @@
 # I first saw this model of unlimited undo in the documentation for Apple's Yellow Box classes.
 #@-<< How Leo implements unlimited undo >>
 import leo.core.leoGlobals as g
+import sys
+import unittest
+import zlib
 # pylint: disable=unpacking-non-sequence
 #@+others
 #@+node:ekr.20031218072017.3605: ** class Undoer
@@ -56,6 +59,10 @@ class Undoer:
         self.c = c
         self.granularity = None  # Set in reloadSettings.
         self.max_undo_stack_size = c.config.getInt('max-undo-stack-size') or 0
+        self.max_undo_stack_bytes = c.config.getInt('max-undo-stack-bytes') or 0
+        self.compress_threshold = 1024
+            # Compress the changed lines of body deltas at least this long.
+            # None: never compress.
         # State ivars...
         self.beads = []  # List of undo nodes.
         self.bead = -1  # Index of the present bead: -1:len(beads)
@@ -73,6 +80,7 @@ class Undoer:
         # Set the following ivars to keep pylint happy.
         self.afterTree = None
         self.beforeTree = None
+        self.bodyDelta = None
         self.children = None
         self.deleteMarkedNodesData = None
         self.followingSibs = None
@@ -123,12 +131,102 @@ class Undoer:
         # pylint: disable=no-self-argument
         return g.new_cmd_decorator(name, ['c', 'undoer',])
     #@+node:ekr.20050416092908.1: *3* u.Internal helpers
+    #@+node:ekr.20261018205456.1: *4* u.applyBodyDelta
+    def applyBodyDelta(self, s, delta, old):
+        """
+        Apply a delta created by u.createBodyDelta to s.
+
+        old=True:  s must be the new text. Return the old text.
+        old=False: s must be the old text. Return the new text.
+
+        Return None if s is not the text from which the delta was made.
+        """
+        leading, trailing, old_middle, new_middle, old_hash, new_hash = delta
+        if old:
+            middle, s_hash, result_hash = old_middle, new_hash, old_hash
+        else:
+            middle, s_hash, result_hash = new_middle, old_hash, new_hash
+        if hash(s) != s_hash:
+            return None
+        lines = s.split('\n')
+        if middle is None:
+            middle_lines = []
+        elif isinstance(middle, bytes):
+            middle_lines = zlib.decompress(middle).decode('utf-8').split('\n')
+        else:
+            middle_lines = middle.split('\n')
+        result = '\n'.join(lines[:leading] + middle_lines + lines[len(lines) - trailing :])
+        return result if hash(result) == result_hash else None
     #@+node:ekr.20031218072017.3607: *4* u.clearOptionalIvars
     def clearOptionalIvars(self):
         u = self
         u.p = None  # The position/node being operated upon for undo and redo.
         for ivar in u.optionalIvars:
             setattr(u, ivar, None)
+    #@+node:ekr.20261018205456.2: *4* u.computeLineDelta
+    def computeLineDelta(self, oldText, newText):
+        """
+        Compare the lines of oldText and newText.
+
+        Return (leading, trailing, old_middle_lines, new_middle_lines), where
+        leading and trailing are the number of matching leading & trailing
+        lines. The number of old and new middle lines may be different.
+        """
+        old_lines = oldText.split('\n')
+        new_lines = newText.split('\n')
+        new_len = len(new_lines)
+        old_len = len(old_lines)
+        min_len = min(old_len, new_len)
+        i = 0
+        while i < min_len:
+            if old_lines[i] != new_lines[i]:
+                break
+            i += 1
+        leading = i
+        if leading == new_len:
+            # This happens when we remove lines from the end.
+            # The new text is simply the leading lines from the old text.
+            trailing = 0
+        else:
+            i = 0
+            while i < min_len - leading:
+                if old_lines[old_len - i - 1] != new_lines[new_len - i - 1]:
+                    break
+                i += 1
+            trailing = i
+        # NB: the number of old and new middle lines may be different.
+        if trailing == 0:
+            old_middle_lines = old_lines[leading:]
+            new_middle_lines = new_lines[leading:]
+        else:
+            old_middle_lines = old_lines[leading : -trailing]
+            new_middle_lines = new_lines[leading : -trailing]
+        return leading, trailing, old_middle_lines, new_middle_lines
+    #@+node:ekr.20261018205456.3: *4* u.createBodyDelta
+    def createBodyDelta(self, oldText, newText):
+        """
+        Return a delta from which u.applyBodyDelta can recreate oldText from
+        newText, and newText from oldText.
+
+        The delta contains only the changed lines, compressed if they are
+        long, so undo beads need not keep full copies of both texts.
+        """
+        u = self
+        leading, trailing, old_middle_lines, new_middle_lines = u.computeLineDelta(oldText, newText)
+
+        def pack(lines):
+            if not lines:
+                return None
+            s = '\n'.join(lines)
+            if u.compress_threshold is not None and len(s) >= u.compress_threshold:
+                return zlib.compress(s.encode('utf-8'), 1)
+            return s
+
+        return (
+            leading, trailing,
+            pack(old_middle_lines), pack(new_middle_lines),
+            hash(oldText), hash(newText),
+        )
     #@+node:ekr.20060127052111.1: *4* u.cutStack
     def cutStack(self):
         u = self; n = u.max_undo_stack_size
@@ -144,6 +242,27 @@ class Undoer:
                 # g.trace('Cutting undo stack to %d entries' % (n))
             u.beads = u.beads[-n :]
             u.bead = n - 1
+        if u.max_undo_stack_bytes > 0 and not g.app.unitTesting:
+            u.cutStackToBudget()
+    #@+node:ekr.20261018205456.4: *4* u.cutStackToBudget
+    def cutStackToBudget(self):
+        """
+        Remove the oldest beads until the undo stack uses at most
+        u.max_undo_stack_bytes bytes. Never remove the present bead.
+        """
+        u = self
+        # Do nothing if we are in the middle of creating a group.
+        for bunch in u.beads:
+            if hasattr(bunch, 'kind') and bunch.kind == 'beforeGroup':
+                return
+        sizes = [u.getBeadSize(bunch) for bunch in u.beads]
+        total, n = sum(sizes), 0
+        while total > u.max_undo_stack_bytes and n < u.bead:
+            total -= sizes[n]
+            n += 1
+        if n:
+            u.beads = u.beads[n:]
+            u.bead -= n
     #@+node:ekr.20080623083646.10: *4* u.dumpBead
     def dumpBead(self, n):
         u = self
@@ -172,6 +291,53 @@ class Undoer:
         bunch = u.beads[n]
         self.setIvarsFromBunch(bunch)
         return bunch
+    #@+node:ekr.20261018205456.7: *4* u.getBodyFromDelta
+    def getBodyFromDelta(self, old):
+        """
+        Return the old (old=True) or new body text of u.p using u.bodyDelta.
+
+        Return u.p.b, with an error, if the body has changed in a way the
+        undoer does not know about.
+        """
+        u = self
+        s = u.applyBodyDelta(u.p.b, u.bodyDelta, old=old)
+        if s is None:
+            g.error(f"can not {'undo' if old else 'redo'}: body text changed: {u.p.h}")
+            s = u.p.b
+        return s
+    #@+node:ekr.20261018205456.5: *4* u.getBeadSize & helper
+    def getBeadSize(self, bunch):
+        """
+        Return the approximate number of bytes used by the strings in a bead.
+
+        Cache the size in the bead unless it is the present bead, which
+        typing and change groups may still extend.
+        """
+        u = self
+        size = bunch.get('undoBytes')
+        if size is None:
+            size = u.getSize(bunch, set())
+            if u.bead < 0 or bunch is not u.beads[u.bead]:
+                bunch.undoBytes = size
+        return size
+    #@+node:ekr.20261018205456.6: *5* u.getSize
+    def getSize(self, obj, seen):
+        """
+        Return the number of bytes used by the strings in obj,
+        counting each string once.
+        """
+        if isinstance(obj, (str, bytes)):
+            if id(obj) in seen:
+                return 0
+            seen.add(id(obj))
+            return sys.getsizeof(obj)
+        if isinstance(obj, g.Bunch):
+            obj = obj.__dict__
+        if isinstance(obj, dict):
+            obj = obj.values()
+        elif not isinstance(obj, (list, tuple)):
+            return 0  # Vnodes and positions belong to the outline.
+        return sum(self.getSize(z, seen) for z in obj)
     #@+node:EKR.20040526150818.1: *4* u.peekBead
     def peekBead(self, n):
 
@@ -466,7 +632,9 @@ class Undoer:
         bunch.undoHelper = u.undoNodeContents
         bunch.redoHelper = u.redoNodeContents
         bunch.inHead = inHead  # 2013/08/26
-        bunch.newBody = p.b
+        # Keep only the changed lines of large bodies.
+        bunch.bodyDelta = u.createBodyDelta(bunch.oldBody, p.b)
+        bunch.oldBody = bunch.newBody = None
         bunch.newHead = p.h
         bunch.newMarked = p.isMarked()
         # Bug fix 2017/11/12: don't use ternary operator.
@@ -902,35 +1070,7 @@ class Undoer:
         # the number of leading and trailing lines that match, and save both the old and
         # new middle lines. NB: the number of old and new middle lines may be different.
         #@@c
-        old_lines = oldText.split('\n')
-        new_lines = newText.split('\n')
-        new_len = len(new_lines)
-        old_len = len(old_lines)
-        min_len = min(old_len, new_len)
-        i = 0
-        while i < min_len:
-            if old_lines[i] != new_lines[i]:
-                break
-            i += 1
-        leading = i
-        if leading == new_len:
-            # This happens when we remove lines from the end.
-            # The new text is simply the leading lines from the old text.
-            trailing = 0
-        else:
-            i = 0
-            while i < min_len - leading:
-                if old_lines[old_len - i - 1] != new_lines[new_len - i - 1]:
-                    break
-                i += 1
-            trailing = i
-        # NB: the number of old and new middle lines may be different.
-        if trailing == 0:
-            old_middle_lines = old_lines[leading:]
-            new_middle_lines = new_lines[leading:]
-        else:
-            old_middle_lines = old_lines[leading : -trailing]
-            new_middle_lines = new_lines[leading : -trailing]
+        leading, trailing, old_middle_lines, new_middle_lines = u.computeLineDelta(oldText, newText)
         # Remember how many trailing newlines in the old and new text.
         i = len(oldText) - 1; old_newlines = 0
         while i >= 0 and oldText[i] == '\n':
@@ -1277,6 +1417,8 @@ class Undoer:
         if c.p != u.p:  # #1333.
             c.selectPosition(u.p)
         u.p.setDirty()
+        if u.bodyDelta is not None:
+            u.newBody = u.getBodyFromDelta(old=False)
         # Restore the body.
         u.p.setBodyString(u.newBody)
         w.setAllText(u.newBody)
@@ -1353,6 +1495,23 @@ class Undoer:
         if u.yview:
             c.bodyWantsFocus()
             w.setYScrollPosition(u.yview)
+    #@+node:ekr.20261018205456.8: *3* u.showUndoMemory
+    @cmd('show-undo-memory')
+    def showUndoMemory(self, event=None):
+        """Report the approximate memory used by the undo stack."""
+        u = self
+        sizes = {}  # Keys are undo types, values are [count, size].
+        for bunch in u.beads:
+            data = sizes.setdefault(bunch.get('undoType', '<unknown>'), [0, 0])
+            data[0] += 1
+            data[1] += u.getBeadSize(bunch)
+        total = sum(size for count, size in sizes.values())
+        g.es_print(f"undo stack: {len(u.beads)} bead{g.plural(len(u.beads))}, {total/1024:,.1f} KB")
+        for undoType, (count, size) in sorted(sizes.items(), key=lambda z: -z[1][1]):
+            g.es_print(f"{size/1024:10,.1f} KB {count:5} {undoType}")
+        if u.max_undo_stack_bytes > 0:
+            g.es_print(f"limit: {u.max_undo_stack_bytes/1024:,.1f} KB")
+        return total
     #@+node:ekr.20031218072017.2039: *3* u.undo
     @cmd('undo')
     def undo(self, event=None):
@@ -1567,6 +1726,8 @@ class Undoer:
         if c.p != u.p:  # #1333.
             c.selectPosition(u.p)
         u.p.setDirty()
+        if u.bodyDelta is not None:
+            u.oldBody = u.getBodyFromDelta(old=True)
         u.p.b = u.oldBody
         w.setAllText(u.oldBody)
         c.frame.body.recolor(u.p)
@@ -1654,6 +1815,7 @@ class Undoer:
             # Put the new data in the bead.
             bunch = u.beads[u.bead]
             bunch.newTree = u.saveTree(p.copy())
+            bunch.undoBytes = None
             u.beads[u.bead] = bunch
         # Replace data in tree with old data.
         u.restoreTree(old_data)
@@ -1729,7 +1891,37 @@ class Undoer:
             w.setSelectionRange(i, j, insert=ins)
             w.seeInsertPoint()
     #@-others
+#@+node:ekr.20261018205532.1: ** class TestUndo
+class TestUndo(unittest.TestCase):
+    """Test cases for leoUndo.py"""
+    #@+others
+    #@+node:ekr.20261018205532.2: *3* test_body_delta
+    def test_body_delta(self):
+        u = Undoer(c=g.NullObject(tag='c'))
+        long_line = 'x' * 2000
+        table = (
+            ('', ''),
+            ('', 'a'),
+            ('a\nb\nc', 'a\nb\nc'),
+            ('a\nb\nc\n', 'a\nB\nc\n'),
+            ('a\nb\nc\n', 'a\nb\n'),
+            ('a\nb\n', 'a\nb\nc\n\n'),
+            ('\n\n', '\n'),
+            ('a\n\nb\n', 'a\nb\n'),
+            (f"a\n{long_line}\nc\n", f"a\n{long_line}y\nc\n"),
+        )
+        for old, new in table:
+            delta = u.createBodyDelta(old, new)
+            assert u.applyBodyDelta(new, delta, old=True) == old, (old, new)
+            assert u.applyBodyDelta(old, delta, old=False) == new, (old, new)
+            if old != new:
+                assert u.applyBodyDelta(new + 'z', delta, old=True) is None, (old, new)
+        delta = u.createBodyDelta(f"a\n{long_line}\nc\n", f"a\n{long_line}y\nc\n")
+        assert isinstance(delta[2], bytes) and len(delta[2]) < 100, delta
+    #@-others
 #@-others
+if __name__ == '__main__':
+    unittest.main()
 #@@language python
 #@@tabwidth -4
 #@@pagewidth 70
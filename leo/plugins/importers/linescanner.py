@@ -78,6 +78,7 @@ need to do so.
 import io
 StringIO = io.StringIO
 import re
+import unittest
 import leo.core.leoGlobals as g
 #@-<< linescanner imports >>
 #@+others
@@ -266,6 +267,28 @@ class Importer:
             if block1 and block2:
                 add_key(d, block1, ('len', block1, block1, None))
         return d
+    #@+node:ekr.20261018205832.1: *4* i.get_jump_pattern
+    cached_jump_patterns = {}
+
+    def get_jump_pattern(self, context):
+        '''
+        Return a compiled regex matching any character that is a key of the
+        state table for the given context, or None if the table is empty.
+
+        i.scan_line uses this pattern to jump over characters that can not
+        change the scan state.
+        '''
+        key = self.name, context
+        try:
+            return self.cached_jump_patterns[key]
+        except KeyError:
+            pass
+        table = self.get_table(context)
+        # i.scan_dict looks up single characters, so longer keys never match.
+        chars = sorted(ch for ch in table if len(ch) == 1)
+        pattern = re.compile('|'.join(re.escape(ch) for ch in chars)) if chars else None
+        self.cached_jump_patterns[key] = pattern
+        return pattern
     #@+node:ekr.20161113135037.1: *4* i.get_table
     #@@nobeautify
     cached_scan_tables = {}
@@ -357,13 +380,35 @@ class Importer:
             's':s,
         }
         new_state = self.state_class(d)
-        i = 0
-        while i < len(s):
+        if type(self).scan_dict is not Importer.scan_dict:
+            # The subclass may depend on seeing every character.
+            i = 0
+            while i < len(s):
+                progress = i
+                context = new_state.context
+                table = self.get_table(context)
+                data = self.scan_dict(context, i, s, table)
+                i = new_state.update(data)
+                assert progress < i
+            return new_state
+        # Scan only the characters that may change the state. A single update
+        # for all skipped characters has the same effect as one update per
+        # character: the deltas are zero, bs_nl is False and the context is unchanged.
+        i, n = 0, len(s)
+        while i < n:
             progress = i
             context = new_state.context
-            table = self.get_table(context)
-            data = self.scan_dict(context, i, s, table)
-            i = new_state.update(data)
+            pattern = self.get_jump_pattern(context)
+            m = pattern and pattern.search(s, i)
+            j = m.start() if m else n
+            if j > i:
+                new_state.update((context, j, 0, 0, 0, False))
+            if j < n:
+                table = self.get_table(context)
+                data = self.scan_dict(context, j, s, table)
+                i = new_state.update(data)
+            else:
+                i = n
             assert progress < i
         return new_state
     #@+node:ekr.20161114024119.1: *4* i.test_scan_state
@@ -1274,6 +1319,97 @@ class Target:
             int(self.gen_refs),
             g.shortFileName(self.p.h),
         )
+#@+node:ekr.20261019103318.1: ** class TestLineScanner
+class TestLineScanner(unittest.TestCase):
+    """Test cases for linescanner.py"""
+    #@+others
+    #@+node:ekr.20261019103318.2: *3* bridge
+    def bridge(self):
+        """Return an instance of Leo's bridge."""
+        import leo.core.leoBridge as leoBridge
+        return leoBridge.controller(gui='nullGui',
+            loadPlugins=False,
+            readSettings=False,
+            silent=True,
+            verbose=False,
+        )
+    #@+node:ekr.20261019103318.3: *3* test_jumping_scan_line
+    def test_jumping_scan_line(self):
+        """
+        i.scan_line jumps over characters that i.get_jump_pattern says can
+        not change the state. Check that the resulting states are the same
+        as the states computed one character at a time.
+        """
+        import leo.plugins.importers.c as c_importer
+        import leo.plugins.importers.lua as lua_importer
+        import leo.plugins.importers.pascal as pascal_importer
+        import leo.plugins.importers.python as python_importer
+        c = self.bridge().openLeoFile(None)
+        table = (
+            (c_importer.C_Importer, r"""
+                int f(char *s) {
+                    char *t = "a \"quoted\" {brace} \\";
+                    char ch = '\'', d = '"';
+                    /* block { comment
+                       still ( in "comment" */ if (s[0]) { return 1; }
+                    x = y / z; // comment {
+                    #define M(a) \
+                        { a }
+                }
+            """),
+            (python_importer.Py_Importer, r'''
+                def f(a, b):
+                    s = 'it\'s {' + "\\"
+                    t = """doc
+                    string ( with 'quotes' \"""
+                    """
+                    u = [1, (2, "x#y")]  # comment [
+                    v = {
+                        'k': "(", 3: '#'}
+                    w = a + \
+                        b
+            '''),
+            (lua_importer.Lua_Importer, r"""
+                function f(t)
+                  local s = "a \"b\" {" .. '\'('
+                  --[[ long
+                  comment { ]]--
+                  --[==[ x "
+                  ( --]==]
+                  return t[1] -- comment (
+                end
+            """),
+            (pascal_importer.Pascal_Importer, r"""
+                procedure P(x: integer);
+                begin
+                  s := 'it''s (' + "a \" b";
+                  { block
+                    comment ( }
+                  writeln(a[1]); // comment {
+                end;
+            """),
+        )
+        for importer_class, text in table:
+
+            class CharImporter(importer_class):
+                """Scan one character at a time."""
+
+                def scan_dict(self, context, i, s, d):
+                    return super().scan_dict(context, i, s, d)
+
+            importer = importer_class(c.importCommands)
+            char_importer = CharImporter(c.importCommands)
+            state = importer.state_class()
+            char_state = char_importer.state_class()
+            for line in g.splitLines(g.adjustTripleString(text, -4)):
+                state = importer.scan_line(line, state)
+                char_state = char_importer.scan_line(line, char_state)
+                self.assertEqual(vars(state), vars(char_state),
+                    f"{importer.name}: {line!r}")
+            # The snippets end in the default context.
+            self.assertEqual(state.context, '', importer.name)
+        c.close()
+    #@-others
 #@-others
 #@@language python
 #@@tabwidth -4
@@ -229,6 +229,7 @@ import re
 # import string
 import sys
 import textwrap
+import unittest
 #@-<< imports >>
 __version__ = '3.0' # Added EvalController class.
 
@@ -368,10 +369,9 @@ class AtButtonCallback:
         
         gnx = self.gnx
         # First, search self.c for the gnx.
-        for p in self.c.all_positions():
-            if p.gnx == gnx:
-                script = self.controller.getScript(p)
-                return script
+        p = self.find_gnx(self.c, gnx)
+        if p:
+            return self.controller.getScript(p)
         # See if myLeoSettings.leo is open.
         for c in g.app.commanders():
             if c.shortFileName().endswith('myLeoSettings.leo'):
@@ -380,11 +380,20 @@ class AtButtonCallback:
             c = None
         if c:
             # Search myLeoSettings.leo file for the gnx.
-            for p in c.all_positions():
-                if p.gnx == gnx:
-                    script = self.controller.getScript(p)
-                    return script
+            p = self.find_gnx(c, gnx)
+            if p:
+                return self.controller.getScript(p)
         return self.script
+    #@+node:ekr.20261018214037.2: *4* AtButtonCallback.find_gnx
+    def find_gnx(self, c, gnx):
+        """Return a position of the node in c with the given gnx, or None."""
+        # fc.gnxDict contains all vnodes, including deleted vnodes.
+        v = gnx and c.fileCommands.gnxDict.get(gnx)
+        if v and v.context == c:
+            p = c.vnode2position(v)
+            if p and c.positionExists(p):
+                return p
+        return None
     #@-others
 #@+node:ekr.20060328125248.6: ** class ScriptingController
 class ScriptingController:
@@ -426,6 +435,8 @@ class ScriptingController:
             # True: create Script Button button.
         self.maxButtonSize = c.config.getInt('scripting-max-button-size') or 18
             # Maximum length of button names.
+        self.scriptCache = {}
+            # Keys are gnx's, values are (key, script) for sc.getScript.
         if not iconBar:
             self.iconBar = c.frame.getIconBarObject()
         else:
@@ -1084,13 +1095,31 @@ class ScriptingController:
         return shortcut
     #@+node:ekr.20150402042350.1: *4* sc.getScript
     def getScript(self, p):
-        '''Return the script composed from p and its descendants.'''
-        return (
-            g.getScript(self.c, p,
-                useSelectedText=False,
-                forcePythonSentinels=True,
-                useSentinels=True,
-            ))
+        '''
+        Return the script composed from p and its descendants.
+
+        Composed scripts are cached until the subtree, its shape, or the
+        @language or @tabwidth in effect at p changes.
+        '''
+        c = self.c
+        d = c.scanAllDirectives(p)
+        # Keep the key itself: a hash collision would run a stale script.
+        # The key's strings are shared with the vnodes.
+        key = (
+            d.get('tabwidth'), d.get('language'), d.get('delims'),
+            tuple((z.gnx, z.h, z.b, z.level(), len(z.v.children))
+                for z in p.self_and_subtree(copy=False)),
+        )
+        data = self.scriptCache.get(p.gnx)
+        if data and data[0] == key:
+            return data[1]
+        script = g.getScript(c, p,
+            useSelectedText=False,
+            forcePythonSentinels=True,
+            useSentinels=True,
+        )
+        self.scriptCache[p.gnx] = key, script
+        return script
     #@+node:ekr.20120301114648.9932: *4* sc.registerAllCommands
     def registerAllCommands(self, args, func, h, pane, source_c=None, tag=None):
         '''Register @button <name> and @rclick <name> and <name>'''
@@ -1562,5 +1591,53 @@ class EvalController:
             w.setSelectionRange(i1, ins, insert=ins, s=p.b)
         return s
     #@-others
+#@+node:ekr.20261018220200.1: ** class TestScriptingController
+class TestScriptingController(unittest.TestCase):
+    #@+others
+    #@+node:ekr.20261018231930.1: *3* TestScriptingController.bridge
+    def bridge(self):
+        """Return an instance of Leo's bridge."""
+        import leo.core.leoBridge as leoBridge
+        return leoBridge.controller(gui='nullGui',
+            loadPlugins=False,
+            readSettings=False,
+            silent=True,
+            verbose=False,
+        )
+    #@+node:ekr.20261018220200.2: *3* TestScriptingController.test_script_cache
+    def test_script_cache(self):
+        """Test that sc.getScript's cache notices body edits and moved nodes."""
+        bridge = self.bridge()
+        c = bridge.openLeoFile(None)
+        root = c.rootPosition()
+        root.h, root.b = '@button test', '@others\n'
+        b = root.insertAsLastChild()
+        b.h, b.b = 'B', 'def f():\n    @others\n'
+        child = root.insertAsLastChild()
+        child.h, child.b = 'C', 'x = 1\n'
+        sc = ScriptingController(c)
+
+        def expected():
+            return g.getScript(c, root,
+                useSelectedText=False,
+                forcePythonSentinels=True,
+                useSentinels=True,
+            )
+
+        script = sc.getScript(root)
+        self.assertEqual(script, expected())
+        self.assertIs(sc.getScript(root), script)
+        # A body edit.
+        child.b = 'x = 2\n'
+        script = sc.getScript(root)
+        self.assertEqual(script, expected())
+        self.assertIn('\nx = 2\n', script)
+        # A move that does not change the order of the nodes in the subtree.
+        child.moveToLastChildOf(b)
+        script = sc.getScript(root)
+        self.assertEqual(script, expected())
+        self.assertIn('\n    x = 2\n', script)
+        c.close()
+    #@-others
 #@-others
 #@-leo
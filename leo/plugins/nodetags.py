@@ -140,8 +140,8 @@ class TagController:
     #@+node:peckj.20140804103733.9263: *3* tag_c.initialize_taglist
     def initialize_taglist(self):
         taglist = []
-        for p in self.c.all_unique_positions():
-            for tag in self.get_tags(p):
+        for v in self.c.all_unique_nodes():
+            for tag in v.u.get(self.TAG_LIST_KEY, []):
                 if tag not in taglist:
                     taglist.append(tag)
         self.taglist = taglist
@@ -163,25 +163,23 @@ class TagController:
     #@+node:peckj.20140804103733.9258: *4* tag_c.get_tagged_nodes
     def get_tagged_nodes(self, tag):
         ''' return a list of *positions* of nodes containing the tag, with * as a wildcard '''
-        nodelist = []
         # replace * with .* for regex compatibility
         tag = tag.replace('*', '.*')
         regex = re.compile(tag)
-        for p in self.c.all_unique_positions():
-            for tag in self.get_tags(p):
-                if regex.match(tag):
-                    nodelist.append(p.copy())
-                    break
-        return nodelist
+
+        def predicate(v):
+            return any(regex.match(z) for z in v.u.get(self.TAG_LIST_KEY, []))
+
+        return list(self.c.positions_where(predicate, unique=True))
     #@+node:vitalije.20170811150914.1: *4* tag_c.get_tagged_gnxes
     def get_tagged_gnxes(self, tag):
         c = self.c
         tag = tag.replace('*', '.*')
         regex = re.compile(tag)
-        for p in c.all_unique_positions():
-            for t in self.get_tags(p):
+        for v in c.all_unique_nodes():
+            for t in v.u.get(self.TAG_LIST_KEY, []):
                 if regex.match(t):
-                    yield p.v.gnx
+                    yield v.gnx
     #@+node:peckj.20140804103733.9265: *3* tag_c.individual nodes
     #@+node:peckj.20140804103733.9259: *4* tag_c.get_tags
     def get_tags(self, p):
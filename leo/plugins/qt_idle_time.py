@@ -105,6 +105,8 @@ class IdleTime:
     #@+node:ekr.20140825042850.18408: *3* IdleTime.call_handler
     def call_handler(self):
         """Carefully call the handler."""
+        perf = g.app.perfStats
+        t = perf and perf.start()
         try:
             self.count += 1
             self.time = time.time()
@@ -112,6 +114,10 @@ class IdleTime:
         except Exception:
             g.es_exception()
             self.stop()
+        if perf:
+            tag = self.tag
+            name = tag if isinstance(tag, str) else perf.handlerName(self.handler)
+            perf.stop(t, 'idle', name)
     #@+node:ekr.20140825080012.18529: *3* IdleTime.destroy_self
     def destroy_self(self):
         """Remove the instance from g.app.idle_timers."""
@@ -215,12 +215,7 @@ def show_unittest_failures(event):
     nav.scon.clear()
     if fails:
         for gnx, stack in fails:
-            pos = None
-            # sucks
-            for p in c.all_positions():
-                if p.gnx == gnx:
-                    pos = p.copy()
-                    break
+            pos = next(c.positions_where(lambda v: v.gnx == gnx), None)
 
             def mkcb(pos, stack):
                 def focus():
@@ -529,7 +524,7 @@ class QuickSearchController:
     def doTimeline(self):
 
         c = self.c
-        timeline = [p.copy() for p in c.all_unique_positions()]
+        timeline = list(c.positions_where(lambda v: True, unique=True))
         timeline.sort(key=lambda x: x.gnx, reverse=True)
         self.clear()
         self.addHeadlineMatches(timeline)
@@ -537,7 +532,7 @@ class QuickSearchController:
     def doChanged(self):
 
         c = self.c
-        changed = [p.copy() for p in c.all_unique_positions() if p.isDirty()]
+        changed = list(c.positions_where(lambda v: v.isDirty(), unique=True))
         self.clear()
         self.addHeadlineMatches(changed)
     #@+node:ekr.20111015194452.15692: *3* doSearch
@@ -558,12 +553,11 @@ class QuickSearchController:
             bpat = pat[2:]
             flags = 0
         combo = self.widgetUI.comboBox.currentText()
+        # None denotes the entire outline. A position denotes its subtree.
         if combo == "All":
-            hNodes = self.c.all_positions()
-            bNodes = self.c.all_positions()
+            hNodes = bNodes = None
         elif combo == "Subtree":
-            hNodes = self.c.p.self_and_subtree()
-            bNodes = self.c.p.self_and_subtree()
+            hNodes = bNodes = self.c.p
         elif combo == "File":
             found = False
             node = self.c.p
@@ -577,8 +571,7 @@ class QuickSearchController:
                         hitBase = True
                     else:
                         node = node.parent()
-            hNodes = node.self_and_subtree()
-            bNodes = node.self_and_subtree()
+            hNodes = bNodes = node
         elif combo == "Chapter":
             found = False
             node = self.c.p
@@ -596,11 +589,9 @@ class QuickSearchController:
                 # If I hit the base then revert to all positions
                 # this is basically the "main" chapter
                 hitBase = False #reset
-                hNodes = self.c.all_positions()
-                bNodes = self.c.all_positions()
+                hNodes = bNodes = None
             else:
-                hNodes = node.self_and_subtree()
-                bNodes = node.self_and_subtree()
+                hNodes = bNodes = node
 
         else:
             hNodes = [self.c.p]
@@ -649,9 +640,9 @@ class QuickSearchController:
             flags = 0
         combo = self.widgetUI.comboBox.currentText()
         if combo == "All":
-            hNodes = self.c.all_positions()
+            hNodes = None
         elif combo == "Subtree":
-            hNodes = self.c.p.self_and_subtree()
+            hNodes = self.c.p
         else:
             hNodes = [self.c.p]
         hm = self.find_h(hpat, hNodes, flags)
@@ -664,12 +655,17 @@ class QuickSearchController:
     def find_h(self, regex, nodes, flags=re.IGNORECASE):
         """ Return list (a PosList) of all nodes where zero or more characters at
         the beginning of the headline match regex
+
+        nodes: a list of positions, a position denoting its subtree,
+               or None, denoting the entire outline.
         """
         res = leoNodes.PosList()
         try:
             pat = re.compile(regex, flags)
         except Exception:
             return res
+        if nodes is None or isinstance(nodes, leoNodes.Position):
+            nodes = self.c.positions_where(lambda v: pat.match(v.h), root=nodes)
         for p in nodes:
             m = re.match(pat, p.h)
             if m:
@@ -682,12 +678,15 @@ class QuickSearchController:
         """ Return list (a PosList) of all nodes whose body matches regex
         one or more times.
 
+        nodes: as in find_h.
         """
         res = leoNodes.PosList()
         try:
             pat = re.compile(regex, flags)
         except Exception:
             return res
+        if nodes is None or isinstance(nodes, leoNodes.Position):
+            nodes = self.c.positions_where(lambda v: pat.search(v.b), root=nodes)
         for p in nodes:
             m = re.finditer(pat, p.b)
             t1, t2 = itertools.tee(m, 2)
@@ -704,10 +703,7 @@ class QuickSearchController:
 
         self.clear()
         c = self.c
-        pl = leoNodes.PosList()
-        for p in c.all_positions():
-            if p.isMarked():
-                pl.append(p.copy())
+        pl = leoNodes.PosList(c.positions_where(lambda v: v.isMarked()))
         self.addHeadlineMatches(pl)
     #@+node:ekr.20111015194452.15700: *3* Event handlers
     #@+node:ekr.20111015194452.15686: *4* onSelectItem